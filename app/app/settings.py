@@ -1,5 +1,5 @@
 import os
-from decouple import config
+from decouple import Csv, config
 
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -29,12 +29,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
-    'user',
-    'recipe',
+    'core.apps.CoreConfig',
+    'user.apps.UserConfig',
+    'recipe.apps.RecipeConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',
+    'core.db.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,16 +70,241 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# Com DB_POOL as conexões ficam em um pool por processo
+# (core.db.backends.postgresql) e o Django as devolve ao fim de cada
+# requisição; sem o pool, DB_CONN_MAX_AGE mantém a conexão de cada thread
+# aberta entre as requisições. As estatísticas do pool de cada processo
+# saem em /healthz?mode=ready&detail=1.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.db.backends.postgresql' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': config('DB_HOST'),
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASS'),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int)
+        ),
+        'POOL': {
+            'MIN_SIZE': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=5.0, cast=float),
+            'MAX_IDLE': config('DB_POOL_MAX_IDLE', default=300.0, cast=float),
+        },
     }
 }
 
+# Réplicas de leitura (core.db.routers). DB_REPLICA_HOSTS lista os hosts das
+# réplicas, com o mesmo banco e usuário do primário; as leituras das
+# requisições GET/HEAD/OPTIONS às URLs de REPLICA_READ_PATHS vão para elas
+# em rodízio, pulando por REPLICA_EJECT_SECONDS as que falharem. A
+# verificação de saúde de cada réplica vale por REPLICA_CHECK_INTERVAL.
+DB_REPLICA_HOSTS = config('DB_REPLICA_HOSTS', default='', cast=Csv())
+REPLICA_DATABASES = []
+for index, host in enumerate(DB_REPLICA_HOSTS):
+    alias = 'replica_%d' % index
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'}
+    )
+    REPLICA_DATABASES.append(alias)
+
+# Tags, ingredientes e receitas particionados por usuário (core.db.sharding)
+# entre os bancos de SHARD_DATABASES. O `default` é sempre o primeiro e guarda
+# os usuários, tokens, a fila e o mapa usuário -> shard; DB_SHARD_HOSTS cria
+# os shards extras `shard_1`, ... com o mesmo banco e usuário do primário.
+# Usuários novos vão para SHARD_PLACEMENT[user_id % len(SHARD_PLACEMENT)]
+# (padrão: todos os shards). Os ids de cada shard começam em
+# índice * SHARD_ID_RANGE, e cada processo guarda o mapa por
+# SHARD_MAP_CACHE_TTL segundos.
+DB_SHARD_HOSTS = config('DB_SHARD_HOSTS', default='', cast=Csv())
+SHARD_DATABASES = ['default']
+for index, host in enumerate(DB_SHARD_HOSTS, 1):
+    alias = 'shard_%d' % index
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host)
+    SHARD_DATABASES.append(alias)
+SHARD_PLACEMENT = config('SHARD_PLACEMENT', default='', cast=Csv())
+SHARD_MAP_CACHE_TTL = config('SHARD_MAP_CACHE_TTL', default=5.0, cast=float)
+SHARD_ID_RANGE = config('SHARD_ID_RANGE', default=100000000, cast=int)
+
+DATABASE_ROUTERS = [
+    'core.db.routers.ShardRouter',
+    'core.db.routers.ReplicaRouter',
+]
+
+REPLICA_READ_PATHS = ('/api/recipe/', '/api/user/')
+REPLICA_CHECK_INTERVAL = config(
+    'DB_REPLICA_CHECK_INTERVAL', default=5.0, cast=float
+)
+REPLICA_EJECT_SECONDS = config(
+    'DB_REPLICA_EJECT_SECONDS', default=30.0, cast=float
+)
+# Após gravar, o usuário lê do primário por REPLICA_STICKY_SECONDS, cobrindo
+# o atraso da replicação. A marcação fica no cache REPLICA_STICKY_CACHE_ALIAS,
+# que deve ser compartilhado entre os processos (o LocMemCache não é).
+REPLICA_STICKY_SECONDS = config(
+    'DB_REPLICA_STICKY_SECONDS', default=5, cast=int
+)
+REPLICA_STICKY_CACHE_ALIAS = config(
+    'DB_REPLICA_STICKY_CACHE_ALIAS', default='default'
+)
+# Apps sempre lidos do primário: um token ou sessão recém-criado pode ainda
+# não ter chegado à réplica.
+REPLICA_PRIMARY_APPS = ('authtoken', 'sessions')
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipe_lists': {
+        'BACKEND': config(
+            'RECIPE_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('RECIPE_CACHE_LOCATION', default='recipe-lists'),
+        'TIMEOUT': config('RECIPE_CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config(
+                'RECIPE_CACHE_MAX_ENTRIES', default=1000, cast=int
+            ),
+        },
+    },
+}
+
+# Cache das listagens de tags e ingredientes. O LocMemCache é por processo;
+# para vários workers use o FileBasedCache ou um cache compartilhado.
+RECIPE_LIST_CACHE_ENABLED = config(
+    'RECIPE_CACHE_ENABLED', default=True, cast=bool
+)
+RECIPE_LIST_CACHE_ALIAS = 'recipe_lists'
+# As versões das listagens, que formam o ETag e as chaves do cache, ficam no
+# cache acima. Se ele for por processo, a alteração feita em um worker não
+# chega aos outros, que continuariam respondendo 304 ou a listagem antiga:
+# sem um cache compartilhado o ETag e o cache das listagens ficam desligados.
+# Defina RECIPE_CACHE_SHARED=1 com o LocMemCache só se houver um processo
+# (runserver).
+RECIPE_LIST_CACHE_SHARED = config(
+    'RECIPE_CACHE_SHARED',
+    default='locmem' not in CACHES['recipe_lists']['BACKEND'],
+    cast=bool
+)
+# Validade, em segundos, da versão das listagens: limita por quanto tempo
+# uma invalidação perdida (cache fora do ar na alteração) deixa a listagem
+# antiga valendo.
+RECIPE_LIST_CACHE_VERSION_TTL = config(
+    'RECIPE_CACHE_VERSION_TTL', default=600, cast=int
+)
+# Listagens com mais linhas que isso não são guardadas, limitando a memória
+# usada a aproximadamente MAX_ENTRIES * MAX_ROWS objetos.
+RECIPE_LIST_CACHE_MAX_ROWS = config(
+    'RECIPE_CACHE_MAX_ROWS', default=1000, cast=int
+)
+
+# Cache dos tokens de autenticação (user.authentication). O LRU é local ao
+# processo; TOKEN_AUTH_CACHE_ALIAS aponta opcionalmente para um cache
+# compartilhado entre os workers, com validade TOKEN_AUTH_CACHE_TTL.
+# Apagar o token ou desativar o usuário limpa o cache compartilhado e o LRU
+# do worker que fez a alteração; os demais workers ainda aceitam o token
+# por até TOKEN_AUTH_LOCAL_CACHE_TTL segundos (a janela de revogação).
+TOKEN_AUTH_CACHE_MAX_SIZE = config(
+    'TOKEN_AUTH_CACHE_MAX_SIZE', default=10000, cast=int
+)
+TOKEN_AUTH_CACHE_TTL = config('TOKEN_AUTH_CACHE_TTL', default=60, cast=int)
+TOKEN_AUTH_LOCAL_CACHE_TTL = config(
+    'TOKEN_AUTH_LOCAL_CACHE_TTL', default=2.0, cast=float
+)
+TOKEN_AUTH_CACHE_ALIAS = config('TOKEN_AUTH_CACHE_ALIAS', default='') or None
+
+# Pool das views assíncronas de usuário/token (user.async_views), onde roda o
+# hash das senhas. Com a fila cheia as requisições recebem 503.
+PASSWORD_HASHING_WORKERS = config(
+    'PASSWORD_HASHING_WORKERS', default=4, cast=int
+)
+PASSWORD_HASHING_MAX_QUEUE = config(
+    'PASSWORD_HASHING_MAX_QUEUE', default=32, cast=int
+)
+PASSWORD_HASHING_RETRY_AFTER = config(
+    'PASSWORD_HASHING_RETRY_AFTER', default=1, cast=int
+)
+
+# Pool de threads onde as views assíncronas (core.async_views) acessam o BD.
+# Cada thread mantém uma conexão; com a fila cheia as requisições recebem 503.
+ASYNC_DB_WORKERS = config('ASYNC_DB_WORKERS', default=8, cast=int)
+ASYNC_DB_MAX_QUEUE = config('ASYNC_DB_MAX_QUEUE', default=512, cast=int)
+ASYNC_DB_RETRY_AFTER = config('ASYNC_DB_RETRY_AFTER', default=1, cast=int)
+
+# Por quanto tempo (segundos) o /healthz?mode=ready reaproveita a última
+# verificação do BD.
+HEALTHZ_READINESS_TTL = config('HEALTHZ_READINESS_TTL', default=5, cast=float)
+
+# Configuração de texto do PostgreSQL usada na busca de receitas.
+RECIPE_SEARCH_CONFIG = config('RECIPE_SEARCH_CONFIG', default='simple')
+
+# Imagens das receitas (recipe.images): o upload vai em blocos para um
+# arquivo temporário em disco, sem passar de RECIPE_IMAGE_MAX_SIZE bytes, e
+# as miniaturas (lado máximo em pixels) são geradas em um pool limitado de
+# threads fora da requisição.
+RECIPE_IMAGE_MAX_SIZE = config(
+    'RECIPE_IMAGE_MAX_SIZE', default=10 * 1024 * 1024, cast=int
+)
+RECIPE_THUMBNAIL_SIZES = config(
+    'RECIPE_THUMBNAIL_SIZES', default='128,256,512', cast=Csv(int)
+)
+RECIPE_THUMBNAIL_WORKERS = config(
+    'RECIPE_THUMBNAIL_WORKERS', default=2, cast=int
+)
+RECIPE_THUMBNAIL_MAX_QUEUE = config(
+    'RECIPE_THUMBNAIL_MAX_QUEUE', default=64, cast=int
+)
+
+# Fila de trabalhos em segundo plano no BD (core.jobs, comando run_jobs):
+# threads por worker, espera entre as buscas na fila vazia (segundos),
+# backoff das novas tentativas (base e máximo, em segundos), tempo após o
+# qual um trabalho em execução é considerado abandonado e dias que os
+# concluídos ficam na tabela.
+JOBS_CONCURRENCY = config('JOBS_CONCURRENCY', default=4, cast=int)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=1.0, cast=float)
+JOBS_RETRY_BACKOFF = config('JOBS_RETRY_BACKOFF', default=5.0, cast=float)
+JOBS_RETRY_BACKOFF_MAX = config(
+    'JOBS_RETRY_BACKOFF_MAX', default=3600.0, cast=float
+)
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=600, cast=int)
+JOBS_RETENTION_DAYS = config('JOBS_RETENTION_DAYS', default=7, cast=int)
+
+# Instrumentação das consultas SQL por requisição (core.middleware): número
+# de consultas, tempo total e as mais lentas vão para o logger 'core.sql'.
+# O header Server-Timing expõe esses tempos ao cliente, então por padrão só
+# é enviado com DEBUG.
+SQL_INSTRUMENTATION_ENABLED = config(
+    'SQL_INSTRUMENTATION_ENABLED', default=True, cast=bool
+)
+SQL_INSTRUMENTATION_SLOWEST = config(
+    'SQL_INSTRUMENTATION_SLOWEST', default=3, cast=int
+)
+SERVER_TIMING_ENABLED = config(
+    'SERVER_TIMING_ENABLED', default=DEBUG, cast=bool
+)
+
+# Renderer JSON da API: 'core.renderers.FastJSONRenderer' (orjson, se
+# instalado), 'core.renderers.StreamingJSONRenderer' (listas em streaming)
+# ou 'rest_framework.renderers.JSONRenderer' (stdlib).
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        config(
+            'API_JSON_RENDERER', default='core.renderers.FastJSONRenderer'
+        ),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -116,6 +343,8 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = '/static/'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = config('MEDIA_ROOT', default='/vol/web/media')
 
 
 AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
@@ -49,3 +49,12 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
 admin.site.register(models.Recipe)
+
+
+class JobAdmin(admin.ModelAdmin):
+    ordering = ["-id"]
+    list_display = ["id", "name", "queue", "status", "attempts", "run_at"]
+    list_filter = ["status", "queue", "name"]
+
+
+admin.site.register(models.Job, JobAdmin)
@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core.db.routers import install_replica_ejection
+        from core.db.sharding import reserve_shard_ids
+        from core.middleware import install_query_recorder
+
+        for receiver in (install_query_recorder, install_replica_ejection):
+            connection_created.connect(receiver)
+            for connection in connections.all():
+                if connection.connection is not None:
+                    receiver(None, connection)
+        post_migrate.connect(reserve_shard_ids, sender=self)
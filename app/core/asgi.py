@@ -0,0 +1,58 @@
+"""
+Handler ASGI do projeto (app/asgi.py).
+
+O `ASGIHandler` do Django 3.1 percorre o conteúdo das respostas em streaming
+no próprio event loop. As listagens em streaming (`StreamingListMixin`) e a
+exportação em NDJSON leem o BD aos poucos enquanto a resposta é enviada, o
+que ali falharia com `SynchronousOnlyOperation`. Aqui cada pedaço é gerado na
+thread síncrona da requisição (a mesma da view e da sua conexão com o BD).
+"""
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
+
+
+_END = object()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """ASGIHandler que gera as respostas em streaming fora do event loop"""
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = [
+            (header.encode('ascii') if isinstance(header, str) else header,
+             value.encode('latin1') if isinstance(value, str) else value)
+            for header, value in response.items()
+        ]
+        headers += [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        while True:
+            part = await next_part(parts, _END)
+            if part is _END:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    """Como `django.core.asgi.get_asgi_application`, com o handler acima"""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,84 @@
+"""
+Apoio às views assíncronas: acesso ao BD e respostas JSON.
+
+Sob ASGI o `sync_to_async` padrão (thread_sensitive) executa todo código
+síncrono em uma única thread, serializando as requisições. As views
+assíncronas levam cada acesso ao BD para `database_pool`, um pool limitado
+de threads (cada uma com sua conexão), e recusam a requisição com 503 quando
+a fila enche em vez de acumular espera.
+"""
+import contextvars
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+from rest_framework import exceptions, status
+
+from core.executor import BoundedExecutor
+from core.renderers import FastJSONRenderer, dumps
+
+
+database_pool = BoundedExecutor(
+    max_workers=settings.ASYNC_DB_WORKERS,
+    max_queue=settings.ASYNC_DB_MAX_QUEUE,
+    name='database'
+)
+
+
+def in_pool(fn):
+    """
+       Marca uma função que roda em um pool de threads, liberando a conexão
+       com o BD vencida ou com erro ao fim de cada chamada
+    """
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return wrapper
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+       Executa `fn` no pool de BD sem bloquear o event loop, no contexto
+       atual (ContextVars, como a instrumentação de SQL). Levanta
+       `PoolSaturated` quando a fila está cheia.
+    """
+    context = contextvars.copy_context()
+    return await database_pool.run(context.run, in_pool(fn), *args, **kwargs)
+
+
+def json_response(data, code=status.HTTP_200_OK, headers=None):
+    """Resposta JSON com os mesmos bytes do FastJSONRenderer"""
+    response = HttpResponse(
+        dumps(data) if data is not None else b'',
+        status=code,
+        content_type=FastJSONRenderer.media_type
+    )
+    for name, value in (headers or {}).items():
+        response[name] = value
+
+    return response
+
+
+def error_response(exc, allow=None):
+    """Converte uma exceção da API em resposta, como o DRF"""
+    headers = {}
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        headers['WWW-Authenticate'] = 'Token'
+    if allow:
+        headers['Allow'] = allow
+
+    return json_response({'detail': exc.detail}, exc.status_code, headers)
+
+
+def saturated_response():
+    """Resposta 503 para quando o pool de BD está cheio"""
+    return json_response(
+        {'detail': _('Servidor ocupado, tente novamente.')},
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+        {'Retry-After': str(settings.ASYNC_DB_RETRY_AFTER)}
+    )
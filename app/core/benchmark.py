@@ -0,0 +1,74 @@
+import os
+import statistics
+from unittest import skipUnless
+
+
+benchmark = skipUnless(
+    os.environ.get('BENCHMARK'),
+    'Defina BENCHMARK=1 para rodar os benchmarks'
+)
+
+
+def percentile(values, pct):
+    """Retorna o percentil `pct` (0-100) dos valores"""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+
+    return values[index]
+
+
+def summarize(latencies, elapsed):
+    """Resume as latências (em segundos) de uma rodada de requisições"""
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def report(name, rows, elapsed):
+    """Imprime a vazão de um benchmark"""
+    print('\n%s: %d linhas em %.3fs (%.0f linhas/s)' % (
+        name, rows, elapsed, rows / elapsed
+    ))
+
+
+def report_latency(name, summary):
+    """Imprime o resumo de latência de um benchmark"""
+    print(
+        '\n%(name)s: %(requests)d req, %(throughput).1f req/s, '
+        'p50 %(p50_ms).1fms, p95 %(p95_ms).1fms, p99 %(p99_ms).1fms'
+        % dict(summary, name=name)
+    )
+
+
+def regressions(results, baseline, tolerance=0.2, min_delta_ms=1.0,
+                metrics=('p50_ms', 'p95_ms')):
+    """
+       Compara os resultados do `manage.py bench` com um baseline e lista os
+       endpoints cuja latência piorou mais que `tolerance` (e mais que
+       `min_delta_ms`) ou que passaram a fazer mais consultas
+    """
+    problems = []
+    for name, base in sorted(baseline.get('endpoints', {}).items()):
+        current = results['endpoints'].get(name)
+        if current is None:
+            continue
+        for metric in metrics:
+            limit = max(base[metric] * (1 + tolerance),
+                        base[metric] + min_delta_ms)
+            if current[metric] > limit:
+                problems.append('%s: %s %.1f > %.1f' % (
+                    name, metric, current[metric], limit
+                ))
+        if current['queries'] > base['queries']:
+            problems.append('%s: queries %.1f > %.1f' % (
+                name, current['queries'], base['queries']
+            ))
+
+    return problems
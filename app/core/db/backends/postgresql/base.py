@@ -0,0 +1,56 @@
+"""
+Backend PostgreSQL com pool de conexões em memória.
+
+Use com CONN_MAX_AGE = 0: ao final de cada requisição o Django "fecha" a
+conexão, que na verdade volta para o pool. As opções ficam em
+DATABASES[alias]['POOL'] (MIN_SIZE, MAX_SIZE, TIMEOUT, MAX_IDLE).
+"""
+import psycopg2
+from psycopg2 import extensions
+from django.db.backends.postgresql import base
+
+from core.db.pool import ConnectionPool, get_pool
+
+
+def _validate(conn):
+    """Verifica se a conexão ainda responde antes de reutilizá-la"""
+    if conn.closed:
+        raise psycopg2.InterfaceError('conexão fechada')
+    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+
+        def factory():
+            return ConnectionPool(
+                connect=lambda: super(DatabaseWrapper, self)
+                .get_new_connection(conn_params),
+                min_size=options.get('MIN_SIZE', 1),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 5.0),
+                max_idle=options.get('MAX_IDLE', 300.0),
+                validate=_validate,
+            )
+
+        return get_pool(self.alias, factory)
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool(conn_params).getconn()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.get_pool(self.get_connection_params())
+        with self.wrap_database_errors:
+            try:
+                self.connection.rollback()
+            except psycopg2.Error:
+                pool.putconn(self.connection, discard=True)
+            else:
+                pool.putconn(self.connection)
@@ -0,0 +1,171 @@
+from django.db import connections, router, transaction
+
+
+def bulk_insert(model, objs, batch_size=1000, using=None):
+    """
+       Insere os objetos em lote e garante que os ids fiquem preenchidos.
+
+       No SQLite (que não retorna os ids no `bulk_create` do Django 3.1) os
+       ids são lidos logo após o INSERT, na mesma transação: o banco só
+       aceita um escritor por vez e o AUTOINCREMENT gera ids crescentes, então
+       as linhas novas são as de maior id. Nos demais bancos sem suporte os
+       objetos são salvos um a um; quem chama deve estar em uma transação.
+    """
+    using = using or router.db_for_write(
+        model, instance=objs[0] if objs else None
+    )
+    connection = connections[using]
+    manager = model._base_manager.using(using)
+    if connection.features.can_return_rows_from_bulk_insert:
+        return manager.bulk_create(objs, batch_size=batch_size)
+
+    if connection.vendor == 'sqlite':
+        if not objs:
+            return objs
+        with transaction.atomic(using=using):
+            manager.bulk_create(objs, batch_size=batch_size)
+            ids = manager.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(objs)]
+            for obj, pk in zip(objs, reversed(list(ids))):
+                obj.pk = pk
+                obj._state.adding = False
+                obj._state.db = using
+        return objs
+
+    for obj in objs:
+        obj.save(force_insert=True, using=using)
+
+    return objs
+
+
+UPSERT_BATCH_SIZE = 500
+
+_SELECT_BY_NAME = (
+    'SELECT input.name, t.id, t.name FROM {table} t '
+    'JOIN input ON lower(t.name) = lower(input.name) '
+    'WHERE t.user_id = %s'
+)
+
+
+def _with_input(names, sql):
+    return 'WITH input (name) AS (VALUES %s) %s' % (
+        ', '.join(['(%s)'] * len(names)), sql
+    )
+
+
+def _insert_defaults(model, connection):
+    """
+       Colunas com default no model (que o banco não preenche sozinho) e os
+       valores delas, para os INSERTs escritos à mão
+    """
+    return [
+        (connection.ops.quote_name(field.column),
+         field.get_db_prep_save(field.get_default(), connection))
+        for field in model._meta.concrete_fields
+        if field.has_default() and field.name not in ('id', 'user', 'name')
+    ]
+
+
+def _upsert_postgresql(cursor, table, user_id, names, defaults):
+    # Uma instrução só: o SELECT lê o snapshot anterior ao INSERT, então cada
+    # nome vem de `inserted` (novo = 1) ou dos já existentes, não dos dois
+    columns = ''.join(', %s' % column for column, _ in defaults)
+    cursor.execute(_with_input(names, (
+        ', inserted AS ('
+        'INSERT INTO {table} (user_id, name{columns}) '
+        'SELECT %s, name{values} FROM input '
+        'ON CONFLICT DO NOTHING RETURNING id, name) '
+        'SELECT name, id, name, 1 FROM inserted UNION ALL '
+        'SELECT *, 0 FROM ({select}) existing'
+    ).format(
+        table=table, columns=columns, values=', %s' * len(defaults),
+        select=_SELECT_BY_NAME.format(table=table)
+    )), [
+        *names, user_id, *(value for _, value in defaults), user_id
+    ])
+    rows = cursor.fetchall()
+    return [row[:3] for row in rows], sum(row[3] for row in rows)
+
+
+def _upsert_sqlite(cursor, table, user_id, names, defaults):
+    # O SQLite não aceita INSERT dentro de WITH; como só há um escritor por
+    # vez, o SELECT logo depois, na mesma transação, vê o estado deixado pelo
+    # INSERT
+    row = '(%s)' % ', '.join(['%s'] * (2 + len(defaults)))
+    cursor.execute(
+        'INSERT INTO %s (user_id, name%s) VALUES %s ON CONFLICT DO NOTHING'
+        % (
+            table, ''.join(', %s' % column for column, _ in defaults),
+            ', '.join([row] * len(names))
+        ),
+        [
+            value for name in names
+            for value in (user_id, name, *(default for _, default in defaults))
+        ]
+    )
+    created = cursor.rowcount
+    cursor.execute(
+        _with_input(names, _SELECT_BY_NAME.format(table=table)),
+        [*names, user_id]
+    )
+    return cursor.fetchall(), created
+
+
+def _upsert_orm(model, user, names, using):
+    found = {}
+    created = 0
+    manager = model._base_manager.using(using)
+    with transaction.atomic(using=using):
+        for name in dict.fromkeys(names):
+            obj, new = manager.get_or_create(
+                user=user, name__iexact=name, defaults={'name': name}
+            )
+            found[name] = (obj.pk, obj.name)
+            created += new
+    return found, created
+
+
+def upsert_by_name(model, user, names, using=None):
+    """
+       Garante que `user` tenha um objeto com cada nome, sem diferenciar
+       maiúsculas (índice único em `(user_id, lower(name))`), e retorna
+       `({nome: (id, nome salvo)}, quantidade criada)`.
+
+       No PostgreSQL cada lote é um único `INSERT ... ON CONFLICT DO NOTHING
+       RETURNING` unido à leitura dos existentes; no SQLite são duas
+       instruções na mesma transação. Nomes que ficam de fora (criados por
+       uma transação concorrente ou repetidos no próprio lote) são lidos em
+       seguida. Nos demais bancos cada nome é um `get_or_create`.
+    """
+    using = using or router.db_for_write(model, instance=user)
+    connection = connections[using]
+    upsert = {
+        'postgresql': _upsert_postgresql,
+        'sqlite': _upsert_sqlite,
+    }.get(connection.vendor)
+    if upsert is None:
+        return _upsert_orm(model, user, names, using)
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    select = _SELECT_BY_NAME.format(table=table)
+    defaults = _insert_defaults(model, connection)
+    names = list(dict.fromkeys(names))
+    found = {}
+    created = 0
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for start in range(0, len(names), UPSERT_BATCH_SIZE):
+            batch = names[start:start + UPSERT_BATCH_SIZE]
+            rows, count = upsert(cursor, table, user.pk, batch, defaults)
+            created += count
+            missing = set(batch).difference(name for name, _, _ in rows)
+            if missing:
+                missing = list(missing)
+                cursor.execute(
+                    _with_input(missing, select), [*missing, user.pk]
+                )
+                rows += cursor.fetchall()
+            for name, pk, stored in rows:
+                found.setdefault(name, (pk, stored))
+
+    return found, created
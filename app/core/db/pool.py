@@ -0,0 +1,180 @@
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo limite"""
+
+
+class ConnectionPool:
+    """
+       Pool de conexões em memória, independente do driver.
+
+       `connect` cria uma conexão nova e `validate` a testa antes de ser
+       reutilizada; conexões que falham na validação são descartadas.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0,
+                 max_idle=300.0, validate=None):
+        if min_size > max_size:
+            raise ValueError('min_size deve ser menor ou igual a max_size')
+        self.connect = connect
+        self.validate = validate
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+            'failed_health_checks': 0,
+        }
+        for _ in range(min_size):
+            self._idle.append((self._create(), time.monotonic()))
+            self._size += 1
+
+    def getconn(self):
+        """Retira uma conexão do pool, esperando até `timeout` segundos"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = self._checkout(deadline)
+            if conn is None:
+                conn = self._new_checked_out()
+            elif not self._is_healthy(conn):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """Devolve a conexão ao pool, ou a descarta se `discard`"""
+        if discard:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        """Fecha todas as conexões livres"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                min_size=self.min_size,
+                max_size=self.max_size,
+            )
+
+    def _checkout(self, deadline):
+        """
+           Retorna uma conexão livre, ou None quando há espaço para abrir
+           uma nova (o espaço já fica reservado)
+        """
+        expired = []
+        try:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        conn, since = self._idle.pop()
+                        if (now - since > self.max_idle and
+                                self._size > self.min_size):
+                            self._size -= 1
+                            expired.append(conn)
+                            continue
+                        return conn
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None
+                    remaining = deadline - now
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            'Nenhuma conexão livre em %.1fs' % self.timeout
+                        )
+        finally:
+            for conn in expired:
+                self._close(conn)
+
+    def _new_checked_out(self):
+        try:
+            return self._create()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _create(self):
+        conn = self.connect()
+        with self._cond:
+            self._stats['connections_created'] += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        if self.validate is None:
+            return True
+        try:
+            self.validate(conn)
+        except Exception:
+            with self._cond:
+                self._stats['failed_health_checks'] += 1
+            return False
+        return True
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._stats['connections_discarded'] += 1
+            self._cond.notify()
+        self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, factory):
+    """Retorna o pool do alias, criando com `factory()` na primeira vez"""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = factory()
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """Retorna as estatísticas de todos os pools, por alias"""
+    with _pools_lock:
+        return {alias: pool.stats() for alias, pool in _pools.items()}
@@ -0,0 +1,307 @@
+"""
+Roteamento entre os shards e as réplicas do BD.
+
+O `ShardRouter` leva os models particionados ao shard do dono (veja
+core.db.sharding); os demais acessos, e os dos usuários do shard
+`default`, seguem para o `ReplicaRouter`.
+
+O `ReplicaRoutingMiddleware` marca as requisições de leitura (GET, HEAD,
+OPTIONS) às URLs de `REPLICA_READ_PATHS`; nelas o `ReplicaRouter` manda as
+leituras para uma das réplicas de `REPLICA_DATABASES`, escolhida em rodízio
+entre as saudáveis. Cada requisição usa uma única réplica. As escritas, as
+demais requisições e o código fora de requisições (comandos, worker) usam o
+primário (`default`).
+
+Para o usuário ler o que acabou de gravar, quem grava fica preso ao primário
+por `REPLICA_STICKY_SECONDS`: o router anota os donos (`user_id`) dos
+objetos gravados durante a requisição e o middleware, ao fim dela, marca
+esses usuários e o autenticado (em métodos de escrita) no cache.
+"""
+import asyncio
+import contextvars
+import functools
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError
+from django.utils.functional import LazyObject, empty
+
+from core.db import sharding
+from core.health import ReadinessProbe, check_database
+
+
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+_current = contextvars.ContextVar('replica_routing', default=None)
+
+
+class ReplicaSet:
+    """
+       Réplicas escolhidas em rodízio. As que falham na verificação de
+       saúde ou em uma consulta ficam de fora até passarem de novo.
+    """
+
+    def __init__(self, aliases, check_interval, eject_seconds):
+        self.aliases = tuple(aliases)
+        self.eject_seconds = eject_seconds
+        self._probes = {
+            alias: ReadinessProbe(
+                functools.partial(check_database, alias), check_interval
+            )
+            for alias in self.aliases
+        }
+        self._ejected = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """Próxima réplica saudável, ou None se nenhuma estiver"""
+        if not self.aliases:
+            return None
+        with self._lock:
+            start = next(self._counter)
+        for offset in range(len(self.aliases)):
+            alias = self.aliases[(start + offset) % len(self.aliases)]
+            if self.is_healthy(alias):
+                return alias
+        return None
+
+    def is_healthy(self, alias):
+        if self._ejected.get(alias, 0.0) > time.monotonic():
+            return False
+        return self._probes[alias].is_ready()
+
+    def eject(self, alias):
+        """Deixa a réplica de fora por `eject_seconds`"""
+        if alias in self._probes:
+            self._ejected[alias] = time.monotonic() + self.eject_seconds
+
+
+_replicas = None
+_replicas_lock = threading.Lock()
+
+
+def get_replicas():
+    """`ReplicaSet` das réplicas configuradas (refeito se mudarem)"""
+    global _replicas
+    key = (
+        tuple(settings.REPLICA_DATABASES), settings.REPLICA_CHECK_INTERVAL,
+        settings.REPLICA_EJECT_SECONDS
+    )
+    replicas = _replicas
+    if replicas is None or replicas.key != key:
+        with _replicas_lock:
+            if _replicas is None or _replicas.key != key:
+                _replicas = ReplicaSet(*key)
+                _replicas.key = key
+            replicas = _replicas
+
+    return replicas
+
+
+def eject_on_error(execute, sql, params, many, context):
+    """
+       Wrapper de execução das conexões: afasta a réplica cuja consulta
+       falhou por erro de conexão
+    """
+    try:
+        return execute(sql, params, many, context)
+    except (OperationalError, InterfaceError):
+        alias = context['connection'].alias
+        if alias in settings.REPLICA_DATABASES:
+            get_replicas().eject(alias)
+        raise
+
+
+def install_replica_ejection(sender, connection, **kwargs):
+    """Instala `eject_on_error` nas réplicas (signal `connection_created`)"""
+    if (connection.alias in settings.REPLICA_DATABASES
+            and eject_on_error not in connection.execute_wrappers):
+        connection.execute_wrappers.append(eject_on_error)
+
+
+def _sticky_key(user_id):
+    return 'replica:sticky:%s' % user_id
+
+
+def stick_to_primary(user_ids):
+    """Faz os usuários lerem do primário por `REPLICA_STICKY_SECONDS`"""
+    if user_ids and settings.REPLICA_STICKY_SECONDS > 0:
+        caches[settings.REPLICA_STICKY_CACHE_ALIAS].set_many(
+            {_sticky_key(user_id): True for user_id in user_ids},
+            settings.REPLICA_STICKY_SECONDS
+        )
+
+
+def _request_user_id(request):
+    """
+       Id do usuário já autenticado na requisição, sem forçar a
+       autenticação (o usuário preguiçoso do Django consulta o BD)
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, LazyObject):
+        user = user._wrapped
+        if user is empty:
+            return None
+    return getattr(user, 'pk', None)
+
+
+class RoutingState:
+    """Decisões de roteamento de uma requisição"""
+
+    def __init__(self, request, read_replica):
+        self.request = request
+        self.read_replica = read_replica
+        self.replica = None
+        self.written = set()
+        self._sticky = {}
+
+    def read_alias(self, model):
+        """Banco das leituras do model, ou None para o primário"""
+        if (not self.read_replica
+                or model._meta.app_label in settings.REPLICA_PRIMARY_APPS):
+            return None
+        user_id = _request_user_id(self.request)
+        if user_id is not None and self.is_sticky(user_id):
+            return None
+        if self.replica is None:
+            self.replica = get_replicas().choose() or DEFAULT_DB_ALIAS
+
+        return self.replica
+
+    def is_sticky(self, user_id):
+        if user_id in self.written:
+            return True
+        if user_id not in self._sticky:
+            self._sticky[user_id] = caches[
+                settings.REPLICA_STICKY_CACHE_ALIAS
+            ].get(_sticky_key(user_id), False)
+        return self._sticky[user_id]
+
+
+def _owner_id(model, instance):
+    """Usuário dono do objeto gravado"""
+    if instance is None:
+        return None
+    if model is get_user_model():
+        return instance.pk
+    return getattr(instance, 'user_id', None)
+
+
+class ShardRouter:
+    """Tags, ingredientes e receitas no shard do dono"""
+
+    def _database(self, model, hints, write):
+        if not sharding.is_sharded(model):
+            return None
+        user_id = sharding.owner_of(hints.get('instance'))
+        if user_id is None:
+            user_id = sharding.current_user()
+        if user_id is None:
+            return None
+
+        database, locked = sharding.shard_map.get(user_id)
+        if write and locked:
+            raise sharding.ShardLocked()
+        if database == DEFAULT_DB_ALIAS:
+            return None
+        return database
+
+    def db_for_read(self, model, **hints):
+        return self._database(model, hints, write=False)
+
+    def db_for_write(self, model, **hints):
+        return self._database(model, hints, write=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # O usuário (no `default`) e os seus objetos (no shard dele)
+        if sharding.is_sharded(type(obj1)) or sharding.is_sharded(type(obj2)):
+            return True
+        return None
+
+
+class ReplicaRouter:
+    """Leituras nas réplicas durante as requisições de leitura"""
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None:
+            return None
+        return state.read_alias(model)
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is None:
+            return None
+        owner = _owner_id(model, hints.get('instance'))
+        if owner is not None:
+            state.written.add(owner)
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+       Define o roteamento de cada requisição (em uma ContextVar, que as
+       threads do `sync_to_async` e do pool de BD herdam) e, ao fim dela,
+       prende ao primário os usuários que gravaram
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Como o MiddlewareMixin do Django: sob ASGI a instância é
+            # chamada como corrotina e não força a cadeia síncrona
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+
+        state = self.start(request)
+        token = _current.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+            self.finish(state)
+
+    async def __acall__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return await self.get_response(request)
+
+        state = self.start(request)
+        token = _current.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current.reset(token)
+            self.finish(state)
+
+    def start(self, request):
+        return RoutingState(request, (
+            request.method in SAFE_METHODS
+            and request.path.startswith(tuple(settings.REPLICA_READ_PATHS))
+        ))
+
+    def finish(self, state):
+        written = set(state.written)
+        if state.request.method not in SAFE_METHODS:
+            user_id = _request_user_id(state.request)
+            if user_id is not None:
+                written.add(user_id)
+        stick_to_primary(written)
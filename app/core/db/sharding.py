@@ -0,0 +1,235 @@
+"""
+Particionamento (sharding) dos dados de receitas por usuário.
+
+Tags, ingredientes, receitas e as tabelas entre eles (`SHARDED_MODELS`)
+ficam no shard do dono, um dos bancos de `SHARD_DATABASES`; usuários,
+tokens, a fila e o mapa usuário -> shard (`core.UserShard`) ficam no
+`default`. O usuário é colocado no primeiro acesso, em
+`SHARD_PLACEMENT[user_id % len(SHARD_PLACEMENT)]`, e o mapa guarda a
+escolha: mudar a configuração não move ninguém (para isso há o comando
+`move_user_shard`).
+
+O `ShardRouter` (core.db.routers) descobre o dono pelo objeto do acesso
+(hint `instance`: o próprio usuário ou um objeto com `user_id`) ou, nas
+consultas sem objeto, pelo usuário de `user_context`, que as views definem
+com o usuário logado. Cada processo guarda o mapa em cache por
+`SHARD_MAP_CACHE_TTL` segundos.
+
+Os ids dos models particionados de cada shard começam em
+`índice * SHARD_ID_RANGE`, então continuam únicos quando os dados de um
+usuário mudam de shard.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+
+from core.models import UserShard
+
+
+SHARDED_MODELS = (
+    'core.tag', 'core.ingredient', 'core.recipe', 'core.recipe_tags',
+    'core.recipe_ingredients',
+)
+
+_current_user = contextvars.ContextVar('shard_user', default=None)
+
+
+class ShardLocked(exceptions.APIException):
+    """Escrita nos dados de um usuário que está mudando de shard"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _(
+        'Seus dados estão sendo movidos, tente novamente em instantes.'
+    )
+    default_code = 'shard_locked'
+
+
+def is_enabled():
+    return len(settings.SHARD_DATABASES) > 1
+
+
+def sharded_models():
+    """Models particionados, na ordem em que podem ser inseridos"""
+    return [apps.get_model(label) for label in SHARDED_MODELS]
+
+
+def is_sharded(model):
+    return is_enabled() and model._meta.label_lower in SHARDED_MODELS
+
+
+def set_user(user_id):
+    """Define o dono dos acessos sem objeto; retorna o token para reverter"""
+    return _current_user.set(user_id)
+
+
+def reset_user(token):
+    _current_user.reset(token)
+
+
+@contextmanager
+def user_context(user_id):
+    """Direciona ao shard do usuário os acessos sem objeto do bloco"""
+    token = set_user(user_id)
+    try:
+        yield
+    finally:
+        reset_user(token)
+
+
+def owner_of(instance):
+    """Id do usuário dono do objeto (ou do próprio usuário)"""
+    if instance is None:
+        return None
+    if isinstance(instance, get_user_model()):
+        return instance.pk
+    return getattr(instance, 'user_id', None)
+
+
+def current_user():
+    return _current_user.get()
+
+
+def placement(user_id):
+    """Shard de um usuário que ainda não está no mapa"""
+    shards = settings.SHARD_PLACEMENT or settings.SHARD_DATABASES
+    return shards[user_id % len(shards)]
+
+
+class ShardMap:
+    """LRU local, com validade, do mapa usuário -> (shard, travado)"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Retorna (shard, travado) do usuário, colocando-o se for novo"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(user_id)
+                return entry[:2]
+
+        database, locked = self._load(user_id)
+        with self._lock:
+            self._entries[user_id] = (
+                database, locked, now + settings.SHARD_MAP_CACHE_TTL
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return database, locked
+
+    def _load(self, user_id):
+        shards = UserShard.objects.using(DEFAULT_DB_ALIAS)
+        row = shards.filter(user_id=user_id).values_list(
+            'database', 'locked'
+        ).first()
+        if row is None:
+            shard = shards.get_or_create(
+                user_id=user_id, defaults={'database': placement(user_id)}
+            )[0]
+            row = (shard.database, shard.locked)
+
+        return row
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+shard_map = ShardMap()
+
+
+def shard_of(user_id):
+    """Banco com os dados de receitas do usuário"""
+    if not is_enabled():
+        return DEFAULT_DB_ALIAS
+    return shard_map.get(user_id)[0]
+
+
+def recorded_shard(user_id):
+    """
+       (shard, travado) do usuário sem colocá-lo no mapa: None se ele nunca
+       teve dados particionados
+    """
+    if not is_enabled():
+        return DEFAULT_DB_ALIAS, False
+    return UserShard.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=user_id
+    ).values_list('database', 'locked').first()
+
+
+def assign(user_id, database=None, locked=None):
+    """Altera o shard e/ou a trava do usuário no mapa"""
+    fields = {}
+    if database is not None:
+        fields['database'] = database
+    if locked is not None:
+        fields['locked'] = locked
+    shard = UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        user_id=user_id, defaults=fields
+    )[0]
+    shard_map.invalidate(user_id)
+
+    return shard
+
+
+def reserve_id_range(alias):
+    """
+       Faz as sequências dos models particionados do shard começarem na
+       faixa dele (sem recuar as que já passaram do início)
+    """
+    if alias not in settings.SHARD_DATABASES:
+        return
+    start = settings.SHARD_DATABASES.index(alias) * settings.SHARD_ID_RANGE
+    if not start:
+        return
+
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in sharded_models():
+            table = model._meta.db_table
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT setval(pg_get_serial_sequence(%%s, 'id'), "
+                    "GREATEST(%%s, (SELECT COALESCE(MAX(id), 0) FROM %s)))"
+                    % quote(table), [table, start]
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT seq FROM sqlite_sequence WHERE name = %s',
+                    [table]
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(
+                        'INSERT INTO sqlite_sequence (name, seq) '
+                        'VALUES (%s, %s)', [table, start]
+                    )
+                elif row[0] < start:
+                    cursor.execute(
+                        'UPDATE sqlite_sequence SET seq = %s '
+                        'WHERE name = %s', [start, table]
+                    )
+
+
+def reserve_shard_ids(sender, using, **kwargs):
+    """Reserva a faixa de ids do shard migrado (signal `post_migrate`)"""
+    reserve_id_range(using)
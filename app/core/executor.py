@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """A fila do pool de execução está cheia"""
+
+
+class BoundedExecutor:
+    """
+       Pool de threads com limite de trabalhos na fila.
+
+       Quando há `max_workers + max_queue` trabalhos pendentes, `submit`
+       falha na hora com `PoolSaturated` em vez de enfileirar sem limite.
+    """
+
+    def __init__(self, max_workers, max_queue, name='pool'):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PoolSaturated(self.name)
+
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Executa `fn` no pool e aguarda o resultado sem bloquear o loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'pending': self._pending,
+                'rejected': self._rejected,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name
+                )
+            return self._executor
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
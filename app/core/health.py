@@ -0,0 +1,50 @@
+import threading
+import time
+
+from django.db import connections
+
+
+def check_database(alias='default'):
+    """Abre a conexão com o BD e executa uma consulta trivial"""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+class ReadinessProbe:
+    """
+       Guarda o resultado da última verificação do BD por `ttl` segundos.
+
+       Quando o resultado vence, apenas uma thread refaz a verificação; as
+       demais continuam respondendo com o valor anterior.
+    """
+
+    def __init__(self, check=check_database, ttl=5.0):
+        self.check = check
+        self.ttl = ttl
+        self._ready = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_ready(self):
+        stale = time.monotonic() - self._checked_at >= self.ttl
+        if self._ready is None:
+            with self._lock:
+                if self._ready is None:
+                    self._refresh()
+        elif stale and self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+
+        return self._ready
+
+    def _refresh(self):
+        try:
+            self.check()
+        except Exception:
+            self._ready = False
+        else:
+            self._ready = True
+        self._checked_at = time.monotonic()
@@ -0,0 +1,383 @@
+"""
+Fila de trabalhos em segundo plano guardada no próprio BD (`core.Job`).
+
+As funções são registradas com `@task` em módulos `tasks.py` dos apps e
+enfileiradas com `enqueue`, de preferência na mesma transação da alteração
+que as motivou. O comando `run_jobs` executa o `Worker`, que pega os
+trabalhos pendentes:
+
+- no PostgreSQL com `SELECT ... FOR UPDATE SKIP LOCKED` dentro de uma
+  transação, então vários workers não disputam as mesmas linhas;
+- nos demais bancos (SQLite) com um único UPDATE condicionado a
+  `status = 'pending'`, que é atômico: só um worker muda cada linha.
+
+Falhas são repetidas com backoff exponencial até `max_attempts`; trabalhos
+presos em `running` por mais de `JOBS_LOCK_TIMEOUT` (worker que morreu)
+voltam para a fila. `max_concurrency` limita quantos trabalhos de uma tarefa
+rodam ao mesmo tempo em todos os workers (o limite é verificado ao pegar os
+trabalhos, então workers simultâneos podem passar dele por pouco).
+"""
+import logging
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.async_views import in_pool
+from core.executor import BoundedExecutor
+from core.models import Job
+
+
+logger = logging.getLogger('core.jobs')
+
+CLAIM_OVERFETCH = 4
+MAINTENANCE_INTERVAL = 60
+
+_tasks = {}
+_discovered = False
+_discover_lock = threading.Lock()
+
+
+class Task:
+    """Função registrada como tarefa da fila"""
+
+    def __init__(self, fn, name, queue, max_attempts, max_concurrency):
+        self.fn = fn
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.max_concurrency = max_concurrency
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def enqueue(self, delay=0, using=None, **kwargs):
+        """Enfileira a tarefa com os kwargs informados"""
+        return enqueue(self.name, kwargs, delay, using)
+
+
+def task(name=None, queue='default', max_attempts=5, max_concurrency=None):
+    """
+       Registra a função como tarefa. Os argumentos do trabalho são passados
+       como kwargs e precisam ser serializáveis em JSON.
+    """
+    def decorator(fn):
+        registered = Task(
+            fn, name or '%s.%s' % (fn.__module__, fn.__name__),
+            queue, max_attempts, max_concurrency
+        )
+        _tasks[registered.name] = registered
+        return registered
+
+    return decorator
+
+
+def _discover():
+    global _discovered
+    if not _discovered:
+        with _discover_lock:
+            if not _discovered:
+                autodiscover_modules('tasks')
+                _discovered = True
+
+
+def get_task(name):
+    _discover()
+    return _tasks.get(name)
+
+
+def enqueue(name, kwargs=None, delay=0, using=None):
+    """Cria um trabalho da tarefa `name`, que roda após `delay` segundos"""
+    registered = get_task(name)
+    if registered is None:
+        raise LookupError('Tarefa desconhecida: %s' % name)
+
+    return Job.objects.using(using or router.db_for_write(Job)).create(
+        name=name,
+        kwargs=kwargs or {},
+        queue=registered.queue,
+        max_attempts=registered.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempt):
+    """Espera antes da nova tentativa: exponencial, com limite e jitter"""
+    delay = min(
+        settings.JOBS_RETRY_BACKOFF_MAX,
+        settings.JOBS_RETRY_BACKOFF * 2 ** (attempt - 1)
+    )
+    return random.uniform(delay / 2, delay)
+
+
+def _free_slots(jobs):
+    """Vagas de cada tarefa com `max_concurrency`"""
+    _discover()
+    limits = {
+        name: registered.max_concurrency
+        for name, registered in _tasks.items()
+        if registered.max_concurrency is not None
+    }
+    if not limits:
+        return {}
+
+    running = dict(jobs.filter(
+        status=Job.RUNNING, name__in=limits
+    ).values_list('name').annotate(total=Count('id')))
+
+    return {
+        name: limit - running.get(name, 0) for name, limit in limits.items()
+    }
+
+
+def claim(worker, limit, queues=None, using=None):
+    """Marca até `limit` trabalhos pendentes como do `worker` e os retorna"""
+    using = using or router.db_for_write(Job)
+    skip_locked = connections[using].features.has_select_for_update_skip_locked
+    jobs = Job.objects.using(using)
+    now = timezone.now()
+
+    with transaction.atomic(using=using) if skip_locked else nullcontext():
+        free = _free_slots(jobs)
+        candidates = jobs.filter(status=Job.PENDING, run_at__lte=now)
+        if queues:
+            candidates = candidates.filter(queue__in=queues)
+        full = [name for name, slots in free.items() if slots <= 0]
+        if full:
+            candidates = candidates.exclude(name__in=full)
+        candidates = candidates.order_by('run_at', 'id')
+        if skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+
+        ids = []
+        for pk, name in candidates.values_list(
+            'id', 'name'
+        )[:limit * CLAIM_OVERFETCH]:
+            if name in free:
+                if free[name] <= 0:
+                    continue
+                free[name] -= 1
+            ids.append(pk)
+            if len(ids) == limit:
+                break
+        if not ids:
+            return []
+
+        jobs.filter(id__in=ids, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1
+        )
+
+    return list(jobs.filter(
+        id__in=ids, status=Job.RUNNING, locked_by=worker, locked_at=now
+    ).order_by('run_at', 'id'))
+
+
+def complete(job, using=None):
+    """Marca o trabalho como concluído, se ainda for do mesmo worker"""
+    return Job.objects.using(using or job._state.db).filter(
+        id=job.id, status=Job.RUNNING, locked_by=job.locked_by
+    ).update(
+        status=Job.DONE, finished_at=timezone.now(), locked_by='',
+        locked_at=None
+    )
+
+
+def fail(job, error, retry=True, using=None):
+    """
+       Registra a falha: volta para a fila após o backoff ou, sem mais
+       tentativas, fica como `failed`. Retorna True se haverá nova tentativa.
+    """
+    retry = retry and job.attempts < job.max_attempts
+    fields = {'locked_by': '', 'locked_at': None, 'last_error': error}
+    if retry:
+        fields.update(
+            status=Job.PENDING,
+            run_at=timezone.now() + timedelta(seconds=backoff(job.attempts))
+        )
+    else:
+        fields.update(status=Job.FAILED, finished_at=timezone.now())
+    Job.objects.using(using or job._state.db).filter(
+        id=job.id, status=Job.RUNNING, locked_by=job.locked_by
+    ).update(**fields)
+
+    return retry
+
+
+def release_stale(timeout=None, using=None):
+    """
+       Devolve para a fila (ou marca como falhos, sem mais tentativas) os
+       trabalhos presos em `running` há mais de `timeout` segundos
+    """
+    timeout = settings.JOBS_LOCK_TIMEOUT if timeout is None else timeout
+    stale = Job.objects.using(using or router.db_for_write(Job)).filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    fields = {
+        'locked_by': '', 'locked_at': None,
+        'last_error': 'Tempo de execução esgotado',
+    }
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), **fields
+    )
+    released = stale.update(status=Job.PENDING, **fields)
+
+    return released + failed
+
+
+def purge_finished(days=None, using=None):
+    """Apaga os trabalhos concluídos há mais de `days` dias"""
+    days = settings.JOBS_RETENTION_DAYS if days is None else days
+    deleted, _ = Job.objects.using(
+        using or router.db_for_write(Job)
+    ).filter(
+        status=Job.DONE, finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+
+    return deleted
+
+
+def queue_stats(using=None):
+    """Totais por tarefa e status e atraso do pendente mais antigo"""
+    jobs = Job.objects.using(using or router.db_for_read(Job))
+    totals = {}
+    for name, status, total in jobs.values_list('name', 'status').annotate(
+        total=Count('id')
+    ).order_by('name', 'status'):
+        totals.setdefault(name, {})[status] = total
+    oldest = jobs.filter(
+        status=Job.PENDING, run_at__lte=timezone.now()
+    ).aggregate(oldest=Min('run_at'))['oldest']
+
+    return {
+        'tasks': totals,
+        'lag_seconds': (
+            (timezone.now() - oldest).total_seconds() if oldest else 0.0
+        ),
+    }
+
+
+class Worker:
+    """
+       Executa os trabalhos em até `concurrency` threads, pegando novos
+       conforme as vagas abrem
+    """
+
+    def __init__(self, name, concurrency=None, queues=None,
+                 poll_interval=None, using=None):
+        self.name = name
+        self.concurrency = concurrency or settings.JOBS_CONCURRENCY
+        self.queues = queues
+        self.poll_interval = (
+            settings.JOBS_POLL_INTERVAL if poll_interval is None
+            else poll_interval
+        )
+        self.using = using or router.db_for_write(Job)
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._metrics = {
+            'processed': 0, 'succeeded': 0, 'retried': 0, 'failed': 0,
+            'seconds': 0.0, 'tasks': {},
+        }
+
+    def run(self, burst=False):
+        """
+           Processa a fila até `stop()`; com `burst` termina quando não há
+           mais trabalhos prontos
+        """
+        pool = BoundedExecutor(self.concurrency, 0, 'jobs')
+        running = set()
+        maintenance_at = 0.0
+        try:
+            while not self.stopping.is_set():
+                if time.monotonic() >= maintenance_at:
+                    self.maintain()
+                    maintenance_at = time.monotonic() + MAINTENANCE_INTERVAL
+                running = {future for future in running if not future.done()}
+                free = self.concurrency - len(running)
+                jobs = claim(
+                    self.name, free, self.queues, self.using
+                ) if free else []
+                for job in jobs:
+                    running.add(pool.submit(in_pool(self.execute), job))
+                if jobs:
+                    continue
+                if burst and not running:
+                    break
+                if running:
+                    wait(running, self.poll_interval, FIRST_COMPLETED)
+                else:
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            wait(running)
+            pool.shutdown()
+
+    def stop(self):
+        self.stopping.set()
+
+    def maintain(self):
+        release_stale(using=self.using)
+        purge_finished(using=self.using)
+
+    def execute(self, job):
+        """Executa um trabalho já marcado para este worker"""
+        registered = get_task(job.name)
+        start = time.perf_counter()
+        if registered is None:
+            outcome = 'failed'
+            fail(job, 'Tarefa desconhecida: %s' % job.name, retry=False)
+        else:
+            try:
+                registered.fn(**job.kwargs)
+            except Exception:
+                retried = fail(job, traceback.format_exc())
+                outcome = 'retried' if retried else 'failed'
+            else:
+                complete(job)
+                outcome = 'succeeded'
+        duration = time.perf_counter() - start
+
+        self._record(job.name, outcome, duration)
+        log = logger.info if outcome == 'succeeded' else logger.warning
+        log(
+            '%s #%d: %s em %.1fms (tentativa %d de %d)',
+            job.name, job.id, outcome, duration * 1000, job.attempts,
+            job.max_attempts,
+            extra={
+                'job': job.id, 'task': job.name, 'outcome': outcome,
+                'attempt': job.attempts, 'ms': round(duration * 1000, 3),
+            }
+        )
+
+        return outcome
+
+    def _record(self, name, outcome, duration):
+        with self._lock:
+            task_metrics = self._metrics['tasks'].setdefault(name, {
+                'processed': 0, 'succeeded': 0, 'retried': 0, 'failed': 0,
+                'seconds': 0.0,
+            })
+            for metrics in (self._metrics, task_metrics):
+                metrics['processed'] += 1
+                metrics[outcome] += 1
+                metrics['seconds'] += duration
+
+    def metrics(self):
+        """Contadores dos trabalhos executados por este worker"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['tasks'] = {
+                name: dict(values)
+                for name, values in self._metrics['tasks'].items()
+            }
+        return metrics
@@ -0,0 +1,276 @@
+import itertools
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment
+)
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import regressions, summarize
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.importer import RecipeImporter
+
+
+PASSWORD = 'bench-password'
+
+
+def _catalog(tags, ingredients, recipes, relations):
+    """Gera os registros do catálogo semeado no formato do importador"""
+    records = itertools.chain(
+        ({'type': 'tag', 'name': 'Tag %d' % i} for i in range(tags)),
+        ({'type': 'ingredient', 'name': 'Ingrediente %d' % i}
+         for i in range(ingredients)),
+        ({'title': 'Receita %d' % i,
+          'time_minutes': 5 + i % 60,
+          'price': '%d.50' % (i % 100),
+          'tags': ['Tag %d' % ((i * 7 + n) % tags)
+                   for n in range(min(relations, tags))],
+          'ingredients': ['Ingrediente %d' % ((i * 11 + n) % ingredients)
+                          for n in range(min(relations, ingredients))]}
+         for i in range(recipes)),
+    )
+    return enumerate(records, 1)
+
+
+def _scenarios(context):
+    """
+       Retorna os cenários do benchmark: nome e função que recebe um número
+       único e devolve (método, url, dados, autenticado)
+    """
+    tags = reverse('recipe:tag-list')
+    ingredients = reverse('recipe:ingredient-list')
+    recipes = reverse('recipe:recipe-list')
+    detail = reverse('recipe:recipe-detail', args=[context['recipe_id']])
+    credentials = {'email': context['email'], 'password': PASSWORD}
+
+    def new_user(n):
+        return {'email': 'bench%d@email.com' % n, 'password': PASSWORD,
+                'name': 'Bench'}
+
+    return [
+        ('healthz', lambda n: ('get', reverse('healthz'), None, False)),
+        ('user.create',
+         lambda n: ('post', reverse('user:create'), new_user(n), False)),
+        ('user.create_async',
+         lambda n: ('post', reverse('user:create-async'), new_user(n),
+                    False)),
+        ('user.token',
+         lambda n: ('post', reverse('user:token'), credentials, False)),
+        ('user.token_async',
+         lambda n: ('post', reverse('user:token-async'), credentials,
+                    False)),
+        ('user.me', lambda n: ('get', reverse('user:me'), None, True)),
+        ('tags.list', lambda n: ('get', tags, None, True)),
+        ('tags.page',
+         lambda n: ('get', tags, {'page_size': 50}, True)),
+        ('tags.create',
+         lambda n: ('post', tags, {'name': 'Nova tag %d' % n}, True)),
+        ('ingredients.list', lambda n: ('get', ingredients, None, True)),
+        ('ingredients.bulk_create',
+         lambda n: ('post', ingredients,
+                    [{'name': 'Novo %d-%d' % (n, i)} for i in range(100)],
+                    True)),
+        ('recipes.list', lambda n: ('get', recipes, None, True)),
+        ('recipes.filter',
+         lambda n: ('get', recipes,
+                    {'tags': ','.join(map(str, context['tag_ids']))}, True)),
+        ('recipes.search',
+         lambda n: ('get', recipes, {'search': 'receita'}, True)),
+        ('recipes.detail', lambda n: ('get', detail, None, True)),
+        ('recipes.create',
+         lambda n: ('post', recipes, {
+             'title': 'Nova receita %d' % n, 'time_minutes': 10,
+             'price': '5.00', 'tags': context['tag_ids'],
+             'ingredients': context['ingredient_ids'],
+         }, True)),
+        ('recipes.export',
+         lambda n: ('get', reverse('recipe:export'), None, True)),
+    ]
+
+
+class Command(BaseCommand):
+    """
+       Mede a latência, as consultas e a vazão de todos os endpoints sobre
+       um banco de teste semeado, comparando com um baseline opcional
+    """
+    help = (
+        'Mede latência, consultas e vazão dos endpoints sobre um banco de '
+        'teste semeado. Para comparar uma mudança, grave o baseline antes '
+        'dela (bench --baseline bench.json --save-baseline) e rode depois '
+        'com os mesmos parâmetros (bench --baseline bench.json): o comando '
+        'falha se houver regressão. Só as consultas da thread da requisição '
+        'são contadas; as das views assíncronas, feitas nas threads do '
+        'database_pool, não entram (user.*_async reportam 0).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--recipes', type=int, default=2000,
+                            help='Receitas por usuário')
+        parser.add_argument('--relations', type=int, default=5,
+                            help='Tags e ingredientes por receita')
+        parser.add_argument('--requests', type=int, default=20,
+                            help='Requisições medidas por endpoint')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints',
+            help='Mede só os endpoints com esse prefixo (repetível)'
+        )
+        parser.add_argument('--output', '-o',
+                            help='Arquivo JSON de resultados')
+        parser.add_argument('--baseline',
+                            help='Falha se houver regressão em relação a ele')
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Grava os resultados em --baseline em vez de comparar'
+        )
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Piora relativa aceita na latência')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='Piora absoluta sempre aceita, em ms')
+        parser.add_argument(
+            '--no-test-db', action='store_false', dest='test_db',
+            help='Usa o banco configurado em vez de criar um de teste'
+        )
+
+    def handle(self, *args, **options):
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline exige --baseline')
+
+        try:
+            setup_test_environment()
+            teardown = True
+        except RuntimeError:
+            # Já dentro da suíte de testes
+            teardown = False
+
+        connection = connections[DEFAULT_DB_ALIAS]
+        old_name = None
+        if options['test_db']:
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True
+            )
+        try:
+            results = self.run(connection, options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            if teardown:
+                teardown_test_environment()
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                out.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as out:
+                out.write(output + '\n')
+        elif options['baseline']:
+            with open(options['baseline']) as data:
+                baseline = json.load(data)
+            problems = regressions(
+                results, baseline, options['tolerance'],
+                options['min_delta_ms']
+            )
+            if problems:
+                raise CommandError(
+                    'Regressões em relação ao baseline:\n' +
+                    '\n'.join(problems)
+                )
+
+    def run(self, connection, options):
+        context = self.seed(options)
+        token = Token.objects.create(user=context['user'])
+        counter = itertools.count()
+        endpoints = {}
+        for name, build in _scenarios(context):
+            prefixes = options['endpoints']
+            if prefixes and not name.startswith(tuple(prefixes)):
+                continue
+            client = Client()
+            for _ in range(options['warmup']):
+                self.request(client, token, build(next(counter)), name)
+            latencies = []
+            queries = 0
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                request = build(next(counter))
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    self.request(client, token, request, name)
+                    latencies.append(time.perf_counter() - start)
+                queries += len(captured)
+            summary = summarize(latencies, time.perf_counter() - started)
+            summary['queries'] = queries / max(len(latencies), 1)
+            endpoints[name] = {
+                key: round(value, 3) for key, value in summary.items()
+            }
+
+        return {
+            'database': connection.vendor,
+            'seed': {
+                key: options[key] for key in (
+                    'users', 'tags', 'ingredients', 'recipes', 'relations'
+                )
+            },
+            'endpoints': endpoints,
+        }
+
+    def seed(self, options):
+        """Cria os usuários com seus catálogos e retorna o contexto"""
+        users = []
+        for index in range(max(options['users'], 1)):
+            user = get_user_model().objects.create_user(
+                'seed%d@email.com' % index, PASSWORD
+            )
+            RecipeImporter(user).run(_catalog(
+                max(options['tags'], 1), max(options['ingredients'], 1),
+                max(options['recipes'], 1), options['relations']
+            ))
+            users.append(user)
+
+        user = users[0]
+        return {
+            'user': user,
+            'email': user.email,
+            'recipe_id': Recipe.objects.filter(user=user).latest('id').id,
+            'tag_ids': list(Tag.objects.filter(
+                user=user
+            ).values_list('id', flat=True)[:3]),
+            'ingredient_ids': list(Ingredient.objects.filter(
+                user=user
+            ).values_list('id', flat=True)[:3]),
+        }
+
+    def request(self, client, token, request, name):
+        method, path, data, authenticated = request
+        extra = {}
+        if authenticated:
+            extra['HTTP_AUTHORIZATION'] = 'Token %s' % token.key
+        if method == 'get':
+            response = client.get(path, data, **extra)
+        else:
+            response = getattr(client, method)(
+                path, json.dumps(data), content_type='application/json',
+                **extra
+            )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise CommandError('%s: HTTP %d em %s %s' % (
+                name, response.status_code, method.upper(), path
+            ))
+
+        return response
@@ -0,0 +1,56 @@
+import json
+import os
+import signal
+import socket
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import Worker, queue_stats
+
+
+class Command(BaseCommand):
+    """Executa os trabalhos da fila em segundo plano (core.jobs)"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help='Trabalhos simultâneos (padrão: JOBS_CONCURRENCY)'
+        )
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help='Fila a processar (repetível; padrão: todas)'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Termina quando não houver trabalhos prontos'
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Mostra os totais da fila em JSON e termina'
+        )
+        parser.add_argument('--name', help='Nome do worker nos trabalhos')
+        parser.add_argument('--database', default=None)
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(
+                queue_stats(options['database']), indent=2
+            ))
+            return
+
+        worker = Worker(
+            options['name'] or '%s:%d' % (socket.gethostname(), os.getpid()),
+            concurrency=options['concurrency'],
+            queues=options['queues'],
+            using=options['database'],
+        )
+        if not options['burst']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: worker.stop())
+        self.stdout.write('Worker %s com %d threads' % (
+            worker.name, worker.concurrency
+        ))
+
+        worker.run(burst=options['burst'])
+
+        self.stdout.write(json.dumps(worker.metrics()))
@@ -1,21 +1,53 @@
+import random
 import time
 
-from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.health import check_database
 
 
 class Command(BaseCommand):
     """Comando do Django para pausar a execução até o BD estar pronto"""
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Tempo máximo de espera, em segundos'
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.5,
+            help='Espera inicial entre as tentativas, em segundos'
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=5,
+            help='Espera máxima entre as tentativas, em segundos'
+        )
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
         self.stdout.write('Aguandando o BD...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        attempt = 0
+        while True:
             try:
-                db_conn = connections['default']
+                check_database(options['database'])
+                break
             except OperationalError:
-                self.stdout.write('BD indisponível, esperando 1 segundo...')
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        'BD indisponível após %ss' % options['timeout']
+                    )
+                delay = min(
+                    options['max_delay'],
+                    options['initial_delay'] * 2 ** attempt
+                )
+                delay = min(remaining, random.uniform(delay / 2, delay))
+                self.stdout.write(
+                    'BD indisponível, esperando %.1f segundos...' % delay
+                )
+                time.sleep(delay)
+                attempt += 1
 
         self.stdout.write(self.style.SUCCESS('BD disponível!'))
@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+
+logger = logging.getLogger('core.sql')
+
+_current_stats = contextvars.ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """
+       Conta as consultas de uma requisição, soma o tempo gasto nelas e
+       guarda as `slowest` mais lentas
+    """
+
+    def __init__(self, slowest=3):
+        self.slowest = slowest
+        self.count = 0
+        self.duration = 0.0
+        self._heap = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def record(self, sql, duration):
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            if self.slowest <= 0:
+                return
+            self._seq += 1
+            item = (duration, self._seq, sql)
+            if len(self._heap) < self.slowest:
+                heapq.heappush(self._heap, item)
+            else:
+                heapq.heappushpop(self._heap, item)
+
+    def slowest_queries(self):
+        """Retorna [(segundos, sql)] das consultas mais lentas, da pior"""
+        return [
+            (duration, sql)
+            for duration, _, sql in sorted(self._heap, reverse=True)
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    """
+       Wrapper de execução instalado em todas as conexões. Mede a consulta
+       quando o contexto atual pertence a uma requisição instrumentada.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Instala `record_query` na conexão (signal `connection_created`)"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class QueryInstrumentationMiddleware:
+    """
+       Mede as consultas SQL de cada requisição, em todos os bancos.
+
+       As estatísticas ficam em uma ContextVar, então entram também as
+       consultas feitas nas threads do `sync_to_async` e do pool de BD das
+       views assíncronas (que copiam o contexto). O resumo vai para o logger
+       `core.sql` (com os campos em `extra`) e, com `SERVER_TIMING_ENABLED`,
+       para o header `Server-Timing`. Consultas feitas durante o envio de
+       respostas em streaming não entram.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Como o MiddlewareMixin do Django: sob ASGI a instância é
+            # chamada como corrotina e não força a cadeia síncrona
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.SQL_INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+
+        stats = QueryStats(settings.SQL_INSTRUMENTATION_SLOWEST)
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        if not settings.SQL_INSTRUMENTATION_ENABLED:
+            return await self.get_response(request)
+
+        stats = QueryStats(settings.SQL_INSTRUMENTATION_SLOWEST)
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+
+        return self.finish(request, response, stats, start)
+
+    def finish(self, request, response, stats, start):
+        total = time.perf_counter() - start
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = (
+                'db;dur=%.1f;desc="%d queries", app;dur=%.1f'
+                % (stats.duration * 1000, stats.count, total * 1000)
+            )
+        logger.info(
+            '%s %s %d: %d consultas, %.1fms de SQL em %.1fms',
+            request.method, request.path, response.status_code,
+            stats.count, stats.duration * 1000, total * 1000,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': stats.count,
+                'sql_ms': round(stats.duration * 1000, 3),
+                'total_ms': round(total * 1000, 3),
+                'slowest': [
+                    {'ms': round(duration * 1000, 3), 'sql': sql}
+                    for duration, sql in stats.slowest_queries()
+                ],
+            }
+        )
+
+        return response
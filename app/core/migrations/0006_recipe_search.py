@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# Cópia do documento de `recipe.search` desta versão: a migração não
+# depende do código da aplicação, que pode mudar depois
+PG_DOCUMENT = """
+    setweight(to_tsvector(%(config)s::regconfig, r.title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(t.name, ' ') FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(i.name, ' ') FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = r.id
+    ), '')), 'C')
+"""
+
+SQLITE_DOCUMENT = """
+    SELECT r.id, r.title,
+        coalesce((
+            SELECT group_concat(t.name, ' ') FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = r.id
+        ), ''),
+        coalesce((
+            SELECT group_concat(i.name, ' ') FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = r.id
+        ), '')
+    FROM core_recipe r
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE core_recipe ADD COLUMN search_vector tsvector'
+        )
+        schema_editor.execute(
+            'CREATE INDEX core_recipe_search_idx ON core_recipe '
+            'USING gin (search_vector)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE recipe_search USING fts5("
+            "title, tags, ingredients, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    else:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute(
+                'UPDATE core_recipe r SET search_vector = '
+                + PG_DOCUMENT % {'config': '%s'},
+                [settings.RECIPE_SEARCH_CONFIG] * 3
+            )
+        else:
+            cursor.execute(
+                'INSERT INTO recipe_search (rowid, title, tags, ingredients)'
+                + SQLITE_DOCUMENT
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE core_recipe DROP COLUMN search_vector'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_user_name_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
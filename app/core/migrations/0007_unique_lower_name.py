@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+
+RELATIONS = (('Tag', 'tags'), ('Ingredient', 'ingredients'))
+
+# O mesmo documento de busca da 0006
+PG_DOCUMENT = """
+    setweight(to_tsvector(%(config)s::regconfig, r.title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(t.name, ' ') FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(i.name, ' ') FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = r.id
+    ), '')), 'C')
+"""
+
+SQLITE_DOCUMENT = """
+    SELECT r.id, r.title,
+        coalesce((
+            SELECT group_concat(t.name, ' ') FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = r.id
+        ), ''),
+        coalesce((
+            SELECT group_concat(i.name, ' ') FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = r.id
+        ), '')
+    FROM core_recipe r
+"""
+
+
+def update_search_index(connection, recipe_ids):
+    """Recalcula o documento de busca das receitas informadas"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'UPDATE core_recipe r SET search_vector = '
+                + PG_DOCUMENT % {'config': '%s'} + ' WHERE r.id = ANY(%s)',
+                [settings.RECIPE_SEARCH_CONFIG] * 3 + [recipe_ids]
+            )
+        elif connection.vendor == 'sqlite':
+            placeholders = ', '.join(['%s'] * len(recipe_ids))
+            cursor.execute(
+                'DELETE FROM recipe_search WHERE rowid IN (%s)'
+                % placeholders, recipe_ids
+            )
+            cursor.execute(
+                'INSERT INTO recipe_search (rowid, title, tags, ingredients)'
+                + SQLITE_DOCUMENT + ' WHERE r.id IN (%s)' % placeholders,
+                recipe_ids
+            )
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+       Mantém o menor id de cada grupo `(user, lower(name))`, passa as
+       receitas dos duplicados para ele e apaga os duplicados
+    """
+    using = schema_editor.connection.alias
+    Recipe = apps.get_model('core', 'Recipe')
+    recipe_ids = set()
+    for model_name, relation in RELATIONS:
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+        field = '%s_id' % model_name.lower()
+        objects = model.objects.using(using).annotate(lower_name=Lower('name'))
+        groups = objects.values('user_id', 'lower_name').annotate(
+            keep=Min('id'), total=Count('id')
+        ).filter(total__gt=1)
+        for group in groups.iterator():
+            duplicates = list(objects.filter(
+                user_id=group['user_id'], lower_name=group['lower_name']
+            ).exclude(id=group['keep']).values_list('id', flat=True))
+            rows = through.objects.using(using)
+            recipes = set(rows.filter(**{
+                '%s__in' % field: duplicates
+            }).values_list('recipe_id', flat=True))
+            recipes.difference_update(rows.filter(**{
+                field: group['keep']
+            }).values_list('recipe_id', flat=True))
+            rows.bulk_create([
+                through(recipe_id=recipe_id, **{field: group['keep']})
+                for recipe_id in recipes
+            ])
+            recipe_ids.update(rows.filter(**{
+                '%s__in' % field: duplicates
+            }).values_list('recipe_id', flat=True))
+            rows.filter(**{'%s__in' % field: duplicates}).delete()
+            model.objects.using(using).filter(id__in=duplicates).delete()
+
+    if recipe_ids:
+        update_search_index(schema_editor.connection, sorted(recipe_ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX core_tag_user_lower_name_uniq '
+            'ON core_tag (user_id, lower(name))',
+            'DROP INDEX IF EXISTS core_tag_user_lower_name_uniq',
+        ),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX core_ingr_user_lower_name_uniq '
+            'ON core_ingredient (user_id, lower(name))',
+            'DROP INDEX IF EXISTS core_ingr_user_lower_name_uniq',
+        ),
+    ]
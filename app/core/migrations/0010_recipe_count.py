@@ -0,0 +1,55 @@
+# Generated by Django 3.1.12 on 2026-10-18 21:13
+
+from django.db import migrations, models
+
+
+UNIQUE_INDEXES = [
+    'CREATE UNIQUE INDEX IF NOT EXISTS core_tag_user_lower_name_uniq '
+    'ON core_tag (user_id, lower(name))',
+    'CREATE UNIQUE INDEX IF NOT EXISTS core_ingr_user_lower_name_uniq '
+    'ON core_ingredient (user_id, lower(name))',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_job'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, UNIQUE_INDEXES),
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_ingr_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_tag_user_count_idx'),
+        ),
+        # O AddField/RemoveField do SQLite reconstrói a tabela e perde os
+        # índices únicos criados com RunSQL na 0007
+        migrations.RunSQL(UNIQUE_INDEXES, migrations.RunSQL.noop),
+        migrations.RunSQL(
+            'UPDATE core_tag SET recipe_count = ('
+            'SELECT COUNT(*) FROM core_recipe_tags '
+            'WHERE core_recipe_tags.tag_id = core_tag.id)',
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            'UPDATE core_ingredient SET recipe_count = ('
+            'SELECT COUNT(*) FROM core_recipe_ingredients '
+            'WHERE core_recipe_ingredients.ingredient_id = core_ingredient.id)',
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.1.12 on 2026-10-18 21:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+UNIQUE_INDEXES = [
+    'CREATE UNIQUE INDEX IF NOT EXISTS core_tag_user_lower_name_uniq '
+    'ON core_tag (user_id, lower(name))',
+    'CREATE UNIQUE INDEX IF NOT EXISTS core_ingr_user_lower_name_uniq '
+    'ON core_ingredient (user_id, lower(name))',
+]
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_count'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, UNIQUE_INDEXES),
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to='core.user')),
+                ('database', models.CharField(max_length=100)),
+                ('locked', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+        # O AlterField do SQLite reconstrói as tabelas e perde os índices
+        # únicos criados com RunSQL na 0007
+        migrations.RunSQL(UNIQUE_INDEXES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,103 @@
+from django.db import router
+from django.http import StreamingHttpResponse
+from rest_framework import mixins
+from rest_framework.response import Response
+
+from core.db import sharding
+
+
+def iter_objects(queryset, chunk_size):
+    """
+       Percorre a queryset em blocos de `chunk_size` objetos, preservando a
+       ordem e os `prefetch_related` (que o `iterator()` ignora)
+    """
+    if not queryset._prefetch_related_lookups:
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    pks = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(pks), chunk_size):
+        chunk = pks[start:start + chunk_size]
+        objs = {obj.pk: obj for obj in queryset.filter(pk__in=chunk)}
+        for pk in chunk:
+            if pk in objs:
+                yield objs[pk]
+
+
+class StreamingListMixin(mixins.ListModelMixin):
+    """
+       Listagem que responde em streaming quando o renderer escolhido tem
+       `streaming = True`. Respostas paginadas seguem o caminho normal. Sob
+       ASGI as linhas são lidas pelo handler de `core.asgi`, fora do event
+       loop.
+
+       Com `list_values` a listagem lê só esses campos com `.values()` e usa
+       os dicts como resposta, sem instanciar models nem passar pelo
+       serializer; os campos devem ser os mesmos (e na mesma ordem) da saída
+       do serializer, com valores que ele não transforma.
+    """
+    list_values = None
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        streaming = getattr(renderer, 'streaming', False)
+        if not streaming and not self.list_values:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.list_values:
+            queryset = queryset.values(*self.list_values)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self._list_data(page))
+
+        if not streaming:
+            return Response(self._list_data(queryset))
+
+        # O banco é escolhido agora: as linhas são lidas depois que a view
+        # retorna, fora da requisição (shard do usuário, réplica)
+        queryset = queryset.using(queryset.db)
+        if self.list_values:
+            rows = queryset.iterator(chunk_size=renderer.chunk_size)
+        else:
+            serializer = self.get_serializer()
+            rows = (
+                serializer.to_representation(obj)
+                for obj in iter_objects(queryset, renderer.chunk_size)
+            )
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += '; charset=%s' % renderer.charset
+
+        return StreamingHttpResponse(
+            renderer.iter_render(rows), content_type=content_type
+        )
+
+    def _list_data(self, objs):
+        if self.list_values:
+            return list(objs)
+        return self.get_serializer(objs, many=True).data
+
+
+class UserShardMixin:
+    """
+       Direciona ao shard do usuário logado (core.db.sharding) os acessos
+       aos models particionados feitos durante a requisição
+    """
+    _shard_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._shard_token = sharding.set_user(request.user.pk)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._shard_token is not None:
+            sharding.reset_user(self._shard_token)
+            self._shard_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def user_database(self):
+        """Banco dos dados do usuário logado, para transações"""
+        return router.db_for_write(
+            self.queryset.model, instance=self.request.user
+        )
@@ -1,7 +1,17 @@
+import os
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
+from django.utils import timezone
+
+
+def recipe_image_file_path(instance, filename):
+    """Gera o caminho da nova imagem da receita, com um nome único"""
+    ext = os.path.splitext(filename)[1].lower()
+    return os.path.join('uploads', 'recipe', '%s%s' % (uuid.uuid4(), ext))
 
 
 class UserManager(BaseUserManager):
@@ -40,26 +50,84 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
-class Tag(models.Model):
+class RecipeCountMixin:
+    """
+       `recipe_count` só muda por UPDATE com incremento (recipe.counts):
+       o `save()` de um objeto já existente não grava o valor em memória,
+       que pode estar desatualizado
+    """
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'recipe_count'
+            ]
+        super().save(*args, **kwargs)
+
+
+class Tag(RecipeCountMixin, models.Model):
     """Tag da receita"""
     name = models.CharField(max_length=120)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.DO_NOTHING
+        on_delete=models.DO_NOTHING,
+        # Sem FK no BD: com vários shards o usuário fica em outro banco
+        db_constraint=False
     )
+    recipe_count = models.PositiveIntegerField(
+        default=0
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', 'id'],
+                name='core_tag_user_count_idx'
+            ),
+        ]
+        # Nomes únicos por usuário sem diferenciar maiúsculas: índice único
+        # em (user_id, lower(name)) criado com RunSQL na migração 0007. No
+        # SQLite o AddField reconstrói a tabela sem ele, então migrações que
+        # alteram a tabela precisam recriá-lo (como a 0010 e a 0011)
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(RecipeCountMixin, models.Model):
     """Ingrediente da receita"""
     name = models.CharField(max_length=120)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.DO_NOTHING
+        on_delete=models.DO_NOTHING,
+        # Sem FK no BD: com vários shards o usuário fica em outro banco
+        db_constraint=False
+    )
+    recipe_count = models.PositiveIntegerField(
+        default=0
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_ingr_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', 'id'],
+                name='core_ingr_user_count_idx'
+            ),
+        ]
+        # Nomes únicos por usuário sem diferenciar maiúsculas: índice único
+        # em (user_id, lower(name)) criado com RunSQL na migração 0007. No
+        # SQLite o AddField reconstrói a tabela sem ele, então migrações que
+        # alteram a tabela precisam recriá-lo (como a 0010 e a 0011)
+
     def __str__(self):
         return self.name
 
@@ -68,7 +136,9 @@ class Recipe(models.Model):
     """Model da receita"""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.DO_NOTHING
+        on_delete=models.DO_NOTHING,
+        # Sem FK no BD: com vários shards o usuário fica em outro banco
+        db_constraint=False
     )
     title = models.CharField(
         max_length=255
@@ -88,6 +158,116 @@ class Recipe(models.Model):
     tags = models.ManyToManyField(
         'Tag'
     )
+    image = models.ImageField(
+        null=True,
+        blank=True,
+        upload_to=recipe_image_file_path
+    )
+    thumbnails_ready = models.BooleanField(
+        default=False
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class Job(models.Model):
+    """Trabalho da fila de segundo plano (core.jobs)"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pendente'),
+        (RUNNING, 'Executando'),
+        (DONE, 'Concluído'),
+        (FAILED, 'Falhou'),
+    )
+
+    name = models.CharField(
+        max_length=100
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True
+    )
+    queue = models.CharField(
+        max_length=50,
+        default='default'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now
+    )
+    attempts = models.IntegerField(
+        default=0
+    )
+    max_attempts = models.IntegerField(
+        default=5
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField(
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'queue', 'run_at', 'id'],
+                name='core_job_claim_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return '%s #%s' % (self.name, self.pk)
+
+
+class UserShard(models.Model):
+    """
+       Banco (shard) com as tags, ingredientes e receitas do usuário
+       (core.db.sharding). Fica sempre no `default`.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard'
+    )
+    database = models.CharField(
+        max_length=100
+    )
+    locked = models.BooleanField(
+        default=False
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
+
+    def __str__(self):
+        return '%s: %s' % (self.user_id, self.database)
@@ -0,0 +1,78 @@
+"""
+Renderers JSON da API, selecionados em REST_FRAMEWORK no settings.
+
+`FastJSONRenderer` usa o orjson quando instalado e cai para o renderer do
+DRF (json da stdlib) caso contrário. `StreamingJSONRenderer` também gera as
+listagens em pedaços, junto com `StreamingListMixin`, sem montar a resposta
+inteira em memória.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+_encoder = encoders.JSONEncoder()
+
+
+def dumps(data):
+    """Serializa para bytes JSON compactos, como o JSONRenderer do DRF"""
+    if orjson is not None:
+        return orjson.dumps(
+            data, default=_encoder.default, option=orjson.OPT_NON_STR_KEYS
+        )
+
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer que usa o orjson quando disponível"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(
+                accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        return dumps(data)
+
+
+class StreamingJSONRenderer(FastJSONRenderer):
+    """
+       Renderer que, além do `render` normal, gera listas em pedaços de
+       `chunk_size` itens
+    """
+    streaming = True
+    chunk_size = 1000
+
+    def iter_render(self, items):
+        """Gera o array JSON dos itens em pedaços de bytes"""
+        yield b'['
+        separator = b''
+        chunk = []
+        for item in items:
+            chunk.append(dumps(item))
+            if len(chunk) >= self.chunk_size:
+                yield separator + b','.join(chunk)
+                separator = b','
+                chunk = []
+        if chunk:
+            yield separator + b','.join(chunk)
+        yield b']'
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """Renderer de JSON delimitado por linhas (um objeto por linha)"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dumps(data) + b'\n'
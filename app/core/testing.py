@@ -0,0 +1,188 @@
+"""
+Utilitários para os testes.
+
+`query_budget` declara quantas consultas uma ação de view pode fazer:
+
+    @query_budget(TagViewSet, 'list', 1)
+    def test_retrieve_tags(self):
+        ...
+
+Durante o teste a ação é envolvida por um contador de consultas e o teste
+falha se alguma chamada passar do orçamento ou se a ação não for chamada.
+
+`ReplicaDatabaseMixin` e `ShardDatabasesMixin` criam BDs SQLite extras para
+os testes das réplicas de leitura e dos shards.
+
+`asgi_get` faz uma requisição pelo handler ASGI do projeto (core.asgi), como
+um servidor ASGI faria; o `AsyncClient` não passa por ele.
+"""
+import functools
+from contextlib import ContextDecorator
+from unittest import mock
+
+from asgiref.testing import ApplicationCommunicator
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.asgi import ASGIHandler
+from core.db import sharding
+
+
+class query_budget(ContextDecorator):
+    """Limita as consultas de `view.action` (decorator ou context manager)"""
+
+    def __init__(self, view, action, max_queries, using=DEFAULT_DB_ALIAS):
+        self.view = view
+        self.action = action
+        self.max_queries = max_queries
+        self.using = using
+
+    @property
+    def name(self):
+        return '%s.%s' % (self.view.__name__, self.action)
+
+    def __enter__(self):
+        self.calls = []
+        original = getattr(self.view, self.action)
+
+        @functools.wraps(original)
+        def counted(view, *args, **kwargs):
+            connection = connections[self.using]
+            with CaptureQueriesContext(connection) as queries:
+                response = original(view, *args, **kwargs)
+            self.calls.append(queries.captured_queries)
+            return response
+
+        self._patcher = mock.patch.object(self.view, self.action, counted)
+        self._patcher.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._patcher.stop()
+        if exc_type is not None:
+            return False
+
+        if not self.calls:
+            raise AssertionError('%s não foi chamada' % self.name)
+        for queries in self.calls:
+            if len(queries) > self.max_queries:
+                raise AssertionError(
+                    '%s fez %d consultas (orçamento: %d):\n%s' % (
+                        self.name, len(queries), self.max_queries,
+                        '\n'.join(
+                            '%d. %s' % (index, query['sql'])
+                            for index, query in enumerate(queries, 1)
+                        )
+                    )
+                )
+        return False
+
+
+class ExtraDatabasesMixin:
+    """
+       Cria para a classe de teste os BDs de `extra_databases`, SQLites em
+       memória com as migrações aplicadas e sem dados em comum com o
+       `default`
+    """
+    extra_databases = ()
+
+    @classmethod
+    def setUpClass(cls):
+        for alias in cls.extra_databases:
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:',
+            }
+            connections.ensure_defaults(alias)
+            connections.prepare_test_settings(alias)
+            connections[alias].creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+        cls.databases = set(cls.databases) | set(cls.extra_databases)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            for alias in cls.extra_databases:
+                connections[alias].creation.destroy_test_db(
+                    ':memory:', verbosity=0
+                )
+                del connections[alias]
+                del connections.databases[alias]
+
+
+class ReplicaDatabaseMixin(ExtraDatabasesMixin):
+    """Simula uma réplica (`replica`): só tem o que o teste gravar nela"""
+    extra_databases = ('replica',)
+
+
+class ShardDatabasesMixin(ExtraDatabasesMixin):
+    """
+       Particiona os dados de receitas entre o `default` e os shards
+       `shard_1` e `shard_2`
+    """
+    extra_databases = ('shard_1', 'shard_2')
+
+    @classmethod
+    def setUpClass(cls):
+        cls._shard_settings = override_settings(
+            SHARD_DATABASES=['default', *cls.extra_databases],
+            SHARD_PLACEMENT=[]
+        )
+        cls._shard_settings.enable()
+        try:
+            super().setUpClass()
+            for alias in cls.extra_databases:
+                sharding.reserve_id_range(alias)
+        except Exception:
+            cls._shard_settings.disable()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            cls._shard_settings.disable()
+
+    def setUp(self):
+        super().setUp()
+        sharding.shard_map.clear()
+        self.addCleanup(sharding.shard_map.clear)
+
+
+async def asgi_get(path, headers=(), timeout=5):
+    """
+       GET pelo `core.asgi.ASGIHandler`. Retorna o status, os headers, o
+       corpo e o número de mensagens em que o corpo veio.
+    """
+    communicator = ApplicationCommunicator(ASGIHandler(), {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')] + [
+            (name.encode(), value.encode()) for name, value in headers
+        ],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    })
+    await communicator.send_input({'type': 'http.request'})
+    start = await communicator.receive_output(timeout)
+    body = b''
+    messages = 0
+    while True:
+        message = await communicator.receive_output(timeout)
+        body += message.get('body', b'')
+        messages += 1
+        if not message.get('more_body'):
+            break
+    await communicator.wait(timeout)
+
+    return start['status'], dict(start['headers']), body, messages
@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from core.benchmark import regressions
+
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+SMALL = {
+    'users': 1, 'tags': 5, 'ingredients': 5, 'recipes': 10,
+    'relations': 2, 'requests': 2, 'warmup': 0, 'test_db': False,
+}
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class BenchCommandTests(TransactionTestCase):
+    """Testa o comando de benchmark dos endpoints"""
+
+    def bench(self, **options):
+        out = StringIO()
+        call_command('bench', stdout=out, **dict(SMALL, **options))
+        return json.loads(out.getvalue())
+
+    def test_bench_all_endpoints(self):
+        """Testa se todos os endpoints são medidos e reportados"""
+        results = self.bench()
+
+        self.assertEqual(results['database'], 'sqlite')
+        self.assertEqual(results['seed']['recipes'], 10)
+        for name in ('healthz', 'user.create', 'user.token', 'user.me',
+                     'tags.list', 'ingredients.bulk_create',
+                     'recipes.list', 'recipes.create', 'recipes.export'):
+            self.assertIn(name, results['endpoints'])
+        tags = results['endpoints']['tags.list']
+        self.assertEqual(tags['requests'], 2)
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput', 'queries'):
+            self.assertIn(key, tags)
+        self.assertGreater(results['endpoints']['recipes.list']['queries'], 0)
+
+    def test_bench_fails_on_regression(self):
+        """Testa se o comando falha quando o baseline é superado"""
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        baseline = {'endpoints': {'recipes.list': {
+            'p50_ms': 10000.0, 'p95_ms': 10000.0, 'queries': 0.0,
+        }}}
+        with os.fdopen(fd, 'w') as output:
+            json.dump(baseline, output)
+
+        with self.assertRaisesMessage(CommandError, 'recipes.list: queries'):
+            self.bench(endpoints=['recipes.list'], baseline=path)
+
+    def test_save_baseline(self):
+        """Testa se o baseline gravado serve para a comparação seguinte"""
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        results = self.bench(
+            endpoints=['healthz'], baseline=path, save_baseline=True
+        )
+
+        with open(path) as data:
+            baseline = json.load(data)
+        self.assertEqual(baseline, results)
+        self.assertEqual(regressions(results, baseline), [])
+
+    def test_save_baseline_requires_path(self):
+        """Testa se --save-baseline sem --baseline é recusado"""
+        with self.assertRaisesMessage(CommandError, '--baseline'):
+            self.bench(save_baseline=True)
+
+
+class RegressionTests(SimpleTestCase):
+    """Testa a comparação dos resultados com o baseline"""
+
+    baseline = {'endpoints': {'tags.list': {
+        'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 2.0,
+    }}}
+
+    def result(self, **values):
+        endpoint = dict(self.baseline['endpoints']['tags.list'], **values)
+        return {'endpoints': {'tags.list': endpoint}}
+
+    def test_within_tolerance(self):
+        """Testa se pioras dentro da tolerância são aceitas"""
+        self.assertEqual(regressions(
+            self.result(p50_ms=11.9, p95_ms=23.9), self.baseline, 0.2
+        ), [])
+
+    def test_latency_regression(self):
+        """Testa se a piora de latência acima da tolerância é apontada"""
+        problems = regressions(self.result(p95_ms=30.0), self.baseline, 0.2)
+
+        self.assertEqual(len(problems), 1)
+        self.assertIn('p95_ms', problems[0])
+
+    def test_min_delta(self):
+        """Testa se pioras pequenas em valores baixos são ignoradas"""
+        baseline = {'endpoints': {'healthz': {
+            'p50_ms': 0.2, 'p95_ms': 0.3, 'queries': 0.0,
+        }}}
+        result = {'endpoints': {'healthz': {
+            'p50_ms': 0.6, 'p95_ms': 0.9, 'queries': 0.0,
+        }}}
+
+        self.assertEqual(regressions(result, baseline, 0.2, 1.0), [])
+
+    def test_query_regression(self):
+        """Testa se qualquer consulta a mais é apontada"""
+        problems = regressions(self.result(queries=3.0), self.baseline)
+
+        self.assertEqual(problems, ['tags.list: queries 3.0 > 2.0'])
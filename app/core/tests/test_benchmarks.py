@@ -0,0 +1,58 @@
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmark import benchmark
+from core.renderers import FastJSONRenderer, StreamingJSONRenderer
+
+
+def rows(count):
+    """Gera itens parecidos com os das listagens"""
+    for i in range(count):
+        yield OrderedDict([('id', i), ('name', 'Ingrediente número %d' % i)])
+
+
+@benchmark
+class RendererBenchmark(SimpleTestCase):
+    """Mede tempo e pico de memória para renderizar 100k itens"""
+    items = 100000
+
+    def _measure(self, render):
+        tracemalloc.start()
+        start = time.perf_counter()
+        size = render()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return size, elapsed, peak
+
+    def _report(self, name, size, elapsed, peak):
+        # Só o pico do tracemalloc de cada renderer: o maxrss é do processo
+        # todo e nunca diminui, então seria igual para todos
+        print('\n%s: %.1f MB em %.3fs, pico %.1f MB' % (
+            name, size / 2 ** 20, elapsed, peak / 2 ** 20
+        ))
+
+    def test_render(self):
+        results = OrderedDict()
+        results['JSONRenderer (stdlib)'] = self._measure(
+            lambda: len(JSONRenderer().render(list(rows(self.items))))
+        )
+        results['FastJSONRenderer'] = self._measure(
+            lambda: len(FastJSONRenderer().render(list(rows(self.items))))
+        )
+        results['StreamingJSONRenderer'] = self._measure(
+            lambda: sum(
+                len(chunk) for chunk in
+                StreamingJSONRenderer().iter_render(rows(self.items))
+            )
+        )
+
+        sizes = {size for size, _, _ in results.values()}
+        self.assertEqual(len(sizes), 1)
+        for name, result in results.items():
+            self._report(name, *result)
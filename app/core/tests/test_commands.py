@@ -1,6 +1,7 @@
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
@@ -10,16 +11,54 @@ class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
         """Testa se a aplicação está esperando o banco ficar pronto"""
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+            gi.return_value = MagicMock()
             call_command('wait_for_db')
 
             self.assertEqual(gi.call_count, 1)
+            cursor = gi.return_value.cursor.return_value.__enter__()
+            cursor.execute.assert_called_once_with('SELECT 1')
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Testa se a aplicação está esperando o banco"""
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+            gi.side_effect = [OperationalError] * 5 + [MagicMock()]
             call_command('wait_for_db')
 
             self.assertEqual(gi.call_count, 6)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_query_fails(self, ts):
+        """
+           Testa se a conexão só é considerada pronta quando a consulta
+           de teste funciona
+        """
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = [OperationalError] * 2 + [None]
+        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+            gi.return_value = conn
+            call_command('wait_for_db')
+
+        self.assertEqual(cursor.execute.call_count, 3)
+        self.assertEqual(ts.call_count, 2)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts):
+        """Testa se a espera cresce exponencialmente até o máximo"""
+        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+            gi.side_effect = [OperationalError] * 6 + [MagicMock()]
+            call_command('wait_for_db', initial_delay=1, max_delay=8)
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        for delay, limit in zip(delays, [1, 2, 4, 8, 8, 8]):
+            self.assertGreaterEqual(delay, limit / 2)
+            self.assertLessEqual(delay, limit)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Testa se o comando falha quando o tempo limite acaba"""
+        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+            gi.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0)
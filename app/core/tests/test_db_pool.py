@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+
+from django.test import SimpleTestCase
+
+from core.db import pool
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+def validate(conn):
+    conn.execute('SELECT 1')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Testa o pool de conexões usando o SQLite no lugar do PostgreSQL"""
+
+    def make_pool(self, **kwargs):
+        options = {'min_size': 1, 'max_size': 2, 'timeout': 0.1}
+        options.update(kwargs)
+        connection_pool = ConnectionPool(
+            connect=lambda: sqlite3.connect(
+                ':memory:', check_same_thread=False
+            ),
+            validate=validate,
+            **options
+        )
+        self.addCleanup(connection_pool.close)
+
+        return connection_pool
+
+    def test_min_size_opened_upfront(self):
+        """Testa se o pool já abre `min_size` conexões"""
+        connection_pool = self.make_pool(min_size=2)
+
+        stats = connection_pool.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['idle'], 2)
+
+    def test_connection_reused(self):
+        """Testa se a conexão devolvida é reaproveitada"""
+        connection_pool = self.make_pool()
+
+        conn = connection_pool.getconn()
+        connection_pool.putconn(conn)
+
+        self.assertIs(connection_pool.getconn(), conn)
+        self.assertEqual(
+            connection_pool.stats()['connections_created'], 1
+        )
+
+    def test_checkout_timeout(self):
+        """Testa se esgotar o pool gera PoolTimeout após o tempo limite"""
+        connection_pool = self.make_pool()
+        connection_pool.getconn()
+        connection_pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            connection_pool.getconn()
+
+        self.assertEqual(connection_pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        """Testa se quem espera recebe a conexão devolvida"""
+        connection_pool = self.make_pool(max_size=1, timeout=2)
+        conn = connection_pool.getconn()
+        result = []
+        waiter = threading.Thread(
+            target=lambda: result.append(connection_pool.getconn())
+        )
+
+        waiter.start()
+        connection_pool.putconn(conn)
+        waiter.join()
+
+        self.assertEqual(result, [conn])
+
+    def test_broken_connection_replaced(self):
+        """Testa se uma conexão que falha no health check é descartada"""
+        connection_pool = self.make_pool()
+        conn = connection_pool.getconn()
+        conn.close()
+        connection_pool.putconn(conn)
+
+        new_conn = connection_pool.getconn()
+
+        self.assertIsNot(new_conn, conn)
+        validate(new_conn)
+        stats = connection_pool.stats()
+        self.assertEqual(stats['failed_health_checks'], 1)
+        self.assertEqual(stats['connections_discarded'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_idle_connections_expire(self):
+        """Testa se conexões ociosas além do mínimo são fechadas"""
+        connection_pool = self.make_pool(min_size=0, max_idle=-1)
+        first = connection_pool.getconn()
+        connection_pool.putconn(first)
+
+        second = connection_pool.getconn()
+
+        self.assertIsNot(second, first)
+        self.assertEqual(connection_pool.stats()['size'], 1)
+
+    def test_pool_registry_stats(self):
+        """Testa as estatísticas expostas por alias"""
+        self.addCleanup(pool.close_pools)
+        created = pool.get_pool('teste', self.make_pool)
+
+        self.assertIs(pool.get_pool('teste', self.make_pool), created)
+        self.assertEqual(pool.pool_stats()['teste']['size'], 1)
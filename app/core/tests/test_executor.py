@@ -0,0 +1,38 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from core.executor import BoundedExecutor, PoolSaturated
+
+
+class BoundedExecutorTests(SimpleTestCase):
+    """Testa o pool de threads com fila limitada"""
+
+    def setUp(self):
+        self.pool = BoundedExecutor(max_workers=1, max_queue=1, name='teste')
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.shutdown()
+
+    def test_submit_returns_result(self):
+        """Testa se o resultado da função é retornado"""
+        future = self.pool.submit(sum, [1, 2, 3])
+
+        self.assertEqual(future.result(), 6)
+
+    def test_rejects_when_saturated(self):
+        """Testa se o pool recusa trabalhos além do limite da fila"""
+        running = self.pool.submit(self.release.wait)
+        queued = self.pool.submit(self.release.wait)
+
+        with self.assertRaises(PoolSaturated):
+            self.pool.submit(self.release.wait)
+
+        self.assertEqual(self.pool.stats()['pending'], 2)
+        self.assertEqual(self.pool.stats()['rejected'], 1)
+        self.release.set()
+        running.result()
+        queued.result()
+        self.assertEqual(self.pool.submit(sum, [1]).result(), 1)
@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+from django.urls import reverse
+
+from core.db import pool
+from core.health import ReadinessProbe
+
+
+HEALTHZ_URL = reverse('healthz')
+
+
+class ReadinessProbeTests(TestCase):
+    """Testa o resultado em cache da verificação do BD"""
+
+    def test_result_cached(self):
+        """Testa se a verificação é reaproveitada dentro do ttl"""
+        check = MagicMock()
+        probe = ReadinessProbe(check=check, ttl=60)
+
+        self.assertTrue(probe.is_ready())
+        self.assertTrue(probe.is_ready())
+        self.assertEqual(check.call_count, 1)
+
+    def test_result_refreshed(self):
+        """Testa se a verificação é refeita quando o resultado vence"""
+        check = MagicMock(side_effect=[None, Exception])
+        probe = ReadinessProbe(check=check, ttl=0)
+
+        self.assertTrue(probe.is_ready())
+        self.assertFalse(probe.is_ready())
+
+
+class HealthzTests(TestCase):
+    """Testa o endpoint /healthz"""
+
+    def test_liveness(self):
+        """Testa se a liveness responde sem consultar o BD"""
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'ok')
+
+    def test_readiness(self):
+        """Testa se a readiness responde com o BD disponível"""
+        with patch('core.views.readiness', ReadinessProbe()):
+            res = self.client.get(HEALTHZ_URL, {'mode': 'ready'})
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_readiness_database_down(self):
+        """Testa se a readiness responde 503 com o BD indisponível"""
+        probe = ReadinessProbe(check=MagicMock(side_effect=Exception))
+        with patch('core.views.readiness', probe):
+            res = self.client.get(HEALTHZ_URL, {'mode': 'ready'})
+
+        self.assertEqual(res.status_code, 503)
+
+    def test_readiness_detail_pool_stats(self):
+        """Testa se o detalhe da readiness traz as estatísticas dos pools"""
+        self.addCleanup(pool.close_pools)
+        connection_pool = pool.get_pool('default', lambda: pool.ConnectionPool(
+            connect=MagicMock, min_size=1, max_size=3
+        ))
+        connection_pool.getconn()
+
+        with patch('core.views.readiness', ReadinessProbe()):
+            res = self.client.get(HEALTHZ_URL, {'mode': 'ready', 'detail': 1})
+
+        self.assertEqual(res.status_code, 200)
+        data = res.json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertEqual(data['pools']['default']['in_use'], 1)
+        self.assertEqual(data['pools']['default']['max_size'], 3)
+
+    def test_readiness_detail_database_down(self):
+        """Testa se o detalhe também responde 503 com o BD indisponível"""
+        probe = ReadinessProbe(check=MagicMock(side_effect=Exception))
+        with patch('core.views.readiness', probe):
+            res = self.client.get(HEALTHZ_URL, {'mode': 'ready', 'detail': 1})
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'unavailable', 'pools': {}})
@@ -0,0 +1,212 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+calls = []
+
+
+@jobs.task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.task('tests.broken', max_attempts=2)
+def broken():
+    raise ValueError('quebrou')
+
+
+@jobs.task('tests.limited', max_concurrency=1)
+def limited():
+    pass
+
+
+@jobs.task('tests.other', queue='other')
+def other():
+    pass
+
+
+class JobQueueTests(TestCase):
+    """Testa a fila de trabalhos no BD"""
+
+    def setUp(self):
+        calls.clear()
+        self.worker = jobs.Worker('worker-1', concurrency=2)
+
+    def test_claim(self):
+        """Testa se o trabalho é pego uma única vez"""
+        job = record.enqueue(value=1)
+
+        claimed = jobs.claim('worker-1', 5)
+
+        self.assertEqual([item.id for item in claimed], [job.id])
+        self.assertEqual(claimed[0].status, Job.RUNNING)
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(claimed[0].locked_by, 'worker-1')
+        self.assertEqual(jobs.claim('worker-2', 5), [])
+
+    def test_claim_respects_run_at_and_queue(self):
+        """Testa se trabalhos futuros ou de outras filas ficam de fora"""
+        record.enqueue(delay=60, value=1)
+        job = other.enqueue()
+
+        self.assertEqual(jobs.claim('worker-1', 5, queues=['default']), [])
+        self.assertEqual(
+            [item.id for item in jobs.claim('worker-1', 5)], [job.id]
+        )
+
+    def test_execute(self):
+        """Testa se o trabalho executado fica como concluído"""
+        record.enqueue(value=7)
+        job, = jobs.claim('worker-1', 1)
+
+        self.assertEqual(self.worker.execute(job), 'succeeded')
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [7])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(self.worker.metrics()['succeeded'], 1)
+
+    @override_settings(JOBS_RETRY_BACKOFF=10, JOBS_RETRY_BACKOFF_MAX=100)
+    def test_retry_with_backoff(self):
+        """Testa as novas tentativas com espera e a falha definitiva"""
+        broken.enqueue()
+        job, = jobs.claim('worker-1', 1)
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(self.worker.execute(job), 'retried')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertIn('ValueError: quebrou', job.last_error)
+        wait = (job.run_at - timezone.now()).total_seconds()
+        self.assertTrue(4 <= wait <= 10, wait)
+
+        Job.objects.update(run_at=timezone.now())
+        job, = jobs.claim('worker-1', 1)
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(self.worker.execute(job), 'failed')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        metrics = self.worker.metrics()['tasks']['tests.broken']
+        self.assertEqual((metrics['retried'], metrics['failed']), (1, 1))
+
+    @override_settings(JOBS_RETRY_BACKOFF=1, JOBS_RETRY_BACKOFF_MAX=30)
+    def test_backoff_limit(self):
+        """Testa se a espera cresce exponencialmente até o máximo"""
+        self.assertTrue(0.5 <= jobs.backoff(1) <= 1)
+        self.assertTrue(4 <= jobs.backoff(4) <= 8)
+        self.assertTrue(15 <= jobs.backoff(20) <= 30)
+
+    def test_unknown_task(self):
+        """Testa se uma tarefa desconhecida falha sem novas tentativas"""
+        Job.objects.create(name='tests.missing')
+        job, = jobs.claim('worker-1', 1)
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(self.worker.execute(job), 'failed')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+        with self.assertRaises(LookupError):
+            jobs.enqueue('tests.missing')
+
+    def test_max_concurrency(self):
+        """Testa se o limite de trabalhos simultâneos da tarefa é mantido"""
+        for _ in range(3):
+            limited.enqueue()
+        job = record.enqueue(value=1)
+
+        first = jobs.claim('worker-1', 5)
+        second = jobs.claim('worker-2', 5)
+
+        self.assertEqual(
+            sorted(item.name for item in first),
+            ['tests.limited', 'tests.record']
+        )
+        self.assertNotIn(job.id, [item.id for item in second])
+        self.assertEqual(second, [])
+
+    def test_release_stale(self):
+        """Testa se trabalhos abandonados voltam para a fila ou falham"""
+        record.enqueue(value=1)
+        broken.enqueue()
+        jobs.claim('worker-1', 5)
+        Job.objects.filter(name='tests.broken').update(attempts=2)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.release_stale(timeout=60), 2)
+
+        self.assertEqual(
+            Job.objects.get(name='tests.record').status, Job.PENDING
+        )
+        self.assertEqual(
+            Job.objects.get(name='tests.broken').status, Job.FAILED
+        )
+
+    def test_complete_after_release(self):
+        """Testa se um worker não conclui o trabalho que já foi repassado"""
+        record.enqueue(value=1)
+        job, = jobs.claim('worker-1', 1)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        jobs.release_stale(timeout=60)
+        jobs.claim('worker-2', 1)
+
+        self.assertEqual(jobs.complete(job), 0)
+        self.assertEqual(Job.objects.get().locked_by, 'worker-2')
+
+    def test_purge_and_stats(self):
+        """Testa a limpeza dos concluídos e os totais da fila"""
+        old = record.enqueue(value=1)
+        Job.objects.filter(id=old.id).update(
+            status=Job.DONE, finished_at=timezone.now() - timedelta(days=30)
+        )
+        record.enqueue(value=2)
+        broken.enqueue()
+
+        self.assertEqual(jobs.purge_finished(days=7), 1)
+        stats = jobs.queue_stats()
+        self.assertEqual(stats['tasks'], {
+            'tests.broken': {'pending': 1}, 'tests.record': {'pending': 1},
+        })
+        self.assertGreaterEqual(stats['lag_seconds'], 0)
+
+
+class RunJobsCommandTests(TransactionTestCase):
+    """Testa o worker do comando run_jobs"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_burst(self):
+        """Testa se o worker processa toda a fila e reporta as métricas"""
+        for value in range(20):
+            record.enqueue(value=value)
+        out = StringIO()
+
+        call_command('run_jobs', burst=True, concurrency=4, stdout=out)
+
+        self.assertEqual(sorted(calls), list(range(20)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 20)
+        metrics = json.loads(out.getvalue().splitlines()[-1])
+        self.assertEqual(metrics['succeeded'], 20)
+
+    def test_stats(self):
+        """Testa a saída dos totais da fila"""
+        record.enqueue(value=1)
+        out = StringIO()
+
+        call_command('run_jobs', stats=True, stdout=out)
+
+        self.assertEqual(
+            json.loads(out.getvalue())['tasks'],
+            {'tests.record': {'pending': 1}}
+        )
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.middleware import QueryStats
+from core.models import Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class QueryInstrumentationTests(TestCase):
+    """Testa a instrumentação das consultas SQL por requisição"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        Tag.objects.create(user=self.user, name='Almoço')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(SERVER_TIMING_ENABLED=True)
+    def test_server_timing_header(self):
+        """Testa se o Server-Timing informa as consultas e os tempos"""
+        res = self.client.get(TAGS_URL)
+
+        self.assertRegex(
+            res['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="1 queries", app;dur=[\d.]+$'
+        )
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_server_timing_disabled(self):
+        """Testa se o header pode ser desligado"""
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    def test_structured_log(self):
+        """Testa se o resumo da requisição vai para o log"""
+        with self.assertLogs('core.sql', 'INFO') as logs:
+            self.client.get(TAGS_URL)
+
+        record = logs.records[0]
+        self.assertEqual(record.path, TAGS_URL)
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.queries, 1)
+        self.assertEqual(len(record.slowest), 1)
+        self.assertIn('core_tag', record.slowest[0]['sql'])
+
+    @override_settings(SQL_INSTRUMENTATION_ENABLED=False,
+                       SERVER_TIMING_ENABLED=True)
+    def test_instrumentation_disabled(self):
+        """Testa se a instrumentação pode ser desligada"""
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('core.sql', 'INFO'):
+                res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    def test_slowest_queries(self):
+        """Testa se só as consultas mais lentas são guardadas, em ordem"""
+        stats = QueryStats(slowest=2)
+        for sql, duration in (('a', 0.1), ('b', 0.3), ('c', 0.2)):
+            stats.record(sql, duration)
+
+        self.assertEqual(stats.count, 3)
+        self.assertAlmostEqual(stats.duration, 0.6)
+        self.assertEqual(stats.slowest_queries(), [(0.3, 'b'), (0.2, 'c')])
@@ -0,0 +1,66 @@
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MergeDuplicateNamesTests(TransactionTestCase):
+    """Testa a migração que junta tags e ingredientes com o mesmo nome"""
+
+    before = [('core', '0006_recipe_search')]
+    after = [('core', '0007_unique_lower_name')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_merge_duplicates(self):
+        """Testa se os duplicados somem e as receitas passam ao mantido"""
+        apps = self.migrate(self.before)
+        User = apps.get_model('core', 'User')
+        Tag = apps.get_model('core', 'Tag')
+        Recipe = apps.get_model('core', 'Recipe')
+        user = User.objects.create(email='fulano@email.com')
+        other = User.objects.create(email='outro@email.com')
+        keep = Tag.objects.create(user=user, name='Vegana')
+        duplicate = Tag.objects.create(user=user, name='VEGANA')
+        other_tag = Tag.objects.create(user=other, name='vegana')
+        both = Recipe.objects.create(
+            user=user, title='Salada', time_minutes=5, price=10
+        )
+        both.tags.add(keep, duplicate)
+        only = Recipe.objects.create(
+            user=user, title='Sopa', time_minutes=5, price=10
+        )
+        only.tags.add(duplicate)
+
+        apps = self.migrate(self.after)
+        Tag = apps.get_model('core', 'Tag')
+        Recipe = apps.get_model('core', 'Recipe')
+
+        self.assertEqual(
+            sorted(Tag.objects.values_list('id', flat=True)),
+            [keep.id, other_tag.id]
+        )
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                list(recipe.tags.values_list('id', flat=True)), [keep.id]
+            )
+        with self.assertRaises(IntegrityError):
+            Tag.objects.create(user_id=user.id, name='vegana')
+        if connection.vendor == 'sqlite':
+            # As receitas que tinham o duplicado voltam ao índice de busca
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT rowid, tags FROM recipe_search '
+                    'WHERE rowid IN (%s, %s) ORDER BY rowid',
+                    [both.id, only.id]
+                )
+                self.assertEqual(
+                    cursor.fetchall(),
+                    [(both.id, 'Vegana'), (only.id, 'Vegana')]
+                )
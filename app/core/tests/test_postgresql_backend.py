@@ -0,0 +1,135 @@
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+from psycopg2 import extensions
+from django.core.signals import request_finished, request_started
+from django.db import connections, transaction
+from django.db.backends.postgresql import base as django_base
+from django.db.transaction import TransactionManagementError
+from django.test import SimpleTestCase
+
+from core.db import pool
+from core.db.backends.postgresql.base import DatabaseWrapper
+
+
+ALIAS = 'pool_backend'
+
+
+def fake_connection():
+    """Conexão do psycopg2 de mentira, saudável e ociosa"""
+    conn = MagicMock(name='psycopg2_connection')
+    conn.closed = 0
+    conn.get_transaction_status.return_value = (
+        extensions.TRANSACTION_STATUS_IDLE
+    )
+    return conn
+
+
+class PooledDatabaseWrapperTests(SimpleTestCase):
+    """Testa o backend que tira e devolve as conexões do pool"""
+
+    def setUp(self):
+        settings_dict = {
+            'ENGINE': 'core.db.backends.postgresql', 'NAME': 'app',
+            'USER': 'postgres', 'PASSWORD': '', 'HOST': 'db', 'PORT': '',
+            'OPTIONS': {}, 'ATOMIC_REQUESTS': False, 'AUTOCOMMIT': True,
+            'CONN_MAX_AGE': 0, 'TIME_ZONE': None, 'TEST': {},
+            'POOL': {'MIN_SIZE': 0, 'MAX_SIZE': 2, 'TIMEOUT': 0.1},
+        }
+        self.created = []
+
+        def connect(wrapper, conn_params):
+            conn = fake_connection()
+            self.created.append(conn)
+            return conn
+
+        patcher = patch.object(
+            django_base.DatabaseWrapper, 'get_new_connection', connect
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.wrapper = DatabaseWrapper(settings_dict, ALIAS)
+        connections.databases[ALIAS] = settings_dict
+        connections[ALIAS] = self.wrapper
+        self.addCleanup(self.unregister)
+
+    def unregister(self):
+        self.wrapper.connection = None
+        del connections[ALIAS]
+        del connections.databases[ALIAS]
+        with pool._pools_lock:
+            pool._pools.pop(ALIAS, None)
+
+    def stats(self):
+        return pool.pool_stats()[ALIAS]
+
+    def test_connection_returned_after_request(self):
+        """Testa se a conexão volta ao pool no fim da requisição e é reusada"""
+        request_started.send(sender=self.__class__)
+        self.wrapper.ensure_connection()
+        conn = self.wrapper.connection
+        self.assertEqual(self.stats()['in_use'], 1)
+
+        request_finished.send(sender=self.__class__)
+
+        self.assertIsNone(self.wrapper.connection)
+        conn.rollback.assert_called_once_with()
+        conn.close.assert_not_called()
+        self.assertEqual(self.stats()['idle'], 1)
+
+        request_started.send(sender=self.__class__)
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, conn)
+        self.assertEqual(self.stats()['connections_created'], 1)
+        request_finished.send(sender=self.__class__)
+
+    def test_broken_connection_discarded(self):
+        """Testa se a conexão que falha ao ser devolvida é descartada"""
+        self.wrapper.ensure_connection()
+        conn = self.wrapper.connection
+        conn.rollback.side_effect = psycopg2.OperationalError('caiu')
+
+        self.wrapper.close()
+
+        conn.close.assert_called_once_with()
+        stats = self.stats()
+        self.assertEqual(stats['connections_discarded'], 1)
+        self.assertEqual(stats['size'], 0)
+
+        self.wrapper.ensure_connection()
+        self.assertIsNot(self.wrapper.connection, conn)
+        self.assertEqual(len(self.created), 2)
+
+    def test_closed_idle_connection_not_reused(self):
+        """Testa se a conexão que caiu enquanto ociosa não é reutilizada"""
+        self.wrapper.ensure_connection()
+        conn = self.wrapper.connection
+        self.wrapper.close()
+        conn.closed = 1
+
+        self.wrapper.ensure_connection()
+
+        self.assertIsNot(self.wrapper.connection, conn)
+        self.assertEqual(self.stats()['failed_health_checks'], 1)
+
+    def test_close_inside_atomic(self):
+        """
+           Testa o close() dentro do atomic: a transação é desfeita, a
+           conexão volta ao pool e o bloco não a usa mais
+        """
+        with transaction.atomic(using=ALIAS):
+            conn = self.wrapper.connection
+            self.wrapper.close()
+
+            conn.rollback.assert_called_once_with()
+            self.assertEqual(self.stats()['idle'], 1)
+            with self.assertRaises(TransactionManagementError):
+                with self.wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+
+        self.assertIsNone(self.wrapper.connection)
+        conn.commit.assert_not_called()
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, conn)
+        self.assertTrue(self.wrapper.get_autocommit())
@@ -0,0 +1,85 @@
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe import views
+
+
+USERS = 50
+ROWS_PER_USER = 200
+
+
+@skipIf(connection.vendor not in ('postgresql', 'sqlite'),
+        'Plano de execução verificado apenas no PostgreSQL e SQLite')
+class QueryPlanTests(TestCase):
+    """
+       Garante que as listagens por usuário usam os índices compostos,
+       sem table scan e sem ordenação em memória
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            get_user_model().objects.create_user(
+                'fulano%d@email.com' % i, '1234'
+            )
+            for i in range(USERS)
+        ]
+        for model in (Tag, Ingredient):
+            model.objects.bulk_create(
+                model(user=user, name='Nome %d' % (n * 7919 % 1000))
+                for user in users
+                for n in range(ROWS_PER_USER)
+            )
+        Recipe.objects.bulk_create(
+            Recipe(user=user, title='Receita %d' % n,
+                   time_minutes=5, price=10)
+            for user in users
+            for n in range(ROWS_PER_USER)
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        cls.user = users[USERS // 2]
+
+    def viewset_queryset(self, viewset):
+        """Retorna a queryset que o viewset usaria para o usuário"""
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.user
+        view = viewset()
+        view.request = request
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            self.assertIn('Index', plan)
+            self.assertNotIn('Seq Scan', plan)
+            self.assertNotIn('Sort', plan)
+        else:
+            self.assertRegex(plan, r'SEARCH \S+ USING (COVERING )?INDEX')
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_tag_list_uses_index(self):
+        """Testa se a listagem de tags usa o índice (user, name)"""
+        self.assertUsesIndex(
+            self.viewset_queryset(views.TagViewSet)
+        )
+
+    def test_ingredient_list_uses_index(self):
+        """Testa se a listagem de ingredientes usa o índice (user, name)"""
+        self.assertUsesIndex(
+            self.viewset_queryset(views.IngredientViewSet)
+        )
+
+    def test_recipe_list_uses_index(self):
+        """Testa se a listagem de receitas usa o índice (user, id)"""
+        self.assertUsesIndex(
+            self.viewset_queryset(views.RecipeViewSet)
+        )
@@ -0,0 +1,151 @@
+import json
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import renderers
+from core.models import Tag, Recipe
+from core.testing import asgi_get
+
+from recipe.views import RecipeViewSet, TagViewSet
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RendererTests(SimpleTestCase):
+    """Testa os renderers JSON"""
+
+    data = [
+        OrderedDict([('id', 1), ('name', 'Almoço')]),
+        {'price': Decimal('5.50'), 'detail': gettext_lazy('Não'),
+         'tags': [], 'link': None, 'ok': True, 'rate': 1.5},
+    ]
+
+    def test_fast_matches_drf(self):
+        """Testa se o renderer rápido gera os mesmos bytes que o do DRF"""
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data)
+        )
+
+    def test_fast_without_orjson(self):
+        """Testa o fallback para a stdlib sem o orjson"""
+        with patch.object(renderers, 'orjson', None):
+            content = renderers.FastJSONRenderer().render(self.data)
+
+        self.assertEqual(content, JSONRenderer().render(self.data))
+
+    def test_indent_uses_stdlib(self):
+        """Testa se a indentação pedida é respeitada"""
+        content = renderers.FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=2'
+        )
+
+        self.assertEqual(content, b'{\n  "a": 1\n}')
+
+    def test_streaming_chunks(self):
+        """Testa se a lista é gerada em pedaços com JSON válido"""
+        renderer = renderers.StreamingJSONRenderer()
+        renderer.chunk_size = 2
+        items = [{'id': i} for i in range(5)]
+
+        chunks = list(renderer.iter_render(iter(items)))
+
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(json.loads(b''.join(chunks)), items)
+        self.assertEqual(b''.join(renderer.iter_render([])), b'[]')
+
+
+class StreamingListTests(TestCase):
+    """Testa as listagens em streaming"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(RECIPE_LIST_CACHE_SHARED=True)
+    def test_streaming_tag_list(self):
+        """Testa se a listagem é enviada em streaming com o mesmo conteúdo"""
+        for name in ('Jantar', 'Almoço', 'Lanche'):
+            Tag.objects.create(user=self.user, name=name)
+        expected = self.client.get(TAGS_URL).content
+
+        with patch.object(TagViewSet, 'renderer_classes',
+                          [renderers.StreamingJSONRenderer]):
+            res = self.client.get(TAGS_URL)
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(b''.join(res.streaming_content), expected)
+        self.assertIn('ETag', res)
+
+    def test_streaming_recipe_list_keeps_prefetch(self):
+        """Testa o streaming das receitas sem consultas por receita"""
+        tag = Tag.objects.create(user=self.user, name='Vegana')
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user, title='Receita %d' % i,
+                time_minutes=5, price=10
+            ).tags.add(tag)
+        expected = self.client.get(RECIPES_URL).content
+
+        with patch.object(RecipeViewSet, 'renderer_classes',
+                          [renderers.StreamingJSONRenderer]), \
+                patch.object(renderers.StreamingJSONRenderer,
+                             'chunk_size', 2):
+            res = self.client.get(RECIPES_URL)
+            with self.assertNumQueries(1 + 3 * 3):
+                content = b''.join(res.streaming_content)
+
+        self.assertEqual(content, expected)
+
+
+class StreamingListAsgiTests(TransactionTestCase):
+    """Testa as listagens em streaming servidas pelo handler ASGI"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.auth = 'Token %s' % Token.objects.create(user=user).key
+        tag = Tag.objects.create(user=user, name='Vegana')
+        for i in range(5):
+            Recipe.objects.create(
+                user=user, title='Receita %d' % i, time_minutes=5, price=10
+            ).tags.add(tag)
+
+    async def test_streaming_recipe_list(self):
+        """
+           Testa se as receitas são lidas do BD enquanto a resposta é
+           enviada, fora do event loop
+        """
+        with patch.object(RecipeViewSet, 'renderer_classes',
+                          [renderers.StreamingJSONRenderer]), \
+                patch.object(renderers.StreamingJSONRenderer,
+                             'chunk_size', 2):
+            status, headers, body, messages = await asgi_get(
+                RECIPES_URL, [('authorization', self.auth)]
+            )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [recipe['title'] for recipe in json.loads(body)],
+            ['Receita %d' % i for i in reversed(range(5))]
+        )
+        self.assertGreater(messages, 3)
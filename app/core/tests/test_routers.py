@@ -0,0 +1,164 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.db.routers import (
+    ReplicaRouter, ReplicaSet, RoutingState, _current, eject_on_error,
+    get_replicas
+)
+from core.models import Tag
+from core.testing import ReplicaDatabaseMixin
+
+
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+
+
+class ReplicaSetTests(SimpleTestCase):
+    """Testa a escolha das réplicas"""
+
+    def replica_set(self, failing=(), eject_seconds=60):
+        def check(alias):
+            if alias in failing:
+                raise OperationalError('fora do ar')
+
+        with patch('core.db.routers.check_database', check):
+            return ReplicaSet(['r1', 'r2'], 60, eject_seconds)
+
+    def test_round_robin(self):
+        """Testa se as réplicas são escolhidas em rodízio"""
+        replicas = self.replica_set()
+
+        self.assertEqual(
+            [replicas.choose() for _ in range(4)], ['r1', 'r2', 'r1', 'r2']
+        )
+
+    def test_unhealthy_skipped(self):
+        """Testa se a réplica que falha na verificação fica de fora"""
+        replicas = self.replica_set(failing={'r1'})
+
+        self.assertEqual({replicas.choose() for _ in range(4)}, {'r2'})
+
+    def test_ejected_until_timeout(self):
+        """Testa se a réplica afastada volta depois do tempo de espera"""
+        replicas = self.replica_set()
+        replicas.eject('r1')
+        self.assertEqual({replicas.choose() for _ in range(4)}, {'r2'})
+
+        replicas = self.replica_set(eject_seconds=0)
+        replicas.eject('r1')
+        self.assertIn('r1', {replicas.choose() for _ in range(4)})
+
+    def test_none_healthy(self):
+        """Testa se sem réplicas saudáveis a escolha é None"""
+        replicas = self.replica_set(failing={'r1', 'r2'})
+
+        self.assertIsNone(replicas.choose())
+
+
+@override_settings(
+    REPLICA_DATABASES=['replica'], RECIPE_LIST_CACHE_ENABLED=False
+)
+class ReplicaRoutingTests(ReplicaDatabaseMixin, TestCase):
+    """Testa as leituras na réplica (um segundo BD SQLite)"""
+
+    def setUp(self):
+        caches['default'].clear()
+        # Réplica afastada em um teste não pode afetar os seguintes
+        patcher = patch.object(routers, '_replicas', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com', '1234'
+        )
+        self.user.save(using='replica')
+        Tag.objects.create(user=self.user, name='Primário')
+        Tag(user=self.user, name='Réplica').save(using='replica')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tag_names(self):
+        res = self.client.get(TAGS_URL)
+        return [tag['name'] for tag in res.data]
+
+    def test_get_reads_replica(self):
+        """Testa se as requisições GET leem da réplica"""
+        self.assertEqual(self.tag_names(), ['Réplica'])
+
+    def test_outside_request_reads_primary(self):
+        """Testa se fora de requisições as leituras usam o primário"""
+        self.assertEqual(
+            list(Tag.objects.values_list('name', flat=True)), ['Primário']
+        )
+
+    def test_writer_sticks_to_primary(self):
+        """Testa se quem gravou lê do primário (read-your-writes)"""
+        res = self.client.post(TAGS_URL, {'name': 'Nova'})
+        self.assertEqual(res.status_code, 201)
+
+        self.assertEqual(self.tag_names(), ['Nova', 'Primário'])
+        self.assertEqual(Tag.objects.using('replica').count(), 1)
+
+    def test_user_update_sticks_to_primary(self):
+        """Testa se alterar o perfil também prende o usuário ao primário"""
+        res = self.client.patch(ME_URL, {'name': 'Fulano'})
+        self.assertEqual(res.status_code, 200)
+
+        self.assertEqual(self.tag_names(), ['Primário'])
+
+    def test_sticky_is_per_user(self):
+        """Testa se a escrita de um usuário não afeta os demais"""
+        other = get_user_model().objects.create_user(
+            'ciclano@email.com', '1234'
+        )
+        client = APIClient()
+        client.force_authenticate(other)
+        client.post(TAGS_URL, {'name': 'Nova'})
+
+        self.assertEqual(self.tag_names(), ['Réplica'])
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_sticky_disabled(self):
+        """Testa se sem a janela de escrita a leitura volta à réplica"""
+        self.client.post(TAGS_URL, {'name': 'Nova'})
+
+        self.assertEqual(self.tag_names(), ['Réplica'])
+
+    def test_ejected_replica_uses_primary(self):
+        """Testa se com a réplica afastada as leituras vão ao primário"""
+        get_replicas().eject('replica')
+
+        self.assertEqual(self.tag_names(), ['Primário'])
+
+    def test_query_error_ejects_replica(self):
+        """Testa se um erro de conexão na réplica a afasta"""
+        def execute(*args):
+            raise OperationalError('conexão perdida')
+
+        with self.assertRaises(OperationalError):
+            eject_on_error(
+                execute, 'SELECT 1', None, False,
+                {'connection': connections['replica']}
+            )
+
+        self.assertFalse(get_replicas().is_healthy('replica'))
+
+    def test_writes_go_to_primary(self):
+        """Testa se as escritas em requisições de leitura usam o primário"""
+        router = ReplicaRouter()
+        token = _current.set(RoutingState(None, True))
+        try:
+            tag = Tag.objects.using('replica').get()
+            self.assertEqual(
+                router.db_for_write(Tag, instance=tag), 'default'
+            )
+            self.assertEqual(_current.get().written, {self.user.id})
+        finally:
+            _current.reset(token)
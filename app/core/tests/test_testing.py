@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.testing import query_budget
+
+from recipe.views import IngredientViewSet, TagViewSet
+
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class QueryBudgetTests(TestCase):
+    """Testa o orçamento de consultas das views"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_within_budget(self):
+        """Testa se a view dentro do orçamento passa"""
+        with query_budget(TagViewSet, 'list', 1) as budget:
+            self.client.get(TAGS_URL)
+
+        self.assertEqual(len(budget.calls), 1)
+
+    def test_over_budget(self):
+        """Testa se a view acima do orçamento falha listando as consultas"""
+        Tag.objects.create(user=self.user, name='Almoço')
+
+        with self.assertRaisesRegex(AssertionError,
+                                    r'TagViewSet.list fez 1 consultas'):
+            with query_budget(TagViewSet, 'list', 0):
+                self.client.get(TAGS_URL)
+
+    def test_view_not_called(self):
+        """Testa se o orçamento falha quando a ação não é chamada"""
+        with self.assertRaisesMessage(AssertionError, 'não foi chamada'):
+            with query_budget(IngredientViewSet, 'list', 1):
+                self.client.get(TAGS_URL)
+
+    def test_patch_is_removed(self):
+        """Testa se a ação original volta ao fim do orçamento"""
+        original = TagViewSet.list
+        with query_budget(TagViewSet, 'list', 1):
+            self.client.get(TAGS_URL)
+
+        self.assertIs(TagViewSet.list, original)
+        self.assertNotIn('list', TagViewSet.__dict__)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+from core.db.pool import pool_stats
+from core.health import ReadinessProbe
+
+
+readiness = ReadinessProbe(ttl=settings.HEALTHZ_READINESS_TTL)
+
+
+def healthz(request):
+    """
+       Liveness (padrão) ou readiness (`?mode=ready`) para os load
+       balancers. A readiness usa o último resultado da verificação do BD;
+       com `&detail=1` responde em JSON, com as estatísticas dos pools de
+       conexões deste processo (`DB_POOL`).
+    """
+    status = 200
+    if request.GET.get('mode') == 'ready':
+        if not readiness.is_ready():
+            status = 503
+        if request.GET.get('detail'):
+            return JsonResponse({
+                'status': 'ok' if status == 200 else 'unavailable',
+                'pools': pool_stats(),
+            }, status=status)
+
+    return HttpResponse(
+        'ok' if status == 200 else 'unavailable', status=status,
+        content_type='text/plain'
+    )
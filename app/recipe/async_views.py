@@ -0,0 +1,91 @@
+"""
+Versões assíncronas da listagem e criação de tags e ingredientes.
+
+A autenticação usa `authenticate_async` (LRU de tokens no event loop) e toda
+a parte que acessa o BD roda de uma vez no pool de `core.async_views`: a ação
+do ViewSet síncrono é chamada lá com a requisição já autenticada, então
+filtros, paginação, cache, ETag e validação são os mesmos e a resposta sai
+com os mesmos bytes do `FastJSONRenderer`.
+"""
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from core.async_views import (
+    error_response, json_response, run_db, saturated_response
+)
+from core.db.sharding import user_context
+from core.executor import PoolSaturated
+from core.renderers import FastJSONRenderer
+from user.authentication import authenticated_user
+
+from recipe.views import IngredientViewSet, TagViewSet
+
+
+ACTIONS = {'GET': 'list', 'POST': 'create'}
+
+
+def _dispatch(viewset, action, request, user):
+    """Executa a ação do ViewSet (no pool de BD) e devolve a resposta"""
+    request = Request(request, parsers=[
+        parser() for parser in api_settings.DEFAULT_PARSER_CLASSES
+    ])
+    request.user = user
+    request.accepted_renderer = FastJSONRenderer()
+    request.accepted_media_type = FastJSONRenderer.media_type
+    view = viewset(
+        request=request, args=(), kwargs={}, format_kwarg=None,
+        action=action, headers={}
+    )
+    try:
+        with user_context(user.pk):
+            response = getattr(view, action)(request)
+    except Exception as exc:
+        response = exception_handler(
+            exc, view.get_exception_handler_context()
+        )
+        if response is None:
+            raise
+
+    headers = {
+        name: value for name, value in response.items()
+        if name.lower() != 'content-type'
+    }
+    return response.status_code, response.data, headers
+
+
+def attr_view(viewset):
+    """Cria a view assíncrona de listagem/criação do ViewSet"""
+
+    async def view(request):
+        action = ACTIONS.get(request.method)
+        if action is None:
+            return error_response(
+                exceptions.MethodNotAllowed(request.method),
+                allow=', '.join(ACTIONS)
+            )
+        try:
+            user = await authenticated_user(request)
+            code, data, headers = await run_db(
+                _dispatch, viewset, action, request, user
+            )
+        except exceptions.APIException as exc:
+            return error_response(exc)
+        except PoolSaturated:
+            return saturated_response()
+
+        return json_response(data, code, headers)
+
+    view.__name__ = view.__qualname__ = (
+        '%s_async' % viewset.recipe_relation
+    )
+    view.__doc__ = viewset.__doc__
+    # Chamadas por clientes de API com token, como as views do DRF
+    view.csrf_exempt = True
+
+    return view
+
+
+tags = attr_view(TagViewSet)
+ingredients = attr_view(IngredientViewSet)
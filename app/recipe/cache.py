@@ -0,0 +1,132 @@
+import hashlib
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    """Retorna o cache usado pelas listagens"""
+    return caches[settings.RECIPE_LIST_CACHE_ALIAS]
+
+
+def is_enabled():
+    return settings.RECIPE_LIST_CACHE_ENABLED
+
+
+def is_shared():
+    """
+       Indica se as versões são vistas por todos os workers. Sem isso o ETag
+       e o cache das listagens não podem ser usados.
+    """
+    return settings.RECIPE_LIST_CACHE_SHARED
+
+
+def _version_key(model, user_id):
+    return 'recipe:version:%s:%s' % (model._meta.label_lower, user_id)
+
+
+def _new_version():
+    """
+       Versões novas começam em um valor aleatório para que uma chave
+       removida do cache nunca reaproveite respostas antigas
+    """
+    return random.getrandbits(48)
+
+
+def get_version(model, user_id):
+    """Retorna a versão atual das listagens do modelo para o usuário"""
+    cache = get_cache()
+    key = _version_key(model, user_id)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(
+            key, version, timeout=settings.RECIPE_LIST_CACHE_VERSION_TTL
+        ):
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_version(model, user_id, using=None):
+    """
+       Invalida em O(1) todas as listagens do modelo para o usuário.
+
+       A versão é incrementada na hora e de novo no commit do banco da
+       alteração (`using`, o shard do usuário), descartando o que outra
+       requisição tenha guardado antes da alteração ficar visível.
+    """
+    _incr_version(model, user_id)
+    transaction.on_commit(
+        lambda: _incr_version(model, user_id), using=using
+    )
+
+
+def _incr_version(model, user_id):
+    cache = get_cache()
+    key = _version_key(model, user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(
+            key, _new_version(),
+            timeout=settings.RECIPE_LIST_CACHE_VERSION_TTL
+        )
+
+
+def reset_versions(models, user_id):
+    """Descarta as versões do usuário, começando um novo espaço de chaves"""
+    get_cache().delete_many([_version_key(model, user_id) for model in models])
+
+
+def list_key(model, user_id, version, url):
+    """Monta a chave da listagem a partir da versão e da URL pedida"""
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return 'recipe:list:%s:%s:%s:%s' % (
+        model._meta.label_lower, user_id, version, digest
+    )
+
+
+def list_etag(model, user_id, version, url, media_type):
+    """
+       Monta o ETag da listagem. Como muda junto com a versão, não é preciso
+       consultar o BD nem renderizar a resposta para calculá-lo.
+    """
+    digest = hashlib.md5(('%s:%s:%s:%s:%s' % (
+        model._meta.label_lower, user_id, version, url, media_type
+    )).encode()).hexdigest()
+    return '"%s"' % digest
+
+
+def get_list(key):
+    """Retorna a listagem em cache, contabilizando acertos e falhas"""
+    data = get_cache().get(key)
+    with _stats_lock:
+        _stats['hits' if data is not None else 'misses'] += 1
+
+    return data
+
+
+def set_list(key, data, rows):
+    """Guarda a listagem, a menos que ela passe do limite de linhas"""
+    if rows > settings.RECIPE_LIST_CACHE_MAX_ROWS:
+        return
+    get_cache().set(key, data)
+
+
+def stats():
+    """Retorna os contadores de acertos e falhas do cache"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
@@ -0,0 +1,86 @@
+"""
+Contadores de receitas (`recipe_count`) das tags e dos ingredientes.
+
+Os contadores são alterados por incremento no próprio UPDATE
+(`recipe_count = recipe_count + n`), então alterações concorrentes não se
+perdem. Os signals cobrem as alterações pelo ORM; quem grava nas tabelas
+intermediárias direto (importação) chama `change_counts`. `recount` corrige
+desvios (escritas fora desses caminhos) recalculando em lotes de ids.
+"""
+from collections import Counter, defaultdict
+
+from django.db import router
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from core.models import Tag, Ingredient, Recipe
+
+
+RELATIONS = ((Tag, 'tags'), (Ingredient, 'ingredients'))
+
+
+def relation_of(model):
+    """Retorna a tabela intermediária e o campo do model nela"""
+    through = getattr(Recipe, dict(RELATIONS)[model]).through
+    return through, '%s_id' % model._meta.model_name
+
+
+def change_counts(model, deltas, using=None):
+    """
+       Soma `deltas` ({id: n}) aos contadores em um único UPDATE, agrupando
+       os ids pelo valor somado
+    """
+    groups = defaultdict(list)
+    for pk, delta in Counter(deltas).items():
+        if delta:
+            groups[delta].append(pk)
+    if not groups:
+        return 0
+
+    increment = Case(
+        *[When(pk__in=pks, then=Value(delta))
+          for delta, pks in groups.items()],
+        default=Value(0), output_field=IntegerField()
+    )
+    return model._base_manager.using(
+        using or router.db_for_write(model)
+    ).filter(
+        pk__in=[pk for pks in groups.values() for pk in pks]
+    ).update(recipe_count=F('recipe_count') + increment)
+
+
+def recount(model, batch_size=1000, using=None):
+    """
+       Recalcula os contadores em lotes de `batch_size` ids, alterando só
+       os que divergem. Retorna os ids dos usuários afetados.
+    """
+    using = using or router.db_for_write(model)
+    through, field = relation_of(model)
+    objects = model._base_manager.using(using)
+    actual = Coalesce(Subquery(
+        through.objects.filter(**{field: OuterRef('pk')}).values(
+            field
+        ).annotate(total=Count('id')).values('total'),
+        output_field=IntegerField()
+    ), Value(0))
+
+    users = set()
+    last = 0
+    while True:
+        ids = list(objects.filter(pk__gt=last).order_by('pk').values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not ids:
+            break
+        last = ids[-1]
+        drifted = objects.filter(pk__in=ids).annotate(
+            actual=actual
+        ).exclude(recipe_count=F('actual'))
+        changed = dict(drifted.values_list('pk', 'user_id'))
+        if changed:
+            objects.filter(pk__in=changed).update(recipe_count=actual)
+            users.update(changed.values())
+
+    return users
@@ -0,0 +1,79 @@
+"""
+Exportação do catálogo do usuário (tags, ingredientes e receitas) em NDJSON.
+
+Tudo é lido com `QuerySet.iterator()` (cursor no servidor no PostgreSQL) e
+os ids das tags/ingredientes de cada bloco de receitas são buscados de uma
+vez, então a memória usada não depende do tamanho do catálogo.
+"""
+from collections import defaultdict
+
+from django.db import router
+
+from core.models import Tag, Ingredient, Recipe
+from core.renderers import dumps
+
+
+def _relation_ids(relation, recipe_ids, using):
+    """Retorna {recipe_id: [ids]} da relação para o bloco de receitas"""
+    through = getattr(Recipe, relation).through
+    field = '%s_id' % relation[:-1]
+    ids = defaultdict(list)
+    rows = through.objects.using(using).filter(
+        recipe_id__in=recipe_ids
+    ).order_by(field).values_list('recipe_id', field)
+    for recipe_id, related_id in rows:
+        ids[recipe_id].append(related_id)
+
+    return ids
+
+
+def _recipe_records(chunk, using):
+    recipe_ids = [recipe['id'] for recipe in chunk]
+    tags = _relation_ids('tags', recipe_ids, using)
+    ingredients = _relation_ids('ingredients', recipe_ids, using)
+    for recipe in chunk:
+        yield {
+            'type': 'recipe',
+            'id': recipe['id'],
+            'title': recipe['title'],
+            'time_minutes': recipe['time_minutes'],
+            'price': str(recipe['price']),
+            'link': recipe['link'],
+            'tags': tags.get(recipe['id'], []),
+            'ingredients': ingredients.get(recipe['id'], []),
+        }
+
+
+def iter_catalog(user, chunk_size=2000, using=None):
+    """Gera os registros do catálogo do usuário, um dict por linha"""
+    using = using or router.db_for_read(Recipe, instance=user)
+    for record_type, model in (('tag', Tag), ('ingredient', Ingredient)):
+        rows = model.objects.using(using).filter(
+            user=user
+        ).order_by('id').values('id', 'name')
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield {'type': record_type, 'id': row['id'], 'name': row['name']}
+
+    recipes = Recipe.objects.using(using).filter(
+        user=user
+    ).order_by('id').values('id', 'title', 'time_minutes', 'price', 'link')
+    chunk = []
+    for recipe in recipes.iterator(chunk_size=chunk_size):
+        chunk.append(recipe)
+        if len(chunk) >= chunk_size:
+            yield from _recipe_records(chunk, using)
+            chunk = []
+    if chunk:
+        yield from _recipe_records(chunk, using)
+
+
+def iter_ndjson(user, chunk_size=2000, using=None):
+    """Gera o catálogo em NDJSON, agrupando várias linhas por pedaço"""
+    lines = []
+    for record in iter_catalog(user, chunk_size, using):
+        lines.append(dumps(record))
+        if len(lines) >= chunk_size:
+            yield b'\n'.join(lines) + b'\n'
+            lines = []
+    if lines:
+        yield b'\n'.join(lines) + b'\n'
@@ -0,0 +1,118 @@
+"""
+Imagens das receitas.
+
+O upload é gravado em blocos em um arquivo temporário em disco
+(`LimitedUploadHandler`), que o storage local só move para o lugar final,
+então a imagem nunca fica inteira na memória. As miniaturas, uma por tamanho
+de `RECIPE_THUMBNAIL_SIZES`, são geradas depois do commit em `thumbnail_pool`,
+um pool limitado de threads; `Recipe.thumbnails_ready` indica quando estão
+prontas. Com o pool cheio a geração vira um trabalho da fila `core.jobs`
+(tarefa `recipe.generate_thumbnails`, executada pelo `run_jobs`).
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import (
+    SkipFile, TemporaryFileUploadHandler
+)
+from django.db import router, transaction
+from PIL import Image
+
+from core.async_views import in_pool
+from core.executor import BoundedExecutor, PoolSaturated
+from core.jobs import enqueue
+from core.models import Recipe
+
+
+logger = logging.getLogger('recipe.images')
+
+thumbnail_pool = BoundedExecutor(
+    max_workers=settings.RECIPE_THUMBNAIL_WORKERS,
+    max_queue=settings.RECIPE_THUMBNAIL_MAX_QUEUE,
+    name='thumbnails'
+)
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+       Grava o upload em disco em blocos e descarta o arquivo assim que ele
+       passa de `RECIPE_IMAGE_MAX_SIZE`, sem ler o resto para a memória
+    """
+    too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.too_large = True
+            self.file.close()
+            raise SkipFile()
+
+        return super().receive_data_chunk(raw_data, start)
+
+
+def thumbnail_name(name, size):
+    """Caminho da miniatura de `size` pixels da imagem `name`"""
+    return '%s.thumb%d.jpg' % (os.path.splitext(name)[0], size)
+
+
+def delete_image(name, storage=default_storage):
+    """Apaga a imagem e as suas miniaturas"""
+    for path in [name] + [
+        thumbnail_name(name, size) for size in settings.RECIPE_THUMBNAIL_SIZES
+    ]:
+        storage.delete(path)
+
+
+def generate_thumbnails(recipe_id, name, storage=default_storage,
+                        using=None):
+    """
+       Gera as miniaturas da imagem `name` e marca a receita como pronta,
+       se ela ainda tiver essa imagem
+    """
+    with storage.open(name) as source:
+        image = Image.open(source)
+        image.draft('RGB', (max(settings.RECIPE_THUMBNAIL_SIZES),) * 2)
+        image = image.convert('RGB')
+        for size in sorted(settings.RECIPE_THUMBNAIL_SIZES, reverse=True):
+            image.thumbnail((size, size))
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=85, optimize=True)
+            path = thumbnail_name(name, size)
+            storage.delete(path)
+            storage.save(path, ContentFile(output.getvalue()))
+
+    return Recipe.objects.using(
+        using or router.db_for_write(Recipe)
+    ).filter(id=recipe_id, image=name).update(thumbnails_ready=True)
+
+
+def _generate_safely(recipe_id, name, using):
+    try:
+        generate_thumbnails(recipe_id, name, using=using)
+    except Exception:
+        logger.exception('Falha ao gerar as miniaturas de %s', name)
+
+
+def schedule_thumbnails(recipe):
+    """Agenda a geração das miniaturas para depois do commit"""
+    recipe_id, name = recipe.id, recipe.image.name
+    using = recipe._state.db
+
+    def submit():
+        try:
+            thumbnail_pool.submit(
+                in_pool(_generate_safely), recipe_id, name, using
+            )
+        except PoolSaturated:
+            logger.warning(
+                'Pool de miniaturas cheio, %s foi para a fila', name
+            )
+            enqueue('recipe.generate_thumbnails', {
+                'recipe_id': recipe_id, 'name': name,
+                'user_id': recipe.user_id,
+            })
+
+    transaction.on_commit(submit, using=using)
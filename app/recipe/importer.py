@@ -0,0 +1,249 @@
+"""
+Importação em massa de receitas a partir de CSV ou NDJSON.
+
+Os nomes das tags e dos ingredientes são resolvidos para ids por um
+dicionário em memória (os que faltam são criados junto com o lote, com
+`upsert_by_name`, então importações concorrentes não duplicam nomes), as
+receitas são inseridas em lotes com `bulk_insert` e as linhas das tabelas
+intermediárias (`Recipe.tags`/`Recipe.ingredients`) vão direto para o banco:
+com COPY no PostgreSQL e `bulk_create` nos demais. Sem signals por linha, o
+índice de busca, os contadores `recipe_count` e as versões do cache são
+atualizados uma vez por lote.
+
+O NDJSON aceita o formato do `export_recipes`: linhas `tag`/`ingredient`
+definem nomes para os ids usados nas receitas seguintes. No CSV as colunas
+são `title`, `time_minutes`, `price`, `link`, `tags` e `ingredients`, com os
+nomes separados por `|`.
+"""
+import csv
+import io
+import json
+import time
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+
+from core.db.bulk import bulk_insert, upsert_by_name
+from core.models import Tag, Ingredient, Recipe
+
+from recipe import cache
+from recipe.counts import change_counts
+from recipe.search import update_search_index
+
+
+RELATIONS = (('tags', Tag), ('ingredients', Ingredient))
+RECIPE_FIELDS = ('title', 'time_minutes', 'price', 'link')
+CSV_SEPARATOR = '|'
+
+
+class RecordError(ValueError):
+    """Registro inválido no arquivo de entrada"""
+
+    def __init__(self, line, message):
+        super().__init__('Linha %d: %s' % (line, message))
+        self.line = line
+
+
+def read_ndjson(stream):
+    """Gera (linha, registro) de um arquivo NDJSON, ignorando linhas vazias"""
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            raise RecordError(line, 'JSON inválido (%s)' % exc)
+        if not isinstance(record, dict):
+            raise RecordError(line, 'esperado um objeto JSON')
+        yield line, record
+
+
+def read_csv(stream):
+    """Gera (linha, registro) de um arquivo CSV com cabeçalho"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        record = {field: row.get(field) for field in RECIPE_FIELDS}
+        for relation, _ in RELATIONS:
+            names = row.get(relation) or ''
+            record[relation] = [
+                name for name in names.split(CSV_SEPARATOR) if name.strip()
+            ]
+        yield reader.line_num, record
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+class RecipeImporter:
+    """
+       Importa os registros para o catálogo de `user`, confirmando uma
+       transação a cada `batch_size` receitas
+    """
+
+    def __init__(self, user, batch_size=5000, using=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.using = using or router.db_for_write(Recipe, instance=user)
+        self.ids = {}
+        self.file_names = {}
+        self.pending = {}
+        for relation, model in RELATIONS:
+            self.ids[relation] = {
+                name.lower(): pk
+                for name, pk in model.objects.using(self.using).filter(
+                    user=user
+                ).values_list('name', 'id').iterator()
+            }
+            self.file_names[relation] = {}
+            self.pending[relation] = {}
+        self.batch = []
+        self.stats = {
+            'recipes': 0,
+            'tags': 0,
+            'ingredients': 0,
+            'relations': 0,
+            'skipped': 0,
+            'elapsed': 0.0,
+        }
+
+    def run(self, records, start=0, on_batch=None):
+        """
+           Importa os pares (linha, registro). Receitas até a linha `start`
+           (checkpoint) são puladas; `on_batch(linha, stats)` é chamado após
+           cada lote confirmado.
+        """
+        started = time.monotonic()
+        line = start
+        for line, record in records:
+            kind = record.get('type', 'recipe')
+            if kind in ('tag', 'ingredient'):
+                self._define(line, '%ss' % kind, record)
+            elif kind != 'recipe':
+                raise RecordError(line, 'tipo desconhecido %r' % kind)
+            elif line <= start:
+                self.stats['skipped'] += 1
+            else:
+                self.batch.append(self._parse(line, record))
+                if len(self.batch) >= self.batch_size:
+                    self._flush(line, started, on_batch)
+        if self.batch or any(self.pending.values()):
+            self._flush(line, started, on_batch)
+        self.stats['elapsed'] = time.monotonic() - started
+
+        return self.stats
+
+    def _define(self, line, relation, record):
+        name = str(record.get('name') or '').strip()
+        if not name:
+            raise RecordError(line, 'nome vazio')
+        if 'id' in record:
+            self.file_names[relation][record['id']] = name
+        self._key(relation, name)
+
+    def _key(self, relation, name):
+        """Retorna a chave do nome, agendando a criação se ele for novo"""
+        key = name.lower()
+        if key not in self.ids[relation]:
+            self.pending[relation].setdefault(key, name)
+        return key
+
+    def _parse(self, line, record):
+        fields = {}
+        for name in RECIPE_FIELDS:
+            field = Recipe._meta.get_field(name)
+            value = record.get(name)
+            if value is None:
+                value = '' if name == 'link' else value
+            try:
+                fields[name] = field.clean(value, None)
+            except ValidationError as exc:
+                raise RecordError(
+                    line, '%s: %s' % (name, ' '.join(exc.messages))
+                )
+
+        keys = {}
+        for relation, _ in RELATIONS:
+            values = record.get(relation) or []
+            if not isinstance(values, list):
+                raise RecordError(line, '%s: esperada uma lista' % relation)
+            names = []
+            for value in values:
+                if isinstance(value, int):
+                    if value not in self.file_names[relation]:
+                        raise RecordError(
+                            line, '%s: id %d não definido' % (relation, value)
+                        )
+                    value = self.file_names[relation][value]
+                value = str(value).strip()
+                if value:
+                    names.append(self._key(relation, value))
+            keys[relation] = list(dict.fromkeys(names))
+
+        return Recipe(user=self.user, **fields), keys
+
+    def _flush(self, line, started, on_batch):
+        with transaction.atomic(using=self.using):
+            self._create_pending()
+            recipes = bulk_insert(
+                Recipe, [recipe for recipe, _ in self.batch],
+                batch_size=self.batch_size, using=self.using
+            )
+            for relation, model in RELATIONS:
+                rows = [
+                    (recipe.pk, self.ids[relation][key])
+                    for recipe, keys in self.batch
+                    for key in keys[relation]
+                ]
+                self._insert_relation(relation, rows)
+                change_counts(
+                    model, Counter(pk for _, pk in rows), using=self.using
+                )
+                self.stats['relations'] += len(rows)
+            update_search_index(
+                [recipe.pk for recipe in recipes], using=self.using
+            )
+        for _, model in RELATIONS:
+            cache.bump_version(model, self.user.id, using=self.using)
+
+        self.stats['recipes'] += len(self.batch)
+        self.batch = []
+        self.stats['elapsed'] = time.monotonic() - started
+        if on_batch is not None:
+            on_batch(line, self.stats)
+
+    def _create_pending(self):
+        for relation, model in RELATIONS:
+            pending = self.pending[relation]
+            if not pending:
+                continue
+            found, created = upsert_by_name(
+                model, self.user, pending.values(), using=self.using
+            )
+            for key, name in pending.items():
+                self.ids[relation][key] = found[name][0]
+            self.stats[relation] += created
+            self.pending[relation] = {}
+
+    def _insert_relation(self, relation, rows):
+        if not rows:
+            return
+        through = getattr(Recipe, relation).through
+        field = '%s_id' % relation[:-1]
+        connection = connections[self.using]
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            buffer.writelines('%d\t%d\n' % row for row in rows)
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert('COPY %s (recipe_id, %s) FROM STDIN' % (
+                    connection.ops.quote_name(through._meta.db_table),
+                    connection.ops.quote_name(field),
+                ), buffer)
+            return
+
+        through.objects.using(self.using).bulk_create(
+            [through(recipe_id=recipe_id, **{field: related_id})
+             for recipe_id, related_id in rows],
+            batch_size=self.batch_size
+        )
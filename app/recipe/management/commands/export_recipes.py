@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.export import iter_ndjson
+
+
+class Command(BaseCommand):
+    """Exporta o catálogo de receitas de um usuário em NDJSON"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='E-mail do usuário')
+        parser.add_argument(
+            '--output', '-o',
+            help='Arquivo de saída (padrão: saída padrão)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('Usuário %s não encontrado' % options['email'])
+
+        chunks = iter_ndjson(user, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+        else:
+            # Os pedaços terminam sempre em fim de linha
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+
+from recipe.images import generate_thumbnails
+
+
+class Command(BaseCommand):
+    """Gera as miniaturas das receitas com imagem que ainda não as têm"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Gera de novo também as miniaturas já prontas'
+        )
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        for using in settings.SHARD_DATABASES:
+            recipes = Recipe.objects.using(using).exclude(
+                image=''
+            ).exclude(image=None)
+            if not options['all']:
+                recipes = recipes.filter(thumbnails_ready=False)
+
+            for recipe_id, name in recipes.values_list(
+                'id', 'image'
+            ).iterator():
+                try:
+                    generate_thumbnails(recipe_id, name, using=using)
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write('%s: %s' % (name, exc))
+                else:
+                    done += 1
+
+        self.stdout.write('%d receitas processadas, %d falhas' % (
+            done, failed
+        ))
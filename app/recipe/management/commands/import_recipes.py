@@ -0,0 +1,85 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import READERS, RecipeImporter, RecordError
+
+
+def read_checkpoint(path):
+    """Retorna a última linha confirmada gravada no checkpoint (ou 0)"""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint:
+        return json.load(checkpoint)['line']
+
+
+def write_checkpoint(path, line):
+    """Grava o checkpoint de forma atômica (arquivo temporário + rename)"""
+    tmp = '%s.tmp' % path
+    with open(tmp, 'w') as checkpoint:
+        json.dump({'line': line}, checkpoint)
+    os.replace(tmp, path)
+
+
+def _rate(stats):
+    return stats['recipes'] / stats['elapsed'] if stats['elapsed'] else 0.0
+
+
+class Command(BaseCommand):
+    """Importa receitas de um arquivo CSV ou NDJSON para um usuário"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo CSV ou NDJSON')
+        parser.add_argument('--user', required=True, help='E-mail do usuário')
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Formato do arquivo (padrão: pela extensão)'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Arquivo com a última linha importada, para retomar'
+        )
+        parser.add_argument('--database', default=None)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('Usuário %s não encontrado' % options['user'])
+
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+        checkpoint = options['checkpoint']
+        start = read_checkpoint(checkpoint)
+        if start:
+            self.stdout.write('Retomando após a linha %d' % start)
+
+        def on_batch(line, stats):
+            if checkpoint:
+                write_checkpoint(checkpoint, line)
+            self.stdout.write('Linha %d: %d receitas (%.0f linhas/s)' % (
+                line, stats['recipes'], _rate(stats)
+            ))
+
+        importer = RecipeImporter(
+            user, batch_size=options['batch_size'],
+            using=options['database']
+        )
+        try:
+            with open(path, newline='', encoding='utf-8') as stream:
+                stats = importer.run(
+                    READERS[fmt](stream), start=start, on_batch=on_batch
+                )
+        except (OSError, RecordError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            '%(recipes)d receitas, %(tags)d tags e %(ingredients)d '
+            'ingredientes importados em %(elapsed).1fs' % stats
+            + ' (%.0f linhas/s)' % _rate(stats)
+        ))
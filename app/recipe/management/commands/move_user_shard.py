@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.sharding import move_user
+
+
+class Command(BaseCommand):
+    """Move as tags, ingredientes e receitas de um usuário para outro shard"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='E-mail do usuário')
+        parser.add_argument(
+            'shard', help='Banco de destino (um de SHARD_DATABASES)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--wait', type=float, default=None,
+            help='Espera pelos caches do mapa, em segundos '
+                 '(padrão: SHARD_MAP_CACHE_TTL)'
+        )
+
+    def handle(self, *args, **options):
+        if options['shard'] not in settings.SHARD_DATABASES:
+            raise CommandError('Shard desconhecido: %s (use um de: %s)' % (
+                options['shard'], ', '.join(settings.SHARD_DATABASES)
+            ))
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('Usuário %s não encontrado' % options['email'])
+
+        move_user(
+            user.id, options['shard'], options['batch_size'],
+            options['wait'], log=self.stdout.write
+        )
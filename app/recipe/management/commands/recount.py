@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipe import cache
+from recipe.counts import RELATIONS, recount
+
+
+class Command(BaseCommand):
+    """Corrige o `recipe_count` das tags e ingredientes, em lotes"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--database', default=None,
+            help='Só este banco (padrão: todos os shards)'
+        )
+
+    def handle(self, *args, **options):
+        databases = (
+            [options['database']] if options['database']
+            else settings.SHARD_DATABASES
+        )
+        for model, relation in RELATIONS:
+            users = set()
+            for using in databases:
+                users |= recount(model, options['batch_size'], using=using)
+            for user_id in users:
+                cache.bump_version(model, user_id)
+            self.stdout.write('%s: %d usuários corrigidos' % (
+                relation, len(users)
+            ))
@@ -0,0 +1,166 @@
+"""
+Busca textual das receitas por título, nomes das tags e dos ingredientes.
+
+No PostgreSQL o índice é a coluna `core_recipe.search_vector` (tsvector, com
+índice GIN); no SQLite é a tabela FTS5 `recipe_search`. Ambos são criados na
+migração `core.0006_recipe_search` e mantidos por `recipe.signals`. Nos
+demais bancos a busca usa `icontains`, sem índice nem relevância.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import BooleanField, Exists, FloatField, OuterRef, Q
+from django.db.models.expressions import RawSQL
+
+from core.models import Recipe
+
+
+_PG_DOCUMENT = """
+    setweight(to_tsvector(%(config)s::regconfig, r.title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(t.name, ' ') FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(i.name, ' ') FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = r.id
+    ), '')), 'C')
+"""
+
+_SQLITE_DOCUMENT = """
+    SELECT r.id, r.title,
+        coalesce((
+            SELECT group_concat(t.name, ' ') FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = r.id
+        ), ''),
+        coalesce((
+            SELECT group_concat(i.name, ' ') FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = r.id
+        ), '')
+    FROM core_recipe r
+"""
+
+
+_RELATIONS = (('tags', 'tag'), ('ingredients', 'ingredient'))
+
+
+def _connection(using):
+    return connections[using or router.db_for_write(Recipe)]
+
+
+def _id_filter(ids, column):
+    placeholders = ', '.join(['%s'] * len(ids))
+    return ' WHERE %s IN (%s)' % (column, placeholders), list(ids)
+
+
+def update_search_index(recipe_ids=None, using=None):
+    """
+       Recalcula o documento de busca das receitas informadas, ou de todas
+       quando `recipe_ids` é None
+    """
+    if recipe_ids is not None:
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+
+    connection = _connection(using)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            sql = 'UPDATE core_recipe r SET search_vector = ' + _PG_DOCUMENT
+            sql = sql % {'config': '%s'}
+            params = [settings.RECIPE_SEARCH_CONFIG] * 3
+            if recipe_ids is not None:
+                sql += ' WHERE r.id = ANY(%s)'
+                params.append(recipe_ids)
+            cursor.execute(sql, params)
+        elif connection.vendor == 'sqlite':
+            delete = 'DELETE FROM recipe_search'
+            insert = (
+                'INSERT INTO recipe_search (rowid, title, tags, ingredients)'
+                + _SQLITE_DOCUMENT
+            )
+            params = []
+            if recipe_ids is not None:
+                where, params = _id_filter(recipe_ids, 'rowid')
+                delete += where
+                insert += _id_filter(recipe_ids, 'r.id')[0]
+            cursor.execute(delete, params)
+            cursor.execute(insert, params)
+
+
+def remove_from_search_index(recipe_ids, using=None):
+    """Remove as receitas apagadas do índice (a coluna do PG some junto)"""
+    connection = _connection(using)
+    if connection.vendor != 'sqlite' or not recipe_ids:
+        return
+    where, params = _id_filter(recipe_ids, 'rowid')
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM recipe_search' + where, params)
+
+
+def _fts_query(text):
+    """Transforma o texto em termos FTS5 entre aspas, evitando a sintaxe"""
+    return ' '.join('"%s"' % term for term in re.findall(r'\w+', text))
+
+
+def _contains_filter(text):
+    """Cada termo no título ou no nome de uma tag/ingrediente da receita"""
+    condition = Q()
+    for term in re.findall(r'\w+', text):
+        term_condition = Q(title__icontains=term)
+        for relation, field in _RELATIONS:
+            through = getattr(Recipe, relation).through
+            term_condition |= Q(Exists(through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                **{'%s__name__icontains' % field: term}
+            )))
+        condition &= term_condition
+
+    return condition
+
+
+def search_recipes(queryset, text):
+    """
+       Filtra a queryset de receitas pelo texto, ordenando pela relevância
+       (`search_rank`, maior é melhor)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        query = 'plainto_tsquery(%s::regconfig, %s)'
+        params = (settings.RECIPE_SEARCH_CONFIG, text)
+        match = RawSQL(
+            'core_recipe.search_vector @@ ' + query, params,
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            'ts_rank(core_recipe.search_vector, %s)' % query, params,
+            output_field=FloatField()
+        )
+    elif connection.vendor == 'sqlite':
+        terms = _fts_query(text)
+        if not terms:
+            return queryset.none()
+        match = RawSQL(
+            'core_recipe.id IN (SELECT rowid FROM recipe_search '
+            'WHERE recipe_search MATCH %s)', (terms,),
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            '(SELECT -bm25(recipe_search, 10.0, 5.0, 2.0) FROM recipe_search '
+            'WHERE recipe_search MATCH %s AND rowid = core_recipe.id)',
+            (terms,), output_field=FloatField()
+        )
+    else:
+        condition = _contains_filter(text)
+        if not condition:
+            return queryset.none()
+        return queryset.filter(condition).order_by('-id')
+
+    return queryset.filter(match).annotate(
+        search_rank=rank
+    ).order_by('-search_rank', '-id')
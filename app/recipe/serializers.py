@@ -1,6 +1,30 @@
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient
+from core.models import Tag, Ingredient, Recipe
+
+from recipe import images
+
+
+DUPLICATE_NAME = _('Já existe um item com este nome.')
+
+
+class NameListSerializer(serializers.ListSerializer):
+    """Lista de criação em lote que recusa nomes repetidos entre os itens"""
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        seen = set()
+        errors = []
+        for item in items:
+            key = item['name'].lower()
+            errors.append({'name': [DUPLICATE_NAME]} if key in seen else {})
+            seen.add(key)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return items
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -8,8 +32,9 @@ class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'recipe_count')
+        read_only_fields = ('id', 'recipe_count')
+        list_serializer_class = NameListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -17,5 +42,89 @@ class IngredientSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'recipe_count')
+        read_only_fields = ('id', 'recipe_count')
+        list_serializer_class = NameListSerializer
+
+
+class UpsertSerializer(serializers.Serializer):
+    """Lista de nomes do upsert de tags e ingredientes"""
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=120), allow_empty=False
+    )
+
+
+class RecipeImageFieldsMixin(serializers.Serializer):
+    """Campos de leitura da imagem da receita e das suas miniaturas"""
+    thumbnails = serializers.SerializerMethodField()
+
+    def get_thumbnails(self, recipe):
+        """URLs das miniaturas por tamanho, ou None se não estão prontas"""
+        if not recipe.image or not recipe.thumbnails_ready:
+            return None
+
+        request = self.context.get('request')
+        urls = {}
+        for size in settings.RECIPE_THUMBNAIL_SIZES:
+            url = recipe.image.storage.url(
+                images.thumbnail_name(recipe.image.name, size)
+            )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[str(size)] = url
+
+        return urls
+
+
+class RecipeSerializer(RecipeImageFieldsMixin, serializers.ModelSerializer):
+    """Serializer das receitas"""
+    ingredients = serializers.PrimaryKeyRelatedField(
+        many=True,
+        queryset=Ingredient.objects.all()
+    )
+    tags = serializers.PrimaryKeyRelatedField(
+        many=True,
+        queryset=Tag.objects.all()
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id', 'title', 'ingredients', 'tags', 'time_minutes',
+            'price', 'link', 'image', 'thumbnails_ready', 'thumbnails'
+        )
+        read_only_fields = ('id', 'image', 'thumbnails_ready')
+
+    def get_fields(self):
+        """Aceita só as tags e os ingredientes do usuário logado"""
+        fields = super().get_fields()
+        request = self.context.get('request')
+        for name in ('ingredients', 'tags'):
+            relation = getattr(fields[name], 'child_relation', None)
+            if relation is None:
+                continue
+            if request is None:
+                relation.queryset = relation.queryset.none()
+            else:
+                relation.queryset = relation.queryset.filter(
+                    user=request.user
+                )
+
+        return fields
+
+
+class RecipeDetailSerializer(RecipeSerializer):
+    """Serializer dos detalhes da receita, com tags e ingredientes"""
+    ingredients = IngredientSerializer(many=True, read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+
+
+class RecipeImageSerializer(RecipeImageFieldsMixin,
+                            serializers.ModelSerializer):
+    """Serializer do upload de imagem da receita"""
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'image', 'thumbnails_ready', 'thumbnails')
+        read_only_fields = ('id', 'thumbnails_ready')
+        extra_kwargs = {'image': {'required': True, 'allow_null': False}}
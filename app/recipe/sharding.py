@@ -0,0 +1,204 @@
+"""
+Mudança das tags, ingredientes e receitas de um usuário para outro shard,
+com o sistema no ar (comando `move_user_shard`):
+
+1. copia as linhas do usuário para o destino em lotes, enquanto ele segue
+   lendo e gravando na origem;
+2. trava o usuário no mapa (as escritas recebem 503) e espera os caches do
+   mapa nos processos vencerem (`SHARD_MAP_CACHE_TTL`);
+3. em uma transação no destino, acerta o que mudou desde a cópia, refaz o
+   índice de busca e então aponta o mapa para o destino, destravando;
+4. espera os caches vencerem de novo e apaga as linhas da origem.
+
+Os ids são mantidos (as faixas dos shards não se sobrepõem), então os
+clientes não percebem a mudança. Se algo falhar antes do passo 3 terminar,
+o usuário é destravado e continua na origem.
+"""
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from core.db import sharding
+from core.models import Recipe
+
+from recipe.search import remove_from_search_index, update_search_index
+
+
+def _user_rows(model, using, user_id):
+    manager = model._base_manager.using(using)
+    if model._meta.auto_created:
+        return manager.filter(recipe__user_id=user_id)
+    return manager.filter(user_id=user_id)
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _changes(model, source, target, user_id, batch_size):
+    """
+       Gera, por lote de ids, (linhas a inserir, ids a apagar) para que o
+       destino fique igual à origem. Linhas alteradas aparecem nos dois.
+    """
+    fields = _fields(model)
+    source_rows = _user_rows(model, source, user_id).order_by(
+        'pk'
+    ).values_list(*fields)
+    target_rows = _user_rows(model, target, user_id).values_list(*fields)
+    last = 0
+    while True:
+        batch = list(source_rows.filter(pk__gt=last)[:batch_size])
+        existing = target_rows.filter(pk__gt=last)
+        if batch:
+            existing = existing.filter(pk__lte=batch[-1][0])
+        existing = {row[0]: row for row in existing}
+        wanted = {row[0]: row for row in batch}
+        yield (
+            [row for pk, row in wanted.items() if existing.get(pk) != row],
+            [pk for pk, row in existing.items() if wanted.get(pk) != row],
+        )
+        if not batch:
+            return
+        last = batch[-1][0]
+
+
+def _with_parents(model, using, rows):
+    """
+       Descarta as linhas que apontam para tags, ingredientes ou receitas
+       que ainda não estão no destino (criadas durante a cópia)
+    """
+    for index, field in enumerate(model._meta.concrete_fields):
+        related = field.related_model
+        if (not rows or related is None
+                or related._meta.label_lower not in sharding.SHARDED_MODELS):
+            continue
+        present = set(related._base_manager.using(using).filter(
+            pk__in={row[index] for row in rows}
+        ).values_list('pk', flat=True))
+        rows = [row for row in rows if row[index] in present]
+
+    return rows
+
+
+def _insert(model, using, rows, batch_size):
+    fields = _fields(model)
+    model._base_manager.using(using).bulk_create(
+        [model(**dict(zip(fields, row))) for row in rows],
+        batch_size=batch_size
+    )
+
+
+def _delete(model, using, ids, batch_size):
+    """Apaga as linhas direto (sem signals, que apagariam as imagens)"""
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            cursor.execute('DELETE FROM %s WHERE id IN (%s)' % (
+                table, ', '.join(['%s'] * len(chunk))
+            ), chunk)
+
+
+def _recipe_ids(using, user_id):
+    return list(_user_rows(Recipe, using, user_id).values_list(
+        'pk', flat=True
+    ))
+
+
+def purge(user_id, using, batch_size=1000):
+    """Apaga as linhas do usuário no shard, sem passar pelos signals"""
+    recipe_ids = _recipe_ids(using, user_id)
+    with transaction.atomic(using=using):
+        for model in reversed(sharding.sharded_models()):
+            ids = list(_user_rows(model, using, user_id).values_list(
+                'pk', flat=True
+            ))
+            _delete(model, using, ids, batch_size)
+    for start in range(0, len(recipe_ids), batch_size):
+        remove_from_search_index(
+            recipe_ids[start:start + batch_size], using=using
+        )
+
+
+def copy(user_id, source, target, batch_size=1000):
+    """
+       Copia as linhas do usuário para o destino (passo 1), em uma
+       transação por lote. Retorna o número de linhas copiadas.
+    """
+    purge(user_id, target, batch_size)
+    copied = 0
+    for model in sharding.sharded_models():
+        for rows, _ in _changes(model, source, target, user_id, batch_size):
+            rows = _with_parents(model, target, rows)
+            with transaction.atomic(using=target):
+                _insert(model, target, rows, batch_size)
+            copied += len(rows)
+
+    return copied
+
+
+def sync(user_id, source, target, batch_size=1000):
+    """
+       Deixa o destino igual à origem: apaga as linhas alteradas ou que
+       sumiram e insere as que faltam. Deve rodar em uma transação no
+       destino com o usuário travado. Retorna o número de linhas alteradas.
+    """
+    models = sharding.sharded_models()
+    changed = 0
+    # Primeiro as remoções (filhos antes dos pais), para que as inserções
+    # não esbarrem no índice único de nomes
+    for model in reversed(models):
+        for _, ids in _changes(model, source, target, user_id, batch_size):
+            _delete(model, target, ids, batch_size)
+            changed += len(ids)
+    for model in models:
+        for rows, _ in _changes(model, source, target, user_id, batch_size):
+            _insert(model, target, rows, batch_size)
+            changed += len(rows)
+
+    return changed
+
+
+def move_user(user_id, target, batch_size=1000, wait=None, log=None):
+    """
+       Move os dados do usuário para o shard `target` (veja o docstring do
+       módulo). Retorna o shard de origem.
+    """
+    if target not in settings.SHARD_DATABASES:
+        raise ValueError('Shard desconhecido: %s' % target)
+    wait = settings.SHARD_MAP_CACHE_TTL if wait is None else wait
+    log = log or (lambda message: None)
+
+    sharding.shard_map.invalidate(user_id)
+    source = sharding.shard_of(user_id)
+    if source == target:
+        log('O usuário já está em %s' % target)
+        return source
+
+    log('Copiando de %s para %s...' % (source, target))
+    log('%d linhas copiadas' % copy(user_id, source, target, batch_size))
+
+    sharding.assign(user_id, locked=True)
+    try:
+        log('Escritas travadas, esperando %.1fs...' % wait)
+        time.sleep(wait)
+        with transaction.atomic(using=target):
+            changed = sync(user_id, source, target, batch_size)
+            recipe_ids = _recipe_ids(target, user_id)
+            for start in range(0, len(recipe_ids), batch_size):
+                update_search_index(
+                    recipe_ids[start:start + batch_size], using=target
+                )
+        sharding.assign(user_id, database=target, locked=False)
+    except BaseException:
+        sharding.assign(user_id, locked=False)
+        raise
+    log('%d linhas sincronizadas, usuário em %s' % (changed, target))
+
+    time.sleep(wait)
+    purge(user_id, source, batch_size)
+    log('Dados apagados de %s' % source)
+
+    return source
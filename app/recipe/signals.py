@@ -0,0 +1,197 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed, post_save, post_delete, pre_delete
+)
+from django.db import transaction
+from django.dispatch import receiver
+
+from core.db import sharding
+from core.models import Tag, Ingredient, Recipe
+
+from recipe import cache, counts, images, search
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_list_cache(sender, instance, using, **kwargs):
+    """Invalida as listagens em cache do dono do objeto alterado"""
+    cache.bump_version(sender, instance.user_id, using=using)
+
+
+@receiver(post_save, sender=get_user_model())
+def reset_list_cache(sender, instance, created, **kwargs):
+    """Garante que um usuário novo não enxergue listagens antigas"""
+    if created:
+        cache.reset_versions((Tag, Ingredient), instance.id)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def delete_user_data(sender, instance, **kwargs):
+    """
+       Apaga as receitas, tags e ingredientes do usuário apagado. As FKs não
+       têm constraint no BD (o usuário pode estar em outro shard), então
+       sem isso as linhas ficariam órfãs. Passa pelos signals das receitas
+       (imagens, índice de busca, caches).
+    """
+    shard = sharding.recorded_shard(instance.pk)
+    if shard is None:
+        return
+    database, locked = shard
+    if locked:
+        raise sharding.ShardLocked()
+    with transaction.atomic(using=database):
+        for model in (Recipe, Tag, Ingredient):
+            model.objects.using(database).filter(user=instance).delete()
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+    """Atualiza o documento de busca da receita salva"""
+    search.update_search_index([instance.id], using=kwargs.get('using'))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    """Remove a receita apagada do índice de busca"""
+    search.remove_from_search_index(
+        [instance.id], using=kwargs.get('using')
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_assigned_lists(sender, instance, action, using, **kwargs):
+    """
+       Invalida as listagens de tags/ingredientes, que dependem de quais
+       estão em uso (`assigned_only`)
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        model = Tag if sender is Recipe.tags.through else Ingredient
+        cache.bump_version(model, instance.user_id, using=using)
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_lists_of_deleted_recipe(sender, instance, using, **kwargs):
+    """Invalida as listagens que podiam depender da receita apagada"""
+    cache.bump_version(Tag, instance.user_id, using=using)
+    cache.bump_version(Ingredient, instance.user_id, using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_recipe_relations(sender, instance, action, reverse, pk_set,
+                           using, **kwargs):
+    """Atualiza a busca quando as tags ou ingredientes de receitas mudam"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.update_search_index([instance.id], using=using)
+        return
+
+    # Alteração pelo lado da tag/ingrediente: `pk_set` são receitas
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        search.update_search_index(
+            instance.__dict__.pop('_cleared_recipe_ids', []), using=using
+        )
+    elif action in ('post_add', 'post_remove'):
+        search.update_search_index(pk_set, using=using)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_recipes_to_reindex(sender, instance, **kwargs):
+    """Guarda as receitas que usam a tag/ingrediente que será apagado"""
+    instance._recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def reindex_recipes_using(sender, instance, **kwargs):
+    """Atualiza a busca das receitas que usam a tag/ingrediente alterado"""
+    if kwargs.get('created'):
+        return
+    recipe_ids = instance.__dict__.pop('_recipe_ids', None)
+    if recipe_ids is None:
+        recipe_ids = instance.recipe_set.values_list('id', flat=True)
+    search.update_search_index(recipe_ids, using=kwargs.get('using'))
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_image(sender, instance, **kwargs):
+    """Apaga a imagem e as miniaturas da receita depois do commit"""
+    name = instance.image.name
+    if name:
+        transaction.on_commit(
+            lambda: images.delete_image(name), using=kwargs.get('using')
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_recipe_counts(sender, instance, action, reverse, pk_set, using,
+                         **kwargs):
+    """
+       Mantém o `recipe_count` das tags/ingredientes. Remoções contam só as
+       ligações que existiam, lidas antes da remoção.
+    """
+    model = Tag if sender is Recipe.tags.through else Ingredient
+    field = '%s_id' % model._meta.model_name
+    removed = '_removed_%s' % field
+    rows = sender.objects.using(using)
+    if not reverse:
+        # `instance` é a receita e `pk_set` são tags/ingredientes
+        if action == 'post_add':
+            counts.change_counts(model, dict.fromkeys(pk_set, 1), using)
+        elif action in ('pre_remove', 'pre_clear'):
+            rows = rows.filter(recipe_id=instance.pk)
+            if action == 'pre_remove':
+                rows = rows.filter(**{'%s__in' % field: pk_set})
+            instance.__dict__[removed] = list(
+                rows.values_list(field, flat=True)
+            )
+        elif action in ('post_remove', 'post_clear'):
+            counts.change_counts(model, dict.fromkeys(
+                instance.__dict__.pop(removed, []), -1
+            ), using)
+        return
+
+    # `instance` é a tag/ingrediente e `pk_set` são receitas
+    if action == 'post_add':
+        counts.change_counts(model, {instance.pk: len(pk_set)}, using)
+    elif action in ('pre_remove', 'pre_clear'):
+        rows = rows.filter(**{field: instance.pk})
+        if action == 'pre_remove':
+            rows = rows.filter(recipe_id__in=pk_set)
+        instance.__dict__[removed] = rows.count()
+    elif action in ('post_remove', 'post_clear'):
+        counts.change_counts(
+            model, {instance.pk: -instance.__dict__.pop(removed, 0)}, using
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_recipe_relations(sender, instance, using, **kwargs):
+    """Guarda as tags/ingredientes da receita que será apagada"""
+    relations = []
+    for model, _ in counts.RELATIONS:
+        through, field = counts.relation_of(model)
+        relations.append((model, list(through.objects.using(using).filter(
+            recipe_id=instance.pk
+        ).values_list(field, flat=True))))
+    instance._counted_relations = relations
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipe_counts(sender, instance, using, **kwargs):
+    """Desconta a receita apagada dos contadores"""
+    for model, ids in instance.__dict__.pop('_counted_relations', []):
+        counts.change_counts(model, dict.fromkeys(ids, -1), using)
@@ -0,0 +1,13 @@
+from core.db.sharding import user_context
+from core.jobs import task
+from core.models import Recipe
+
+from recipe import images
+
+
+@task('recipe.generate_thumbnails', max_concurrency=2)
+def generate_thumbnails(recipe_id, name, user_id=None):
+    """Gera as miniaturas que não couberam no pool durante o upload"""
+    with user_context(user_id):
+        if Recipe.objects.filter(id=recipe_id, image=name).exists():
+            images.generate_thumbnails(recipe_id, name)
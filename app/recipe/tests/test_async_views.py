@@ -0,0 +1,141 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    AsyncClient, Client, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.executor import PoolSaturated
+from core.models import Tag, Ingredient
+
+
+TAGS_URL = reverse('recipe:tag-list-async')
+SYNC_TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list-async')
+
+
+class AsyncAttrApiTests(TransactionTestCase):
+    """Testa as views assíncronas de tags e ingredientes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = Client(HTTP_AUTHORIZATION='Token %s' % token.key)
+
+    @override_settings(RECIPE_LIST_CACHE_SHARED=True)
+    def test_list_matches_sync_view(self):
+        """Testa se a listagem tem os mesmos bytes da síncrona"""
+        Tag.objects.create(user=self.user, name='Jantar')
+        Tag.objects.create(user=self.user, name='Almoço')
+        other = get_user_model().objects.create_user('outro@email.com', '1')
+        Tag.objects.create(user=other, name='Lanche')
+
+        res = self.client.get(TAGS_URL)
+        sync = self.client.get(SYNC_TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.content, sync.content)
+        self.assertIn('ETag', res)
+        self.assertEqual(
+            [tag['name'] for tag in res.json()], ['Almoço', 'Jantar']
+        )
+
+    @override_settings(RECIPE_LIST_CACHE_SHARED=True)
+    def test_not_modified(self):
+        """Testa se o ETag vale também na view assíncrona"""
+        Ingredient.objects.create(user=self.user, name='Sal')
+        etag = self.client.get(INGREDIENTS_URL)['ETag']
+
+        res = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_list_filters_and_pagination(self):
+        """Testa o assigned_only e a paginação por cursor"""
+        for name in ('A', 'B', 'C'):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        page = self.client.get(INGREDIENTS_URL, {'page_size': 2}).json()
+        assigned = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertEqual(
+            [item['name'] for item in page['results']], ['A', 'B']
+        )
+        self.assertIn(INGREDIENTS_URL, page['next'])
+        self.assertEqual(assigned.json(), [])
+
+    def test_create(self):
+        """Testa a criação de um e de vários objetos"""
+        res = self.client.post(
+            TAGS_URL, {'name': 'Vegana'}, content_type='application/json'
+        )
+        bulk = self.client.post(
+            INGREDIENTS_URL, [{'name': 'Sal'}, {'name': 'Arroz'}],
+            content_type='application/json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.json()['name'], 'Vegana')
+        self.assertTrue(
+            Tag.objects.filter(user=self.user, name='Vegana').exists()
+        )
+        self.assertEqual(bulk.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_create_invalid_payload(self):
+        """Testa se os erros de validação são os do DRF"""
+        res = self.client.post(TAGS_URL, {'name': ''})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.json())
+
+    def test_authentication_required(self):
+        """Testa se as views exigem um token válido"""
+        res = Client().get(TAGS_URL)
+        invalid = Client(HTTP_AUTHORIZATION='Token invalido').get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+        self.assertEqual(invalid.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_method_not_allowed(self):
+        """Testa se apenas GET e POST são aceitos"""
+        res = self.client.delete(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(res['Allow'], 'GET, POST')
+
+    @patch('core.async_views.database_pool.submit', side_effect=PoolSaturated)
+    def test_saturated_pool(self, submit):
+        """Testa se a fila cheia do pool de BD responde 503"""
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+    @override_settings(SERVER_TIMING_ENABLED=True,
+                       RECIPE_LIST_CACHE_ENABLED=False)
+    async def test_pool_queries_are_instrumented(self):
+        """
+           Testa se as consultas feitas no pool de BD entram no
+           Server-Timing da requisição sob ASGI
+        """
+        client = AsyncClient()
+        auth = self.client.defaults['HTTP_AUTHORIZATION']
+        await client.get(TAGS_URL, authorization=auth)
+
+        res = await client.get(TAGS_URL, authorization=auth)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('desc="1 queries"', res['Server-Timing'])
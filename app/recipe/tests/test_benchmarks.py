@@ -0,0 +1,227 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from django.conf import settings
+from django.test import (
+    AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmark import benchmark, report, report_latency, summarize
+from core.models import Ingredient, Recipe, Tag
+
+from recipe.views import TagViewSet
+
+
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+TAGS_URL = reverse('recipe:tag-list')
+ASYNC_TAGS_URL = reverse('recipe:tag-list-async')
+
+
+@benchmark
+class BulkCreateBenchmark(TestCase):
+    """Compara a criação de ingredientes um a um e em lote"""
+    rows = 10000
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_single_vs_bulk_post(self):
+        payload = [{'name': 'Ingrediente %d' % i} for i in range(self.rows)]
+
+        start = time.perf_counter()
+        for item in payload:
+            self.client.post(INGREDIENTS_URL, item, format='json')
+        single = time.perf_counter() - start
+        Ingredient.objects.all().delete()
+
+        start = time.perf_counter()
+        res = self.client.post(INGREDIENTS_URL, payload, format='json')
+        bulk = time.perf_counter() - start
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ingredient.objects.count(), self.rows)
+        report('POST individual', self.rows, single)
+        report('POST em lote', self.rows, bulk)
+
+
+@benchmark
+class RecipeFilterBenchmark(TestCase):
+    """
+       Compara o filtro por tags com EXISTS e com JOIN + DISTINCT sobre
+       1M de linhas na tabela de associação
+    """
+    recipes = 100000
+    tags_per_recipe = 10
+    tag_count = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        Tag.objects.bulk_create(
+            Tag(user=cls.user, name='Tag %d' % i) for i in range(cls.tag_count)
+        )
+        Recipe.objects.bulk_create(
+            (Recipe(user=cls.user, title='Receita %d' % i,
+                    time_minutes=5, price=10)
+             for i in range(cls.recipes)),
+            batch_size=5000
+        )
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        recipe_ids = Recipe.objects.values_list('id', flat=True)
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(
+                recipe_id=recipe_id,
+                tag_id=tag_ids[(recipe_id * 7 + n) % cls.tag_count]
+            )
+             for recipe_id in recipe_ids.iterator()
+             for n in range(cls.tags_per_recipe)),
+            batch_size=10000
+        )
+
+    def _time(self, queryset):
+        start = time.perf_counter()
+        count = len(queryset.values_list('id', flat=True))
+        return count, time.perf_counter() - start
+
+    def test_exists_vs_distinct_join(self):
+        tag_ids = list(Tag.objects.values_list('id', flat=True)[:3])
+        base = Recipe.objects.filter(user=self.user)
+
+        joined, joined_time = self._time(
+            base.filter(tags__id__in=tag_ids).distinct()
+        )
+        exists, exists_time = self._time(base.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+            )
+        )))
+
+        self.assertEqual(joined, exists)
+        report('JOIN + DISTINCT', joined, joined_time)
+        report('EXISTS', exists, exists_time)
+
+
+@benchmark
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class FastListBenchmark(TestCase):
+    """Compara a listagem de tags com `.values()` e com o serializer"""
+    rows = 50000
+    repeat = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        Tag.objects.bulk_create(
+            (Tag(user=cls.user, name='Tag %d' % i) for i in range(cls.rows)),
+            batch_size=5000
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _time(self):
+        start = time.perf_counter()
+        for _ in range(self.repeat):
+            content = self.client.get(TAGS_URL).content
+        return content, time.perf_counter() - start
+
+    def test_fast_vs_regular_list(self):
+        fast, fast_time = self._time()
+        with patch.object(TagViewSet, 'list_values', None):
+            regular, regular_time = self._time()
+
+        self.assertEqual(fast, regular)
+        report('GET com serializer', self.rows * self.repeat, regular_time)
+        report('GET com values()', self.rows * self.repeat, fast_time)
+
+
+@benchmark
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class AsyncListBenchmark(TransactionTestCase):
+    """
+       Compara a listagem de tags com 500 clientes simultâneos: WSGI (pool
+       de threads do servidor), ASGI com a view síncrona do DRF e ASGI com
+       a view assíncrona
+    """
+    clients = 500
+    tag_count = 200
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        Tag.objects.bulk_create(
+            Tag(user=user, name='Tag %d' % i) for i in range(self.tag_count)
+        )
+        self.auth = 'Token %s' % Token.objects.create(user=user).key
+
+    def _wsgi(self):
+        """Um servidor WSGI com tantas threads quanto o pool de BD"""
+        def fetch(submitted):
+            res = Client().get(TAGS_URL, HTTP_AUTHORIZATION=self.auth)
+            return res.status_code, time.perf_counter() - submitted
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(settings.ASYNC_DB_WORKERS) as server:
+            results = list(server.map(
+                fetch, [time.perf_counter()] * self.clients
+            ))
+        elapsed = time.perf_counter() - start
+
+        return (summarize([latency for _, latency in results], elapsed),
+                {code for code, _ in results})
+
+    async def _asgi(self, url):
+        client = AsyncClient()
+        latencies = []
+        statuses = set()
+
+        async def fetch():
+            start = time.perf_counter()
+            # O AsyncClient do Django 3.1 envia os extras como headers
+            res = await client.get(url, authorization=self.auth)
+            latencies.append(time.perf_counter() - start)
+            statuses.add(res.status_code)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(fetch() for _ in range(self.clients)))
+        elapsed = time.perf_counter() - start
+
+        return summarize(latencies, elapsed), statuses
+
+    async def test_wsgi_vs_asgi(self):
+        wsgi, wsgi_statuses = self._wsgi()
+        asgi_sync, sync_statuses = await self._asgi(TAGS_URL)
+        asgi_async, async_statuses = await self._asgi(ASYNC_TAGS_URL)
+
+        self.assertEqual(wsgi_statuses, {status.HTTP_200_OK})
+        self.assertEqual(sync_statuses, {status.HTTP_200_OK})
+        self.assertTrue(async_statuses <= {
+            status.HTTP_200_OK, status.HTTP_503_SERVICE_UNAVAILABLE
+        })
+        report_latency('WSGI (%d threads)' % settings.ASYNC_DB_WORKERS,
+                       wsgi)
+        report_latency('ASGI, view síncrona', asgi_sync)
+        report_latency('ASGI, view assíncrona', asgi_async)
@@ -0,0 +1,146 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+from recipe import cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+@override_settings(RECIPE_LIST_CACHE_SHARED=True)
+class ConditionalGetTests(TestCase):
+    """Testa o ETag e o If-None-Match das listagens"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified_skips_query(self):
+        """Testa se o 304 é respondido sem consultar o BD"""
+        Tag.objects.create(user=self.user, name='Almoço')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_weak_and_multiple_etags(self):
+        """Testa a comparação fraca e a lista de ETags"""
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(
+            TAGS_URL, HTTP_IF_NONE_MATCH='"outro", W/%s' % etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_change_produces_new_etag(self):
+        """Testa se uma alteração faz o ETag antigo deixar de valer"""
+        etag = self.client.get(INGREDIENTS_URL)['ETag']
+
+        Ingredient.objects.create(user=self.user, name='Arroz')
+        res = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data), 1)
+
+    def test_etag_varies_by_query(self):
+        """Testa se filtros diferentes têm ETags diferentes"""
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(
+            TAGS_URL, {'assigned_only': 1}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_per_user(self):
+        """Testa se o ETag de um usuário não vale para outro"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        user2 = get_user_model().objects.create_user(
+            'fulaninho@email.com',
+            '1234'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_version_expires(self):
+        """Testa se a versão das listagens é guardada com validade"""
+        with patch.object(cache.get_cache(), 'add') as add, \
+                self.settings(RECIPE_LIST_CACHE_VERSION_TTL=30):
+            cache.get_version(Tag, self.user.id)
+
+        self.assertEqual(add.call_args[1]['timeout'], 30)
+
+
+class WorkerTests(TestCase):
+    """Testa o ETag com vários workers, cada um com o seu cliente de cache"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def worker(self, location):
+        """Cliente de cache de um worker; mesmo LOCATION, mesmos dados"""
+        worker_cache = LocMemCache(location, {})
+        self.addCleanup(worker_cache.clear)
+        return patch('recipe.cache.get_cache', return_value=worker_cache)
+
+    def list_and_change(self, first, second):
+        """Lista no primeiro worker, altera no segundo e lista de novo"""
+        with first:
+            etag = self.client.get(TAGS_URL).get('ETag', '"nenhum"')
+        with second:
+            Tag.objects.create(user=self.user, name='Almoço')
+        with first:
+            return self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+    @override_settings(RECIPE_LIST_CACHE_SHARED=True)
+    def test_shared_cache(self):
+        """Testa se a alteração em um worker invalida o ETag no outro"""
+        res = self.list_and_change(
+            self.worker('workers'), self.worker('workers')
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    @override_settings(RECIPE_LIST_CACHE_SHARED=False)
+    def test_process_local_cache(self):
+        """
+           Testa se, com um cache por processo, o ETag e o cache ficam
+           desligados e nenhum worker responde com a listagem antiga
+        """
+        res = self.list_and_change(
+            self.worker('worker-1'), self.worker('worker-2')
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertNotIn('ETag', res)
+        self.assertNotIn('X-Cache', res)
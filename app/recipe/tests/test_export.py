@@ -0,0 +1,137 @@
+import json
+import tracemalloc
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import asgi_get
+
+from recipe.export import iter_ndjson
+from recipe.views import ExportView
+
+
+EXPORT_URL = reverse('recipe:export')
+
+
+class ExportTests(TestCase):
+    """Testa a exportação do catálogo em NDJSON"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_login_required(self):
+        """Testa se a exportação exige autenticação"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_catalog(self):
+        """Testa se tags, ingredientes e receitas são exportados"""
+        tag = Tag.objects.create(user=self.user, name='Vegana')
+        ingredient = Ingredient.objects.create(user=self.user, name='Arroz')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Arroz doce', time_minutes=30, price=7.5
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+        other = get_user_model().objects.create_user('outro@email.com', '1')
+        Tag.objects.create(user=other, name='Lanche')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        records = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual(records, [
+            {'type': 'tag', 'id': tag.id, 'name': 'Vegana'},
+            {'type': 'ingredient', 'id': ingredient.id, 'name': 'Arroz'},
+            {'type': 'recipe', 'id': recipe.id, 'title': 'Arroz doce',
+             'time_minutes': 30, 'price': '7.50', 'link': '',
+             'tags': [tag.id], 'ingredients': [ingredient.id]},
+        ])
+
+    def test_export_command(self):
+        """Testa o comando de exportação"""
+        Tag.objects.create(user=self.user, name='Vegana')
+        out = StringIO()
+
+        call_command('export_recipes', self.user.email, stdout=out)
+
+        self.assertEqual(
+            json.loads(out.getvalue())['name'], 'Vegana'
+        )
+
+    def test_export_memory_is_constant(self):
+        """Testa a exportação de 200 mil receitas com memória limitada"""
+        recipes = 200000
+        tag = Tag.objects.create(user=self.user, name='Vegana')
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO core_recipe '
+                '(user_id, title, time_minutes, price, link, '
+                'thumbnails_ready) VALUES (%s, %s, 5, 10, \'\', %s)',
+                [(self.user.id, 'Receita %d' % i, False)
+                 for i in range(recipes)]
+            )
+            cursor.execute(
+                'INSERT INTO core_recipe_tags (recipe_id, tag_id) '
+                'SELECT id, %s FROM core_recipe WHERE user_id = %s',
+                [tag.id, self.user.id]
+            )
+
+        tracemalloc.start()
+        lines = 0
+        for chunk in iter_ndjson(self.user):
+            lines += chunk.count(b'\n')
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        self.assertEqual(lines, recipes + 1)
+        self.assertLess(peak, 16 * 2 ** 20)
+
+
+class ExportAsgiTests(TransactionTestCase):
+    """Testa a exportação servida pelo handler ASGI"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.auth = 'Token %s' % Token.objects.create(user=user).key
+        for i in range(5):
+            Tag.objects.create(user=user, name='Tag %d' % i)
+
+    async def test_export_under_asgi(self):
+        """Testa se o catálogo é lido em pedaços fora do event loop"""
+        with patch.object(ExportView, 'chunk_size', 2):
+            status_code, headers, body, messages = await asgi_get(
+                EXPORT_URL, [('authorization', self.auth)]
+            )
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(headers[b'Content-Type'], b'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line)['name'] for line in body.splitlines()],
+            ['Tag %d' % i for i in range(5)]
+        )
+        self.assertGreater(messages, 3)
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def sample_recipe(user, title):
+    """Cria uma receita de exemplo"""
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+
+
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class RecipeFilterApiTests(TestCase):
+    """Testa os filtros por tags e ingredientes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegana')
+        self.dessert = Tag.objects.create(user=self.user, name='Sobremesa')
+        self.unused = Tag.objects.create(user=self.user, name='Lanche')
+        self.rice = Ingredient.objects.create(user=self.user, name='Arroz')
+        self.salt = Ingredient.objects.create(user=self.user, name='Sal')
+
+        self.salad = sample_recipe(self.user, 'Salada')
+        self.salad.tags.add(self.vegan)
+        self.pudding = sample_recipe(self.user, 'Arroz doce')
+        self.pudding.tags.add(self.vegan, self.dessert)
+        self.pudding.ingredients.add(self.rice)
+        self.plain = sample_recipe(self.user, 'Omelete')
+
+    def titles(self, url, params, queries):
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(captured), queries)
+        self.assertIn('EXISTS', captured[0]['sql'])
+        self.assertNotIn('DISTINCT', captured[0]['sql'])
+        key = 'title' if url == RECIPES_URL else 'name'
+
+        return [item[key] for item in res.data]
+
+    def test_filter_recipes_by_any_tag(self):
+        """Testa se cada receita aparece uma vez com qualquer das tags"""
+        titles = self.titles(
+            RECIPES_URL,
+            {'tags': '%d,%d' % (self.vegan.id, self.dessert.id)},
+            queries=3
+        )
+
+        self.assertEqual(titles, ['Arroz doce', 'Salada'])
+
+    def test_filter_recipes_by_tags_and_ingredients(self):
+        """Testa a combinação dos filtros de tags e ingredientes"""
+        titles = self.titles(
+            RECIPES_URL,
+            {'tags': str(self.vegan.id), 'ingredients': str(self.rice.id)},
+            queries=3
+        )
+
+        self.assertEqual(titles, ['Arroz doce'])
+
+    def test_invalid_ids(self):
+        """Testa se ids inválidos são rejeitados"""
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tags_assigned_only(self):
+        """Testa a listagem apenas das tags usadas por receitas"""
+        names = self.titles(TAGS_URL, {'assigned_only': 1}, queries=1)
+
+        self.assertEqual(names, ['Sobremesa', 'Vegana'])
+
+    def test_ingredients_assigned_only(self):
+        """Testa a listagem apenas dos ingredientes usados por receitas"""
+        names = self.titles(INGREDIENTS_URL, {'assigned_only': 1}, queries=1)
+
+        self.assertEqual(names, ['Arroz'])
+
+
+class AssignedOnlyCacheTests(TestCase):
+    """Testa se o cache acompanha as mudanças nas receitas"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_assigning_tag_invalidates(self):
+        """Testa se associar ou apagar receitas atualiza a listagem"""
+        tag = Tag.objects.create(user=self.user, name='Vegana')
+        recipe = sample_recipe(self.user, 'Salada')
+        params = {'assigned_only': 1}
+        self.assertEqual(self.client.get(TAGS_URL, params).data, [])
+
+        recipe.tags.add(tag)
+        self.assertEqual(len(self.client.get(TAGS_URL, params).data), 1)
+
+        recipe.delete()
+        self.assertEqual(self.client.get(TAGS_URL, params).data, [])
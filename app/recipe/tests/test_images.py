@@ -0,0 +1,208 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.executor import PoolSaturated
+from core.models import Job, Recipe
+
+from recipe import images
+
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def image_upload_url(recipe_id):
+    """Retorna a URL de upload de imagem da receita"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_image(size=(800, 600)):
+    """Cria um arquivo JPEG temporário"""
+    image_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+    Image.new('RGB', size, (200, 40, 40)).save(image_file, format='JPEG')
+    image_file.seek(0)
+    return image_file
+
+
+class ImageTestMixin:
+    """Usa um MEDIA_ROOT temporário como storage local"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=media_root, PASSWORD_HASHERS=FAST_HASHERS,
+            RECIPE_THUMBNAIL_SIZES=[64, 128]
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Bauru', time_minutes=10, price=5.00
+        )
+
+    def upload(self, image_file):
+        return self.client.post(
+            image_upload_url(self.recipe.id), {'image': image_file},
+            format='multipart'
+        )
+
+
+class RecipeImageUploadTests(ImageTestMixin, TestCase):
+    """Testa o upload de imagens das receitas"""
+
+    def test_upload_image(self):
+        """Testa se a imagem é salva e as miniaturas ficam pendentes"""
+        with sample_image() as image_file:
+            res = self.upload(image_file)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('image', res.data)
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertFalse(res.data['thumbnails_ready'])
+        self.assertIsNone(res.data['thumbnails'])
+
+    def test_upload_image_invalid(self):
+        """Testa se um arquivo que não é imagem é recusado"""
+        res = self.upload('nada')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=1024)
+    def test_upload_image_too_large(self):
+        """Testa se o upload acima do limite é descartado"""
+        with sample_image() as image_file:
+            res = self.upload(image_file)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_image_other_user(self):
+        """Testa se não é possível enviar imagem para receita de outro"""
+        other = get_user_model().objects.create_user('outro@email.com', '1234')
+        self.client.force_authenticate(other)
+
+        with sample_image() as image_file:
+            res = self.upload(image_file)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_generate_thumbnails(self):
+        """Testa se as miniaturas respeitam o tamanho máximo"""
+        with sample_image() as image_file:
+            self.upload(image_file)
+        self.recipe.refresh_from_db()
+
+        updated = images.generate_thumbnails(
+            self.recipe.id, self.recipe.image.name
+        )
+
+        self.assertEqual(updated, 1)
+        for size in (64, 128):
+            path = images.thumbnail_name(self.recipe.image.name, size)
+            with default_storage.open(path) as thumbnail:
+                self.assertEqual(max(Image.open(thumbnail).size), size)
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(res.data['thumbnails_ready'])
+        self.assertEqual(sorted(res.data['thumbnails']), ['128', '64'])
+        self.assertTrue(res.data['thumbnails']['64'].endswith('.thumb64.jpg'))
+
+    def test_generate_thumbnails_command(self):
+        """Testa se o comando gera as miniaturas pendentes"""
+        with sample_image() as image_file:
+            self.upload(image_file)
+        out = StringIO()
+
+        call_command('generate_thumbnails', stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.thumbnails_ready)
+        self.assertIn('1 receitas processadas, 0 falhas', out.getvalue())
+
+
+class RecipeThumbnailPoolTests(ImageTestMixin, TransactionTestCase):
+    """Testa a geração das miniaturas em segundo plano, após o commit"""
+
+    def drain(self):
+        images.thumbnail_pool.shutdown(wait=True)
+
+    def test_thumbnails_generated_after_upload(self):
+        """Testa se as miniaturas ficam prontas sem bloquear o upload"""
+        with sample_image() as image_file:
+            self.upload(image_file)
+        self.drain()
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.thumbnails_ready)
+        self.assertTrue(default_storage.exists(
+            images.thumbnail_name(self.recipe.image.name, 128)
+        ))
+
+    def test_replace_and_delete_remove_files(self):
+        """Testa se trocar ou apagar a imagem remove os arquivos antigos"""
+        with sample_image() as image_file:
+            self.upload(image_file)
+        self.drain()
+        self.recipe.refresh_from_db()
+        old = self.recipe.image.name
+
+        with sample_image((300, 300)) as image_file:
+            self.upload(image_file)
+        self.drain()
+        self.recipe.refresh_from_db()
+
+        self.assertFalse(default_storage.exists(old))
+        self.assertFalse(default_storage.exists(
+            images.thumbnail_name(old, 64)
+        ))
+        current = self.recipe.image.name
+        self.recipe.delete()
+        self.assertFalse(default_storage.exists(current))
+
+    def test_pool_saturated(self):
+        """Testa se o pool cheio manda as miniaturas para a fila"""
+        with patch.object(images.thumbnail_pool, 'submit',
+                          side_effect=PoolSaturated('thumbnails')), \
+                self.assertLogs('recipe.images', 'WARNING'):
+            with sample_image() as image_file:
+                res = self.upload(image_file)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.recipe.thumbnails_ready)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'recipe.generate_thumbnails')
+        self.assertEqual(job.kwargs, {
+            'recipe_id': self.recipe.id, 'name': self.recipe.image.name,
+            'user_id': self.user.id,
+        })
+
+        call_command('run_jobs', burst=True, stdout=StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.thumbnails_ready)
@@ -0,0 +1,194 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.export import iter_ndjson
+from recipe.importer import RecipeImporter, read_ndjson
+from recipe.search import search_recipes
+
+
+def recipe_line(title, tags=(), ingredients=(), **fields):
+    record = {
+        'title': title, 'time_minutes': 10, 'price': '5.00',
+        'tags': list(tags), 'ingredients': list(ingredients),
+    }
+    record.update(fields)
+    return json.dumps(record) + '\n'
+
+
+class ImportTests(TestCase):
+    """Testa a importação em massa de receitas"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write(content)
+        return path
+
+    def import_file(self, path, **options):
+        out = StringIO()
+        call_command(
+            'import_recipes', path, user=self.user.email, stdout=out,
+            **options
+        )
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Testa se receitas, tags, ingredientes e relações são criados"""
+        existing = Tag.objects.create(user=self.user, name='Vegana')
+        path = self.write('recipes.ndjson', ''.join([
+            recipe_line('Arroz doce', ['vegana', 'Sobremesa'], ['Arroz']),
+            '\n',
+            recipe_line('Feijoada', ['Almoço'], ['Feijão', 'Arroz'],
+                        link='https://exemplo.com'),
+        ]))
+
+        out = self.import_file(path)
+
+        self.assertIn('2 receitas', out)
+        self.assertIn('linhas/s', out)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2
+        )
+        recipe = Recipe.objects.get(user=self.user, title='Arroz doce')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Sobremesa', 'Vegana']
+        )
+        self.assertIn(existing, recipe.tags.all())
+        feijoada = Recipe.objects.get(title='Feijoada')
+        self.assertEqual(feijoada.link, 'https://exemplo.com')
+        self.assertEqual(feijoada.ingredients.count(), 2)
+
+    def test_import_updates_search_index(self):
+        """Testa se as receitas importadas aparecem na busca"""
+        path = self.write('recipes.ndjson', recipe_line(
+            'Bolo de cenoura', ['Lanche'], ['Cenoura']
+        ))
+
+        self.import_file(path)
+
+        found = search_recipes(Recipe.objects.all(), 'cenoura')
+        self.assertEqual([r.title for r in found], ['Bolo de cenoura'])
+
+    def test_import_csv(self):
+        """Testa a importação de CSV com nomes separados por |"""
+        path = self.write('recipes.csv', (
+            'title,time_minutes,price,link,tags,ingredients\n'
+            'Salada,5,12.50,,Vegana|Leve,Alface|Tomate\n'
+        ))
+
+        self.import_file(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.time_minutes, 5)
+        self.assertEqual(str(recipe.price), '12.50')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_import_exported_catalog(self):
+        """Testa se o NDJSON do export_recipes pode ser importado"""
+        other = get_user_model().objects.create_user('outro@email.com', '1')
+        tag = Tag.objects.create(user=other, name='Vegana')
+        Tag.objects.create(user=other, name='Sem uso')
+        recipe = Recipe.objects.create(
+            user=other, title='Arroz doce', time_minutes=30, price=7.5
+        )
+        recipe.tags.add(tag)
+        path = self.write('catalog.ndjson', b''.join(
+            iter_ndjson(other)
+        ).decode())
+
+        self.import_file(path)
+
+        self.assertEqual(
+            sorted(Tag.objects.filter(
+                user=self.user
+            ).values_list('name', flat=True)),
+            ['Sem uso', 'Vegana']
+        )
+        imported = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            list(imported.tags.values_list('name', flat=True)), ['Vegana']
+        )
+
+    def test_import_resumes_from_checkpoint(self):
+        """Testa se a importação retoma após a última linha confirmada"""
+        path = self.write('recipes.ndjson', ''.join(
+            recipe_line('Receita %d' % i) for i in range(5)
+        ))
+        checkpoint = os.path.join(self.tmp, 'checkpoint.json')
+        with open(checkpoint, 'w') as output:
+            json.dump({'line': 3}, output)
+
+        self.import_file(path, checkpoint=checkpoint, batch_size=1)
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            ['Receita 3', 'Receita 4']
+        )
+        with open(checkpoint) as data:
+            self.assertEqual(json.load(data), {'line': 5})
+
+    def test_import_invalid_record(self):
+        """
+           Testa se um registro inválido interrompe a importação mantendo
+           os lotes já confirmados e o checkpoint
+        """
+        path = self.write('recipes.ndjson', ''.join([
+            recipe_line('Receita 1'),
+            recipe_line('Receita 2'),
+            recipe_line('Receita 3', price='caro'),
+        ]))
+        checkpoint = os.path.join(self.tmp, 'checkpoint.json')
+
+        with self.assertRaisesMessage(CommandError, 'Linha 3: price'):
+            self.import_file(path, checkpoint=checkpoint, batch_size=2)
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        with open(checkpoint) as data:
+            self.assertEqual(json.load(data), {'line': 2})
+
+    def test_import_queries_per_batch(self):
+        """Testa se o número de consultas não depende do número de linhas"""
+        def count_queries(recipes):
+            lines = [
+                recipe_line(
+                    'Receita %d' % i, ['Tag %d' % i], ['Sal %d' % recipes]
+                )
+                for i in range(recipes)
+            ]
+            importer = RecipeImporter(self.user, batch_size=1000)
+            with CaptureQueriesContext(connection) as queries:
+                importer.run(read_ndjson(lines))
+            return len(queries)
+
+        self.assertEqual(count_queries(10), count_queries(120))
+        self.assertEqual(Recipe.objects.count(), 130)
+
+    def test_unknown_user(self):
+        """Testa se o comando falha para um usuário inexistente"""
+        path = self.write('recipes.ndjson', recipe_line('Receita'))
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, user='nao@existe.com')
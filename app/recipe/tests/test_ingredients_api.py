@@ -6,8 +6,10 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Ingredient
+from core.testing import query_budget
 
 from recipe.serializers import IngredientSerializer
+from recipe.views import IngredientViewSet
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
@@ -37,6 +39,7 @@ class PrivateIngredientApiTests(TestCase):
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
+    @query_budget(IngredientViewSet, 'list', 1)
     def test_retrieve_ingredients(self):
         """Testa se a consulta de ingredientes"""
         Ingredient.objects.create(user=self.user, name='Arroz')
@@ -72,6 +75,7 @@ class PrivateIngredientApiTests(TestCase):
         self.assertEqual(len(res.data), 2)
         self.assertNotIn(other_ingredient, res.data)
 
+    @query_budget(IngredientViewSet, 'create', 3)
     def test_create_ingredients_successful(self):
         """Testa a criação dos ingredientes"""
         payload = {
@@ -96,3 +100,23 @@ class PrivateIngredientApiTests(TestCase):
         res = self.client.post(INGREDIENTS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @query_budget(IngredientViewSet, 'create', 6)
+    def test_bulk_create_ingredients(self):
+        """Testa a criação de vários ingredientes em uma única requisição"""
+        payload = [{'name': 'Sal'}, {'name': 'Arroz'}]
+
+        res = self.client.post(INGREDIENTS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        ingredients = Ingredient.objects.filter(user=self.user)
+        self.assertEqual(
+            [item['id'] for item in res.data],
+            [ingredients.get(name=item['name']).id for item in payload]
+        )
+
+    def test_bulk_create_ingredients_empty_list(self):
+        """Testa se uma lista vazia é rejeitada"""
+        res = self.client.post(INGREDIENTS_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+from recipe import cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+@override_settings(RECIPE_LIST_CACHE_SHARED=True)
+class ListCacheTests(TestCase):
+    """Testa o cache das listagens de tags e ingredientes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.reset_stats()
+
+    def test_second_request_is_a_hit(self):
+        """Testa se a segunda listagem vem do cache, sem consultas"""
+        Tag.objects.create(user=self.user, name='Almoço')
+
+        first = self.client.get(TAGS_URL)
+        with self.assertNumQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_create_invalidates(self):
+        """Testa se criar um objeto invalida a listagem em cache"""
+        self.client.get(INGREDIENTS_URL)
+
+        self.client.post(INGREDIENTS_URL, {'name': 'Arroz'})
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual([item['name'] for item in res.data], ['Arroz'])
+
+    def test_update_and_delete_invalidate(self):
+        """Testa se alterar ou remover um objeto invalida a listagem"""
+        tag = Tag.objects.create(user=self.user, name='Almoço')
+        self.client.get(TAGS_URL)
+
+        tag.name = 'Jantar'
+        tag.save()
+        renamed = self.client.get(TAGS_URL)
+        tag.delete()
+        deleted = self.client.get(TAGS_URL)
+
+        self.assertEqual(renamed.data[0]['name'], 'Jantar')
+        self.assertEqual(deleted.data, [])
+
+    def test_bulk_create_invalidates(self):
+        """Testa se a criação em lote invalida a listagem"""
+        self.client.get(TAGS_URL)
+
+        self.client.post(TAGS_URL, [{'name': 'Almoço'}], format='json')
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_cache_per_user_and_model(self):
+        """Testa se a alteração de um usuário não invalida a de outro"""
+        user2 = get_user_model().objects.create_user(
+            'fulaninho@email.com',
+            '1234'
+        )
+        self.client.get(TAGS_URL)
+
+        Tag.objects.create(user=user2, name='Lanche')
+        Ingredient.objects.create(user=self.user, name='Arroz')
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    @override_settings(RECIPE_LIST_CACHE_MAX_ROWS=1)
+    def test_large_lists_not_cached(self):
+        """Testa se listagens acima do limite de linhas não são guardadas"""
+        Tag.objects.create(user=self.user, name='Almoço')
+        Tag.objects.create(user=self.user, name='Jantar')
+
+        self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    @override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+    def test_cache_disabled(self):
+        """Testa se o cache pode ser desligado"""
+        self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('X-Cache', res)
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 0})
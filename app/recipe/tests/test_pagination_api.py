@@ -0,0 +1,112 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class CursorPaginationApiTests(TestCase):
+    """Testa a paginação por cursor das tags e ingredientes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, **params):
+        """Percorre todas as páginas seguindo o link `next`"""
+        names = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            names += [item['name'] for item in res.data['results']]
+            if not res.data['next']:
+                return names, res
+            res = self.client.get(res.data['next'])
+
+    def test_pagination_is_opt_in(self):
+        """Testa se a listagem sem parâmetros continua sem paginação"""
+        Tag.objects.create(user=self.user, name='Almoço')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_walk_all_pages(self):
+        """Testa se todas as tags aparecem uma única vez, em ordem"""
+        for name in ['Lanche', 'Almoço', 'Jantar', 'Brunch', 'Café']:
+            Tag.objects.create(user=self.user, name=name)
+
+        names, _ = self._walk(TAGS_URL, page_size=2)
+
+        self.assertEqual(
+            names, ['Almoço', 'Brunch', 'Café', 'Jantar', 'Lanche']
+        )
+
+    def test_previous_page(self):
+        """Testa se o cursor `previous` volta para a página anterior"""
+        for name in ['Arroz', 'Feijão', 'Ovo', 'Sal']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        first = self.client.get(INGREDIENTS_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(
+            [item['name'] for item in second.data['results']],
+            ['Ovo', 'Sal']
+        )
+        self.assertIsNone(second.data['next'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+
+    def test_pagination_limited_to_user(self):
+        """Testa se a paginação respeita o usuário logado"""
+        user2 = get_user_model().objects.create_user(
+            'fulaninho@email.com',
+            '1234'
+        )
+        Ingredient.objects.create(user=self.user, name='Arroz')
+        Ingredient.objects.create(user=user2, name='Farinha')
+
+        names, _ = self._walk(INGREDIENTS_URL, page_size=1)
+
+        self.assertEqual(names, ['Arroz'])
+
+    def test_invalid_cursor(self):
+        """Testa se um cursor inválido é rejeitado"""
+        res = self.client.get(TAGS_URL, {'cursor': 'invalido'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        """Testa se um cursor com valores de tipo errado é rejeitado"""
+        Tag.objects.create(user=self.user, name='Almoço')
+        for url, params, position in (
+            (TAGS_URL, {}, ['a', 'x']),
+            (TAGS_URL, {}, ['a', None]),
+            (TAGS_URL, {}, ['a', [1]]),
+            (TAGS_URL, {'ordering': '-recipe_count'}, ['x', 1]),
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps(
+                {'p': position, 'r': False}
+            ).encode()).decode()
+
+            res = self.client.get(url, dict(params, cursor=cursor))
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
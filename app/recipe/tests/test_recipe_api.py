@@ -0,0 +1,183 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import query_budget
+
+from recipe.serializers import RecipeDetailSerializer
+from recipe.views import RecipeViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Retorna a URL de detalhe da receita"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_tag(user, name='Almoço'):
+    """Cria uma tag de exemplo"""
+    return Tag.objects.create(user=user, name=name)
+
+
+def sample_ingredient(user, name='Arroz'):
+    """Cria um ingrediente de exemplo"""
+    return Ingredient.objects.create(user=user, name=name)
+
+
+def sample_recipe(user, **params):
+    """Cria uma receita de exemplo"""
+    defaults = {
+        'title': 'Bauru',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicRecipeApiTests(TestCase):
+    """Testes da API pública de receitas"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required(self):
+        """Testa se o login é obrigatório para acessar o endpoint"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeApiTests(TestCase):
+    """Testes da API privada de receitas"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @query_budget(RecipeViewSet, 'list', 3)
+    def test_retrieve_recipes(self):
+        """Testa a consulta das receitas"""
+        sample_recipe(user=self.user)
+        sample_recipe(user=self.user, title='Misto')
+
+        res = self.client.get(RECIPES_URL)
+
+        recipes = Recipe.objects.all().order_by('-id')
+        serializer = RecipeDetailSerializer(recipes, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, serializer.data)
+
+    def test_recipes_limited_to_user(self):
+        """Testa se a consulta de receitas está limitada ao usuário logado"""
+        user2 = get_user_model().objects.create_user(
+            'fulaninho@email.com',
+            '1234'
+        )
+        sample_recipe(user=user2)
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    @query_budget(RecipeViewSet, 'retrieve', 3)
+    def test_view_recipe_detail(self):
+        """Testa o detalhe da receita com tags e ingredientes aninhados"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+
+        res = self.client.get(detail_url(recipe.id))
+
+        serializer = RecipeDetailSerializer(recipe)
+        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['tags'][0]['name'], 'Almoço')
+
+    @query_budget(RecipeViewSet, 'create', 19)
+    def test_create_recipe_with_tags_and_ingredients(self):
+        """Testa a criação de uma receita com tags e ingredientes"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = {
+            'title': 'Arroz doce',
+            'tags': [tag.id],
+            'ingredients': [ingredient.id],
+            'time_minutes': 40,
+            'price': 12.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_create_recipe_with_other_users_tag(self):
+        """Testa se tags e ingredientes de outro usuário são recusados"""
+        user2 = get_user_model().objects.create_user(
+            'fulaninho@email.com',
+            '1234'
+        )
+        tag = sample_tag(user=user2)
+        ingredient = sample_ingredient(user=user2)
+
+        for payload in ({'tags': [tag.id]}, {'ingredients': [ingredient.id]}):
+            payload.update({'title': 'Arroz doce', 'time_minutes': 40,
+                            'price': 12.00})
+            res = self.client.post(RECIPES_URL, payload)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+
+    def _list_queries(self, recipes, tags, ingredients):
+        """Cria as receitas e retorna as consultas feitas pela listagem"""
+        Recipe.objects.all().delete()
+        for i in range(recipes):
+            recipe = sample_recipe(self.user, title='Receita %d' % i)
+            recipe.tags.set(tags)
+            recipe.ingredients.set(ingredients)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), recipes)
+        self.assertEqual(len(res.data[0]['tags']), 3)
+
+        return len(queries)
+
+    def test_list_query_count_is_constant(self):
+        """
+           Testa se a listagem faz o mesmo número de consultas com 1 ou
+           500 receitas
+        """
+        tags = [sample_tag(self.user, 'Tag %d' % i) for i in range(3)]
+        ingredients = [
+            sample_ingredient(self.user, 'Ingrediente %d' % i)
+            for i in range(3)
+        ]
+
+        single = self._list_queries(1, tags, ingredients)
+        many = self._list_queries(500, tags, ingredients)
+
+        self.assertEqual(single, 3)
+        self.assertEqual(many, single)
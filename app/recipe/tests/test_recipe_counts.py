@@ -0,0 +1,167 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.bulk import upsert_by_name
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.counts import recount
+from recipe.importer import RecipeImporter, read_ndjson
+from recipe.tests.test_import import recipe_line
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def counts(model):
+    return dict(model.objects.values_list('name', 'recipe_count'))
+
+
+class RecipeCountTests(TestCase):
+    """Testa os contadores de receitas das tags e ingredientes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.doce = Tag.objects.create(user=self.user, name='Doce')
+        self.rapida = Tag.objects.create(user=self.user, name='Rápida')
+
+    def recipe(self, title='Bolo'):
+        return Recipe.objects.create(
+            user=self.user, title=title, time_minutes=10, price=5
+        )
+
+    def test_add_remove_clear(self):
+        """Testa os contadores ao ligar e desligar tags da receita"""
+        bolo, torta = self.recipe(), self.recipe('Torta')
+
+        bolo.tags.add(self.doce, self.rapida)
+        bolo.tags.add(self.doce)
+        torta.tags.add(self.doce)
+        self.assertEqual(counts(Tag), {'Doce': 2, 'Rápida': 1})
+
+        torta.tags.remove(self.doce, self.rapida)
+        self.assertEqual(counts(Tag), {'Doce': 1, 'Rápida': 1})
+
+        bolo.tags.clear()
+        self.assertEqual(counts(Tag), {'Doce': 0, 'Rápida': 0})
+
+    def test_reverse_side(self):
+        """Testa os contadores ao alterar pelo lado da tag"""
+        bolo, torta = self.recipe(), self.recipe('Torta')
+
+        self.doce.recipe_set.add(bolo, torta)
+        self.doce.recipe_set.remove(torta, torta)
+        self.assertEqual(counts(Tag)['Doce'], 1)
+
+        self.doce.recipe_set.clear()
+        self.assertEqual(counts(Tag)['Doce'], 0)
+
+    def test_delete_recipe(self):
+        """Testa se apagar a receita desconta das tags e ingredientes"""
+        arroz = Ingredient.objects.create(user=self.user, name='Arroz')
+        bolo, torta = self.recipe(), self.recipe('Torta')
+        for recipe in (bolo, torta):
+            recipe.tags.add(self.doce)
+            recipe.ingredients.add(arroz)
+
+        Recipe.objects.filter(id=bolo.id).delete()
+
+        self.assertEqual(counts(Tag)['Doce'], 1)
+        self.assertEqual(counts(Ingredient), {'Arroz': 1})
+
+    def test_save_keeps_count(self):
+        """Testa se salvar um objeto com contador antigo não o sobrescreve"""
+        self.recipe().tags.add(self.doce)
+
+        self.doce.name = 'Doces'
+        self.doce.save()
+
+        self.assertEqual(counts(Tag), {'Doces': 1, 'Rápida': 0})
+
+    def test_api(self):
+        """Testa o contador na criação pela API e na listagem"""
+        self.client.post(RECIPES_URL, {
+            'title': 'Pudim', 'time_minutes': 60, 'price': 10,
+            'tags': [self.doce.id], 'ingredients': [],
+        }, format='json')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data, [
+            {'id': self.doce.id, 'name': 'Doce', 'recipe_count': 1},
+            {'id': self.rapida.id, 'name': 'Rápida', 'recipe_count': 0},
+        ])
+
+    @override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+    def test_ordering_by_count(self):
+        """Testa a ordenação pelas mais usadas, com paginação"""
+        vegana = Tag.objects.create(user=self.user, name='Vegana')
+        for title in ('Bolo', 'Torta', 'Pudim'):
+            self.recipe(title).tags.add(self.rapida)
+        self.recipe('Salada').tags.add(vegana)
+
+        res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+        self.assertEqual(
+            [item['name'] for item in res.data], ['Rápida', 'Vegana', 'Doce']
+        )
+
+        first = self.client.get(
+            TAGS_URL, {'ordering': '-recipe_count', 'page_size': 2}
+        )
+        second = self.client.get(first.data['next'])
+        self.assertEqual(
+            [item['name'] for item in second.data['results']], ['Doce']
+        )
+
+    def test_invalid_ordering(self):
+        """Testa se ordenações não suportadas são recusadas"""
+        res = self.client.get(TAGS_URL, {'ordering': 'user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', res.data)
+
+    def test_recount(self):
+        """Testa se o recount corrige os contadores divergentes"""
+        self.recipe().tags.add(self.doce, self.rapida)
+        Tag.objects.filter(id=self.doce.id).update(recipe_count=7)
+        Tag.objects.filter(id=self.rapida.id).update(recipe_count=0)
+
+        self.assertEqual(recount(Tag, batch_size=1), {self.user.id})
+        self.assertEqual(counts(Tag), {'Doce': 1, 'Rápida': 1})
+        self.assertEqual(recount(Tag), set())
+
+    def test_recount_command(self):
+        """Testa o comando de recontagem"""
+        Tag.objects.update(recipe_count=3)
+        out = StringIO()
+
+        call_command('recount', batch_size=1, stdout=out)
+
+        self.assertEqual(counts(Tag), {'Doce': 0, 'Rápida': 0})
+        self.assertIn('tags: 1 usuários corrigidos', out.getvalue())
+
+    def test_raw_inserts(self):
+        """Testa os contadores nas inserções sem signals"""
+        upsert_by_name(Tag, self.user, ['Salgada'])
+        self.assertEqual(counts(Tag)['Salgada'], 0)
+
+        RecipeImporter(self.user).run(read_ndjson([
+            recipe_line('Bolo', ['Doce', 'Nova'], ['Sal']),
+            recipe_line('Torta', ['doce'], ['Sal']),
+        ]))
+
+        self.assertEqual(counts(Tag)['Doce'], 2)
+        self.assertEqual(counts(Tag)['Nova'], 1)
+        self.assertEqual(counts(Ingredient), {'Sal': 2})
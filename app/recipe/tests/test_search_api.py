@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, title, price=5.00):
+    """Cria uma receita de exemplo"""
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=price
+    )
+
+
+class RecipeSearchApiTests(TestCase):
+    """Testa a busca textual das receitas"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        res = self.client.get(RECIPES_URL, {'search': text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['title'] for recipe in res.data]
+
+    def test_search_by_title(self):
+        """Testa a busca pelo título"""
+        sample_recipe(self.user, 'Bolo de cenoura')
+        sample_recipe(self.user, 'Arroz carreteiro')
+
+        self.assertEqual(self.search('bolo'), ['Bolo de cenoura'])
+
+    def test_search_by_tag_and_ingredient(self):
+        """Testa a busca pelos nomes das tags e ingredientes"""
+        recipe = sample_recipe(self.user, 'Panqueca')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegana'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Aveia')
+        )
+        sample_recipe(self.user, 'Omelete')
+
+        self.assertEqual(self.search('vegana'), ['Panqueca'])
+        self.assertEqual(self.search('aveia'), ['Panqueca'])
+
+    def test_index_follows_changes(self):
+        """Testa se o índice acompanha alterações de título e relações"""
+        recipe = sample_recipe(self.user, 'Torta')
+        tag = Tag.objects.create(user=self.user, name='Doce')
+        recipe.tags.add(tag)
+
+        recipe.title = 'Quiche'
+        recipe.save()
+        tag.name = 'Salgada'
+        tag.save()
+
+        self.assertEqual(self.search('torta'), [])
+        self.assertEqual(self.search('quiche salgada'), ['Quiche'])
+        recipe.tags.remove(tag)
+        self.assertEqual(self.search('salgada'), [])
+
+        tag.recipe_set.add(recipe)
+        self.assertEqual(self.search('salgada'), ['Quiche'])
+        tag.delete()
+        self.assertEqual(self.search('salgada'), [])
+
+    def test_results_ranked(self):
+        """Testa se o título pesa mais que os ingredientes"""
+        in_ingredient = sample_recipe(self.user, 'Bolo simples')
+        in_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Chocolate')
+        )
+        sample_recipe(self.user, 'Mousse de chocolate')
+
+        self.assertEqual(
+            self.search('chocolate'),
+            ['Mousse de chocolate', 'Bolo simples']
+        )
+
+    def test_search_limited_to_user(self):
+        """Testa se a busca não retorna receitas de outros usuários"""
+        user2 = get_user_model().objects.create_user(
+            'fulaninho@email.com',
+            '1234'
+        )
+        sample_recipe(user2, 'Bolo de fubá')
+
+        self.assertEqual(self.search('bolo'), [])
+
+    def test_search_ignores_query_syntax(self):
+        """Testa se caracteres especiais não quebram a busca"""
+        sample_recipe(self.user, 'Pão de queijo')
+
+        self.assertEqual(self.search('"pão" (queijo*'), ['Pão de queijo'])
+        self.assertEqual(self.search('***'), [])
+
+    def test_search_fallback_on_other_backends(self):
+        """Testa a busca por `icontains` nos bancos sem índice de busca"""
+        recipe = sample_recipe(self.user, 'Panqueca')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegana'))
+        sample_recipe(self.user, 'Panqueca de carne')
+        sample_recipe(self.user, 'Omelete')
+
+        with patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(
+                self.search('panqueca'), ['Panqueca de carne', 'Panqueca']
+            )
+            self.assertEqual(self.search('VEGAN panq'), ['Panqueca'])
+            self.assertEqual(self.search('!!'), [])
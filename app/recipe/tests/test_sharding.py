@@ -0,0 +1,280 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import sharding
+from core.models import Tag, Ingredient, Recipe, UserShard
+from core.testing import ShardDatabasesMixin
+
+from recipe import cache
+from recipe import sharding as moves
+
+
+TAGS_URL = reverse('recipe:tag-list')
+UPSERT_URL = reverse('recipe:tag-upsert')
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:export')
+
+
+def snapshot(using, user):
+    """Linhas do usuário no shard, para comparar origem e destino"""
+    recipes = Recipe.objects.using(using).filter(user=user)
+    return {
+        'tags': list(Tag.objects.using(using).filter(
+            user=user
+        ).order_by('id').values_list('id', 'name', 'recipe_count')),
+        'ingredients': list(Ingredient.objects.using(using).filter(
+            user=user
+        ).order_by('id').values_list('id', 'name')),
+        'recipes': list(recipes.order_by('id').values_list('id', 'title')),
+        'recipe_tags': list(Recipe.tags.through.objects.using(using).filter(
+            recipe__user=user
+        ).order_by('id').values_list('id', 'recipe_id', 'tag_id')),
+    }
+
+
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class ShardingTests(ShardDatabasesMixin, TestCase):
+    """Testa o particionamento dos dados de receitas por usuário"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com', '1234'
+        )
+        sharding.assign(self.user.id, database='shard_1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_catalog(self):
+        """Cria tags e uma receita pela API, no shard do usuário"""
+        doce = self.client.post(TAGS_URL, {'name': 'Doce'}).data
+        rapida = self.client.post(TAGS_URL, {'name': 'Rápida'}).data
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Bolo de cenoura', 'time_minutes': 40, 'price': '12.00',
+            'tags': [doce['id'], rapida['id']],
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data
+
+    def test_new_user_placed_and_recorded(self):
+        """Testa se o usuário novo é colocado pelo mapa e fica registrado"""
+        other = get_user_model().objects.create_user(
+            'ciclano@email.com', '1234'
+        )
+
+        database = sharding.shard_of(other.id)
+
+        self.assertEqual(database, sharding.placement(other.id))
+        self.assertEqual(UserShard.objects.get(user=other).database, database)
+
+    def test_api_uses_user_shard(self):
+        """Testa se a API grava e lê no shard do usuário"""
+        recipe = self.create_catalog()
+
+        self.assertEqual(Tag.objects.using('shard_1').count(), 2)
+        self.assertEqual(Recipe.objects.using('shard_1').count(), 1)
+        self.assertFalse(Tag.objects.using('default').exists())
+        self.assertFalse(Recipe.objects.using('default').exists())
+        self.assertEqual(
+            sorted(tag.recipe_count for tag in Tag.objects.using('shard_1')),
+            [1, 1]
+        )
+
+        res = self.client.get(RECIPES_URL, {'search': 'cenoura'})
+        self.assertEqual([item['id'] for item in res.data], [recipe['id']])
+        self.assertEqual(
+            [tag['name'] for tag in res.data[0]['tags']], ['Doce', 'Rápida']
+        )
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data), 2)
+
+    def test_ids_in_shard_range(self):
+        """Testa se os ids de cada shard ficam na faixa dele"""
+        res = self.client.post(TAGS_URL, {'name': 'Doce'})
+
+        self.assertGreater(res.data['id'], settings.SHARD_ID_RANGE)
+
+    def test_users_isolated_between_shards(self):
+        """Testa se cada usuário só vê os dados do próprio shard"""
+        other = get_user_model().objects.create_user(
+            'ciclano@email.com', '1234'
+        )
+        sharding.assign(other.id, database='shard_2')
+        client = APIClient()
+        client.force_authenticate(other)
+        client.post(TAGS_URL, {'name': 'Salgada'})
+        self.client.post(TAGS_URL, {'name': 'Doce'})
+
+        self.assertEqual(
+            [tag['name'] for tag in client.get(TAGS_URL).data], ['Salgada']
+        )
+        self.assertEqual(
+            list(Tag.objects.using('shard_2').values_list('name', flat=True)),
+            ['Salgada']
+        )
+
+    def test_upsert_and_export_use_shard(self):
+        """Testa o upsert (SQL direto) e a exportação no shard"""
+        res = self.client.post(
+            UPSERT_URL, {'names': ['Doce', 'doce', 'Vegana']}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Tag.objects.using('shard_1').count(), 2)
+
+        res = self.client.get(EXPORT_URL)
+        lines = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(
+            [json.loads(line)['name'] for line in lines], ['Doce', 'Vegana']
+        )
+
+    def test_cache_bumped_on_shard_commit(self):
+        """
+           Testa se o segundo incremento da versão das listagens espera o
+           commit do shard, e não o do `default`
+        """
+        before = cache.get_version(Tag, self.user.id)
+        pending = len(connections['shard_1'].run_on_commit)
+
+        with transaction.atomic(using='shard_1'):
+            Tag(user=self.user, name='Doce').save()
+            self.assertEqual(cache.get_version(Tag, self.user.id), before + 1)
+
+        # O atomic do teste segura os callbacks: ficam pendentes no shard
+        callbacks = connections['shard_1'].run_on_commit[pending:]
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(connections['default'].run_on_commit)
+        self.assertEqual(cache.get_version(Tag, self.user.id), before + 1)
+        callbacks[0][1]()
+        self.assertEqual(cache.get_version(Tag, self.user.id), before + 2)
+
+    def test_locked_user_cannot_write(self):
+        """Testa se o usuário travado lê, mas recebe 503 ao gravar"""
+        self.client.post(TAGS_URL, {'name': 'Doce'})
+        sharding.assign(self.user.id, locked=True)
+
+        res = self.client.post(TAGS_URL, {'name': 'Salgada'})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    def test_delete_user_removes_shard_data(self):
+        """Testa se apagar o usuário apaga os dados no shard dele"""
+        self.create_catalog()
+
+        self.user.delete()
+
+        self.assertFalse(Tag.objects.using('shard_1').exists())
+        self.assertFalse(Recipe.objects.using('shard_1').exists())
+        self.assertFalse(UserShard.objects.exists())
+
+    def test_locked_user_cannot_be_deleted(self):
+        """Testa se o usuário em mudança de shard não pode ser apagado"""
+        self.create_catalog()
+        sharding.assign(self.user.id, locked=True)
+
+        # O delete do Django manda o pre_delete em um atomic sem savepoint
+        with transaction.atomic():
+            res = self.client.delete(reverse('user:me'))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertTrue(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertEqual(Tag.objects.using('shard_1').count(), 2)
+
+    def test_move_user_command(self):
+        """Testa se o comando move os dados e a API passa a usar o destino"""
+        recipe = self.create_catalog()
+        before = snapshot('shard_1', self.user)
+
+        out = StringIO()
+        call_command(
+            'move_user_shard', 'fulano@email.com', 'shard_2', wait=0,
+            stdout=out
+        )
+
+        self.assertIn('usuário em shard_2', out.getvalue())
+        self.assertEqual(snapshot('shard_2', self.user), before)
+        self.assertFalse(Tag.objects.using('shard_1').exists())
+        self.assertFalse(Recipe.objects.using('shard_1').exists())
+        shard = UserShard.objects.get(user=self.user)
+        self.assertEqual(shard.database, 'shard_2')
+        self.assertFalse(shard.locked)
+
+        res = self.client.get(RECIPES_URL, {'search': 'cenoura'})
+        self.assertEqual([item['id'] for item in res.data], [recipe['id']])
+        res = self.client.post(TAGS_URL, {'name': 'Nova'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            Tag.objects.using('shard_2').filter(name='Nova').exists()
+        )
+
+    def test_sync_applies_changes_after_copy(self):
+        """Testa se a sincronização leva as alterações feitas na cópia"""
+        self.create_catalog()
+        moves.copy(self.user.id, 'shard_1', 'shard_2')
+
+        doce = Tag.objects.using('shard_1').get(name='Doce')
+        doce.name = 'Rápida demais'
+        rapida = Tag.objects.using('shard_1').get(name='Rápida')
+        rapida.name = 'Doce'
+        doce.save()
+        rapida.save()
+        recipe = Recipe.objects.using('shard_1').get()
+        recipe.tags.remove(rapida)
+        # O create do manager não tem o objeto: o dono vem do contexto
+        with sharding.user_context(self.user.id):
+            Tag.objects.create(user=self.user, name='Nova')
+            Recipe.objects.create(
+                user=self.user, title='Torta', time_minutes=5, price=10
+            ).tags.add(doce)
+
+        with transaction.atomic(using='shard_2'):
+            changed = moves.sync(self.user.id, 'shard_1', 'shard_2')
+
+        self.assertGreater(changed, 0)
+        self.assertEqual(
+            snapshot('shard_2', self.user), snapshot('shard_1', self.user)
+        )
+
+    def test_failed_move_unlocks(self):
+        """Testa se uma falha no meio destrava o usuário na origem"""
+        self.create_catalog()
+
+        with patch.object(moves, 'sync', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                moves.move_user(self.user.id, 'shard_2', wait=0)
+
+        shard = UserShard.objects.get(user=self.user)
+        self.assertEqual(shard.database, 'shard_1')
+        self.assertFalse(shard.locked)
+        self.assertEqual(
+            self.client.post(TAGS_URL, {'name': 'Nova'}).status_code,
+            status.HTTP_201_CREATED
+        )
+
+    def test_recount_covers_all_shards(self):
+        """Testa se o recount corrige os contadores em todos os shards"""
+        self.create_catalog()
+        Tag.objects.using('shard_1').update(recipe_count=9)
+
+        call_command('recount', stdout=StringIO())
+
+        self.assertEqual(
+            set(Tag.objects.using('shard_1').values_list(
+                'recipe_count', flat=True
+            )), {1}
+        )
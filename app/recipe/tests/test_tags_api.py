@@ -1,13 +1,17 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag
+from core.testing import query_budget
 
 from recipe.serializers import TagSerializer
+from recipe.views import TagViewSet
 
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -37,6 +41,7 @@ class PrivateTagsApiTests(TestCase):
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
+    @query_budget(TagViewSet, 'list', 1)
     def test_retrieve_tags(self):
         """Testa se a consulta de tags"""
         Tag.objects.create(user=self.user, name='Almoço')
@@ -66,6 +71,7 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(len(res.data), 2)
         self.assertNotIn(other_tag, res.data)
 
+    @query_budget(TagViewSet, 'create', 3)
     def test_create_tags_successful(self):
         """Testa a criação das tags"""
         payload = {
@@ -90,3 +96,104 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @query_budget(TagViewSet, 'create', 6)
+    def test_bulk_create_tags(self):
+        """Testa a criação de várias tags em uma única requisição"""
+        payload = [{'name': 'Jantar'}, {'name': 'Almoço'}, {'name': 'Café'}]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['name'] for item in res.data],
+            ['Jantar', 'Almoço', 'Café']
+        )
+        tags = Tag.objects.filter(user=self.user)
+        self.assertEqual(
+            [item['id'] for item in res.data],
+            [tags.get(name=item['name']).id for item in payload]
+        )
+
+    def test_bulk_create_tags_invalid_item(self):
+        """Testa se o erro é informado por item e nada é criado"""
+        payload = [{'name': 'Jantar'}, {'name': ''}]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_create_duplicate_name(self):
+        """Testa se o nome repetido, sem diferenciar maiúsculas, é recusado"""
+        Tag.objects.create(user=self.user, name='Vegana')
+
+        res = self.client.post(TAGS_URL, {'name': 'VEGANA'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_same_name_other_user(self):
+        """Testa se outro usuário pode usar o mesmo nome"""
+        other = get_user_model().objects.create_user('outro@email.com', '1234')
+        Tag.objects.create(user=other, name='Vegana')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegana'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_create_duplicate_names(self):
+        """Testa se os nomes repetidos no lote ou no banco são apontados"""
+        Tag.objects.create(user=self.user, name='Café')
+
+        res = self.client.post(TAGS_URL, [
+            {'name': 'Jantar'}, {'name': 'jantar'}
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+
+        res = self.client.post(TAGS_URL, [
+            {'name': 'Almoço'}, {'name': 'CAFÉ'}, {'name': 'café'}
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, [{}, {}, {'name': res.data[2]['name']}])
+
+        res = self.client.post(TAGS_URL, [
+            {'name': 'Almoço'}, {'name': 'café'}
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    @override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+    def test_fast_list_matches_serializer(self):
+        """
+           Testa se a listagem rápida (`list_values`) gera os mesmos bytes
+           que o serializer, com e sem paginação
+        """
+        for name in ('Jantar', 'Almoço', 'Café "da manhã"', 'Ceia'):
+            Tag.objects.create(user=self.user, name=name)
+
+        for params in ({}, {'page_size': 2}, {'assigned_only': 1}):
+            fast = self.client.get(TAGS_URL, params)
+            with patch.object(TagViewSet, 'list_values', None):
+                regular = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, regular.content)
+
+    @override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+    def test_fast_list_skips_models(self):
+        """Testa se a listagem rápida não instancia as tags"""
+        Tag.objects.create(user=self.user, name='Almoço')
+
+        with patch.object(Tag, '__init__') as init:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        init.assert_not_called()
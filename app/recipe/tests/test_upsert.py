@@ -0,0 +1,122 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.bulk import upsert_by_name
+from core.models import Tag, Ingredient
+from core.testing import query_budget
+
+from recipe.views import TagViewSet
+
+
+TAGS_UPSERT_URL = reverse('recipe:tag-upsert')
+INGREDIENTS_UPSERT_URL = reverse('recipe:ingredient-upsert')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class UpsertApiTests(TestCase):
+    """Testa o upsert de tags e ingredientes por nome"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @query_budget(TagViewSet, 'upsert', 4)
+    def test_upsert_creates_and_returns_ids(self):
+        """Testa se os nomes novos são criados e os ids vêm em ordem"""
+        existing = Tag.objects.create(user=self.user, name='Vegana')
+
+        res = self.client.post(TAGS_UPSERT_URL, {
+            'names': ['Doce', 'VEGANA', 'Rápida']
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tags = Tag.objects.filter(user=self.user)
+        self.assertEqual(tags.count(), 3)
+        self.assertEqual(res.data, [
+            {'id': tags.get(name='Doce').id, 'name': 'Doce'},
+            {'id': existing.id, 'name': 'Vegana'},
+            {'id': tags.get(name='Rápida').id, 'name': 'Rápida'},
+        ])
+
+    def test_upsert_is_idempotent(self):
+        """Testa se repetir a chamada retorna os mesmos ids sem criar nada"""
+        payload = {'names': ['Arroz', 'Feijão']}
+        first = self.client.post(INGREDIENTS_UPSERT_URL, payload,
+                                 format='json')
+
+        with patch('recipe.cache.bump_version') as bump:
+            second = self.client.post(INGREDIENTS_UPSERT_URL, payload,
+                                      format='json')
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Ingredient.objects.count(), 2)
+        bump.assert_not_called()
+
+    def test_upsert_repeated_names(self):
+        """Testa se nomes repetidos no pedido resolvem para o mesmo id"""
+        res = self.client.post(TAGS_UPSERT_URL, {
+            'names': ['Almoço', 'almoço', 'Almoço']
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(len({item['id'] for item in res.data}), 1)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_upsert_other_user(self):
+        """Testa se os objetos de outro usuário não são reaproveitados"""
+        other = get_user_model().objects.create_user('outro@email.com', '1234')
+        tag = Tag.objects.create(user=other, name='Vegana')
+
+        res = self.client.post(TAGS_UPSERT_URL, {'names': ['Vegana']},
+                               format='json')
+
+        self.assertNotEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(Tag.objects.get(id=res.data[0]['id']).user,
+                         self.user)
+
+    def test_upsert_invalidates_list(self):
+        """Testa se a criação pelo upsert invalida a listagem em cache"""
+        self.client.get(TAGS_URL)
+
+        self.client.post(TAGS_UPSERT_URL, {'names': ['Jantar']},
+                         format='json')
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual([item['name'] for item in res.data], ['Jantar'])
+
+    def test_upsert_invalid(self):
+        """Testa se listas vazias ou nomes inválidos são recusados"""
+        for names in ([], [''], ['x' * 121]):
+            res = self.client.post(TAGS_UPSERT_URL, {'names': names},
+                                   format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_upsert_in_batches(self):
+        """Testa se listas maiores que o lote são resolvidas por inteiro"""
+        names = ['Tag %d' % index for index in range(12)]
+
+        with patch('core.db.bulk.UPSERT_BATCH_SIZE', 5):
+            found, created = upsert_by_name(Tag, self.user, names)
+            again, none = upsert_by_name(
+                Tag, self.user, [name.upper() for name in names]
+            )
+
+        self.assertEqual(created, 12)
+        self.assertEqual(none, 0)
+        self.assertEqual(
+            [again[name.upper()] for name in names],
+            [found[name] for name in names]
+        )
@@ -2,15 +2,20 @@ from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 
 router = DefaultRouter()
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
+router.register('recipes', views.RecipeViewSet)
 
 app_name = 'recipe'
 
 urlpatterns = [
+    path('export/', views.ExportView.as_view(), name='export'),
+    path('async/tags/', async_views.tags, name='tag-list-async'),
+    path('async/ingredients/', async_views.ingredients,
+         name='ingredient-list-async'),
     path('', include(router.urls))
 ]
@@ -1,35 +1,356 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.db.models.functions import Lower
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.utils.translation import gettext_lazy as _
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.models import Tag, Ingredient
+from core.db.bulk import bulk_insert, upsert_by_name
+from core.mixins import StreamingListMixin, UserShardMixin
+from core.renderers import FastJSONRenderer, NDJSONRenderer
+from core.models import Tag, Ingredient, Recipe
 
-from recipe import serializers
+from recipe import cache, images, serializers
+from recipe.export import iter_ndjson
+from recipe.pagination import KeysetCursorPagination
+from recipe.search import search_recipes
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
-                            mixins.ListModelMixin,
+def _params_to_ints(request, name):
+    """Converte o parâmetro `?name=1,2,3` em uma lista de ids"""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValidationError({name: _('Informe ids separados por vírgula')})
+
+
+def _etag_matches(request, etag):
+    """Verifica o If-None-Match com comparação fraca, como o Django"""
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    etags = [tag[2:] if tag.startswith('W/') else tag for tag in etags]
+    return '*' in etags or etag in etags
+
+
+def _is_true(request, name):
+    return request.query_params.get(name, '').lower() in ('1', 'true')
+
+
+class BaseRecipeAttrViewSet(UserShardMixin,
+                            viewsets.GenericViewSet,
+                            StreamingListMixin,
                             mixins.CreateModelMixin):
     """ViewSet Base"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetCursorPagination
+    keyset_ordering = ('name', 'id')
+    ordering_options = {
+        'name': ('name', 'id'),
+        '-recipe_count': ('-recipe_count', 'id'),
+    }
+    list_values = ('id', 'name', 'recipe_count')
+    bulk_create_max_items = 10000
 
     def get_queryset(self):
-        """Retorna os objetos relacionados ao usuário logado"""
-        return self.queryset.filter(user=self.request.user).order_by('name')
+        """
+           Retorna os objetos relacionados ao usuário logado. Com
+           `?assigned_only=1` retorna só os usados por alguma receita.
+        """
+        queryset = self.queryset.filter(user=self.request.user)
+        if _is_true(self.request, 'assigned_only'):
+            through = getattr(Recipe, self.recipe_relation).through
+            field = '%s_id' % self.queryset.model._meta.model_name
+            queryset = queryset.filter(Exists(
+                through.objects.filter(**{field: OuterRef('pk')})
+            ))
+
+        return queryset.order_by(*self.get_keyset_ordering())
+
+    def get_keyset_ordering(self):
+        """
+           Ordenação da listagem: por nome (padrão) ou, com
+           `?ordering=-recipe_count`, das mais usadas para as menos usadas
+        """
+        ordering = self.request.query_params.get('ordering')
+        if not ordering:
+            return self.keyset_ordering
+        if ordering not in self.ordering_options:
+            raise ValidationError({'ordering': [
+                _('Use uma destas ordenações: %s')
+                % ', '.join(self.ordering_options)
+            ]})
+
+        return self.ordering_options[ordering]
+
+    def list(self, request, *args, **kwargs):
+        """
+           Lista os objetos. Responde 304 quando o ETag do cliente ainda
+           vale e reaproveita a resposta em cache quando possível; ambos só
+           com um cache compartilhado entre os workers.
+        """
+        if not cache.is_shared():
+            return super().list(request, *args, **kwargs)
+
+        model = self.queryset.model
+        url = request.build_absolute_uri()
+        version = cache.get_version(model, request.user.id)
+        etag = cache.list_etag(
+            model, request.user.id, version, url,
+            request.accepted_renderer.media_type
+        )
+        if _etag_matches(request, etag):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+            )
+
+        response = self._cached_list(request, version, url, *args, **kwargs)
+        response['ETag'] = etag
+
+        return response
+
+    def _cached_list(self, request, version, url, *args, **kwargs):
+        streaming = getattr(request.accepted_renderer, 'streaming', False)
+        if not cache.is_enabled() or streaming:
+            return super().list(request, *args, **kwargs)
+
+        key = cache.list_key(
+            self.queryset.model, request.user.id, version, url
+        )
+        data = cache.get_list(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = super().list(request, *args, **kwargs)
+        rows = response.data
+        if isinstance(rows, dict):
+            rows = rows['results']
+        cache.set_list(key, response.data, len(rows))
+        response['X-Cache'] = 'MISS'
+
+        return response
+
+    def create(self, request, *args, **kwargs):
+        """Cria um objeto ou, se receber uma lista, vários de uma vez"""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        if len(request.data) > self.bulk_create_max_items:
+            raise ValidationError(
+                _('Envie no máximo %d itens por requisição')
+                % self.bulk_create_max_items
+            )
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_bulk_create(serializer)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def perform_create(self, serializer):
         """Cria um novo objeto"""
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic(using=self.user_database()):
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            self._raise_name_conflicts([serializer.validated_data])
+            raise
+
+    def perform_bulk_create(self, serializer):
+        """Cria todos os objetos da lista em uma única transação"""
+        model = self.queryset.model
+        objs = [
+            model(user=self.request.user, **item)
+            for item in serializer.validated_data
+        ]
+        try:
+            with transaction.atomic(using=self.user_database()):
+                bulk_insert(model, objs)
+        except IntegrityError:
+            self._raise_name_conflicts(serializer.validated_data, many=True)
+            raise
+        cache.bump_version(
+            model, self.request.user.id, using=self.user_database()
+        )
+        serializer.instance = objs
+
+    def _raise_name_conflicts(self, items, many=False):
+        """
+           Depois de uma violação do índice único em `(user, lower(name))`,
+           aponta os itens cujo nome já existe. A consulta só é feita no
+           erro: o caminho normal não paga uma verificação prévia.
+        """
+        existing = set(self.queryset.model.objects.filter(
+            user=self.request.user
+        ).annotate(lower_name=Lower('name')).filter(
+            lower_name__in={item['name'].lower() for item in items}
+        ).values_list('lower_name', flat=True))
+        errors = [
+            {'name': [serializers.DUPLICATE_NAME]}
+            if item['name'].lower() in existing else {}
+            for item in items
+        ]
+        if any(errors):
+            raise ValidationError(errors if many else errors[0])
+
+    @action(detail=False, methods=['post'])
+    def upsert(self, request):
+        """
+           Recebe `{"names": [...]}` e retorna `[{"id", "name"}]` na ordem
+           recebida, criando os nomes que ainda não existem (sem diferenciar
+           maiúsculas). Repetir a chamada não cria nada.
+        """
+        serializer = serializers.UpsertSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        names = serializer.validated_data['names']
+        if len(names) > self.bulk_create_max_items:
+            raise ValidationError(
+                _('Envie no máximo %d itens por requisição')
+                % self.bulk_create_max_items
+            )
+
+        model = self.queryset.model
+        found, created = upsert_by_name(model, request.user, names)
+        if created:
+            cache.bump_version(
+                model, request.user.id, using=self.user_database()
+            )
+
+        return Response([
+            {'id': found[name][0], 'name': found[name][1]}
+            for name in names
+        ])
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Gerencia as tags no banco de dados"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_relation = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Gerencia os ingredientes no banco de dados"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_relation = 'ingredients'
+
+
+class ExportView(APIView):
+    """
+       Exporta o catálogo do usuário logado em NDJSON. O conteúdo é lido do
+       BD enquanto é enviado; sob ASGI isso exige o handler de `core.asgi`.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (FastJSONRenderer, NDJSONRenderer)
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        # Banco escolhido ainda na requisição (shard do usuário, réplica)
+        using = router.db_for_read(Recipe, instance=request.user)
+        response = StreamingHttpResponse(
+            iter_ndjson(request.user, self.chunk_size, using),
+            content_type=NDJSONRenderer.media_type
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+
+        return response
+
+
+class RecipeViewSet(UserShardMixin, StreamingListMixin,
+                    viewsets.ModelViewSet):
+    """Gerencia as receitas no banco de dados"""
+    serializer_class = serializers.RecipeSerializer
+    queryset = Recipe.objects.all()
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        """
+           Retorna as receitas do usuário logado, já com as tags e os
+           ingredientes carregados em um número fixo de consultas.
+
+           `?tags=1,2` e `?ingredients=1,2` retornam as receitas com qualquer
+           um dos ids (semi-join, sem DISTINCT); `?search=` filtra pelo texto
+           e ordena pela relevância.
+        """
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('name', 'id')),
+            Prefetch('ingredients',
+                     queryset=Ingredient.objects.order_by('name', 'id')),
+        ).order_by('-id')
+
+        for relation in ('tags', 'ingredients'):
+            ids = _params_to_ints(self.request, relation)
+            if ids is None:
+                continue
+            through = getattr(Recipe, relation).through
+            field = '%s_id__in' % relation[:-1]
+            queryset = queryset.filter(Exists(through.objects.filter(
+                recipe_id=OuterRef('pk'), **{field: ids}
+            )))
+
+        text = self.request.query_params.get('search', '').strip()
+        if text:
+            queryset = search_recipes(queryset, text)
+
+        return queryset
+
+    def get_serializer_class(self):
+        """Retorna o serializer apropriado para a ação"""
+        if self.action in ('list', 'retrieve'):
+            return serializers.RecipeDetailSerializer
+        if self.action == 'upload_image':
+            return serializers.RecipeImageSerializer
+
+        return self.serializer_class
+
+    def perform_create(self, serializer):
+        """Cria uma nova receita"""
+        serializer.save(user=self.request.user)
+
+    @action(methods=['post'], detail=True, url_path='upload-image')
+    def upload_image(self, request, pk=None):
+        """
+           Recebe a imagem da receita (multipart, campo `image`), gravada em
+           disco em blocos. As miniaturas são geradas em segundo plano e
+           `thumbnails_ready` indica quando ficam prontas.
+        """
+        handler = images.LimitedUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
+        recipe = self.get_object()
+        serializer = self.get_serializer(recipe, data=request.data)
+        if handler.too_large:
+            raise ValidationError({'image': [
+                _('A imagem deve ter no máximo %d bytes')
+                % settings.RECIPE_IMAGE_MAX_SIZE
+            ]})
+        serializer.is_valid(raise_exception=True)
+
+        old_image = recipe.image.name
+        using = recipe._state.db
+        with transaction.atomic(using=using):
+            recipe = serializer.save(thumbnails_ready=False)
+            images.schedule_thumbnails(recipe)
+            if old_image:
+                transaction.on_commit(
+                    lambda: images.delete_image(old_image), using=using
+                )
+
+        return Response(serializer.data)
@@ -0,0 +1,147 @@
+"""
+Versões assíncronas das views de usuário e de token para rodar sob ASGI.
+
+O hash da senha (PBKDF2) é CPU-bound e bloquearia o event loop, então toda a
+validação e gravação roda em um pool de threads limitado. Quando a fila do
+pool está cheia a requisição é recusada com 503 e Retry-After. O perfil
+(`manage_user`) usa a autenticação assíncrona, que só recorre ao pool de BD
+quando o token não está em cache.
+"""
+import json
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.translation import gettext as _
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+
+from core.async_views import (
+    error_response, in_pool, json_response, saturated_response
+)
+from core.executor import BoundedExecutor, PoolSaturated
+from user.authentication import authenticated_user
+from user.serializers import UserSerializer, AuthTokenSerializer
+
+
+hashing_pool = BoundedExecutor(
+    max_workers=settings.PASSWORD_HASHING_WORKERS,
+    max_queue=settings.PASSWORD_HASHING_MAX_QUEUE,
+    name='password-hashing'
+)
+
+
+def _parse(request):
+    """Lê o corpo da requisição em JSON ou formulário"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+
+    return request.POST.dict()
+
+
+@in_pool
+def _create_user(data):
+    serializer = UserSerializer(data=data)
+    if not serializer.is_valid():
+        return status.HTTP_400_BAD_REQUEST, serializer.errors
+    serializer.save()
+
+    return status.HTTP_201_CREATED, serializer.data
+
+
+@in_pool
+def _obtain_token(data, request):
+    serializer = AuthTokenSerializer(
+        data=data, context={'request': request}
+    )
+    if not serializer.is_valid():
+        return status.HTTP_400_BAD_REQUEST, serializer.errors
+    token, created = Token.objects.get_or_create(
+        user=serializer.validated_data['user']
+    )
+
+    return status.HTTP_200_OK, {'token': token.key}
+
+
+def _method_not_allowed(request):
+    response = JsonResponse(
+        {'detail': _('Método "%s" não permitido.') % request.method},
+        status=status.HTTP_405_METHOD_NOT_ALLOWED
+    )
+    response['Allow'] = 'POST'
+
+    return response
+
+
+def _bad_request():
+    return JsonResponse(
+        {'detail': _('JSON inválido.')},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+def _saturated():
+    response = JsonResponse(
+        {'detail': _('Servidor ocupado, tente novamente.')},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = str(settings.PASSWORD_HASHING_RETRY_AFTER)
+
+    return response
+
+
+async def _run(fn, *args):
+    try:
+        code, data = await hashing_pool.run(fn, *args)
+    except PoolSaturated:
+        return _saturated()
+
+    return JsonResponse(data, status=code)
+
+
+async def create_user(request):
+    """Cria um novo usuário"""
+    if request.method != 'POST':
+        return _method_not_allowed(request)
+    data = _parse(request)
+    if data is None:
+        return _bad_request()
+
+    return await _run(_create_user, data)
+
+
+async def create_token(request):
+    """Cria um novo token para o usuário"""
+    if request.method != 'POST':
+        return _method_not_allowed(request)
+    data = _parse(request)
+    if data is None:
+        return _bad_request()
+
+    return await _run(_obtain_token, data, request)
+
+
+async def manage_user(request):
+    """
+       Retorna o usuário autenticado. Com o token no cache nada sai do
+       event loop: o serializer só lê o próprio usuário.
+    """
+    if request.method != 'GET':
+        return error_response(
+            exceptions.MethodNotAllowed(request.method), allow='GET'
+        )
+    try:
+        user = await authenticated_user(request)
+    except exceptions.APIException as exc:
+        return error_response(exc)
+    except PoolSaturated:
+        return saturated_response()
+
+    return json_response(UserSerializer(user).data)
+
+
+# As views são chamadas por clientes de API, como as views do DRF
+create_user.csrf_exempt = True
+create_token.csrf_exempt = True
@@ -0,0 +1,175 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import (
+    TokenAuthentication, get_authorization_header
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+
+from core.async_views import run_db
+
+
+class TokenCache:
+    """LRU em memória, com validade, dos usuários resolvidos por token"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+
+            return user
+
+    def set(self, key, user):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[0].pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[0].pk]
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_AUTH_CACHE_MAX_SIZE,
+    ttl=settings.TOKEN_AUTH_LOCAL_CACHE_TTL
+)
+
+
+def _shared_cache():
+    alias = settings.TOKEN_AUTH_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _shared_key(key):
+    return 'auth:token:%s' % hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    """Remove o token dos caches local e compartilhado"""
+    token_cache.invalidate(key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_shared_key(key))
+
+
+def invalidate_user(user_id):
+    """Remove todos os tokens do usuário dos caches"""
+    token_cache.invalidate_user(user_id)
+    shared = _shared_cache()
+    if shared is not None:
+        keys = Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True
+        )
+        shared.delete_many([_shared_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+       Autenticação por token que guarda o usuário resolvido em cache,
+       evitando a consulta de Token + User a cada requisição
+    """
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        shared = _shared_cache()
+        if user is None and shared is not None:
+            user = shared.get(_shared_key(key))
+            if user is not None:
+                token_cache.set(key, user)
+
+        if user is None or not user.is_active:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            if shared is not None:
+                shared.set(
+                    _shared_key(key), user, settings.TOKEN_AUTH_CACHE_TTL
+                )
+            return (copy.copy(user), token)
+
+        user = copy.copy(user)
+        return (user, Token(key=key, user=user))
+
+
+async def authenticate_async(request):
+    """
+       Versão assíncrona da `CachedTokenAuthentication` para as views
+       assíncronas. O LRU local é consultado no próprio event loop; o cache
+       compartilhado e o BD só são usados, no pool de BD, quando o token não
+       está nele.
+
+       Retorna o usuário, ou None sem o header `Authorization: Token`, e
+       levanta `AuthenticationFailed` para tokens inválidos.
+    """
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return None
+    if len(auth) != 2:
+        raise AuthenticationFailed(_('Invalid token header.'))
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise AuthenticationFailed(_('Invalid token header.'))
+
+    user = token_cache.get(key)
+    if user is not None and user.is_active:
+        return copy.copy(user)
+
+    user, token = await run_db(
+        CachedTokenAuthentication().authenticate_credentials, key
+    )
+    return user
+
+
+async def authenticated_user(request):
+    """Retorna o usuário autenticado, ou levanta a exceção da API"""
+    user = await authenticate_async(request)
+    if user is None:
+        raise NotAuthenticated()
+
+    return user
@@ -0,0 +1,148 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.executor import PoolSaturated
+from user.authentication import token_cache
+
+
+CREATE_USER_URL = reverse('user:create-async')
+TOKEN_URL = reverse('user:token-async')
+ME_URL = reverse('user:me-async')
+SYNC_ME_URL = reverse('user:me')
+
+
+class AsyncUserApiTests(TransactionTestCase):
+    """Testa as views assíncronas de criação de usuário e token"""
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_create_valid_user_success(self):
+        """Testa a criação de um usuário com payload válido"""
+        payload = {
+            'email': 'fulano@email.com',
+            'password': '12345',
+            'name': 'Fulano da Silva'
+        }
+
+        res = self.client.post(
+            CREATE_USER_URL, payload, content_type='application/json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        user = get_user_model().objects.get(email=payload['email'])
+        self.assertTrue(user.check_password(payload['password']))
+        self.assertNotIn('password', res.json())
+
+    def test_create_user_invalid_payload(self):
+        """Testa se a senha curta é rejeitada"""
+        payload = {'email': 'fulano@email.com', 'password': '1'}
+
+        res = self.client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', res.json())
+
+    def test_create_token_for_user(self):
+        """Testa a geração do token do usuário"""
+        get_user_model().objects.create_user('fulano@email.com', '1234')
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'fulano@email.com', 'password': '1234'},
+            content_type='application/json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.json())
+
+    def test_create_token_invalid_credentials(self):
+        """Testa se credenciais inválidas são rejeitadas"""
+        get_user_model().objects.create_user('fulano@email.com', '1234')
+
+        res = self.client.post(
+            TOKEN_URL, {'email': 'fulano@email.com', 'password': '4321'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('token', res.json())
+
+    def test_get_not_allowed(self):
+        """Testa se apenas POST é aceito"""
+        res = self.client.get(TOKEN_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @patch('user.async_views.hashing_pool.submit', side_effect=PoolSaturated)
+    def test_saturated_pool(self, submit):
+        """Testa se a fila cheia responde 503 com Retry-After"""
+        res = self.client.post(
+            TOKEN_URL, {'email': 'fulano@email.com', 'password': '1234'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+
+class AsyncManageUserTests(TransactionTestCase):
+    """Testa a view assíncrona do perfil do usuário"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com', '1234', name='Fulano'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = Client(HTTP_AUTHORIZATION='Token %s' % token.key)
+
+    def test_retrieve_profile(self):
+        """Testa se o perfil é igual ao da view síncrona"""
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, self.client.get(SYNC_ME_URL).content)
+        self.assertEqual(
+            res.json(), {'email': 'fulano@email.com', 'name': 'Fulano'}
+        )
+
+    def test_cached_token_skips_database(self):
+        """Testa se o token em cache é resolvido sem usar o pool de BD"""
+        self.client.get(ME_URL)
+
+        with patch('core.async_views.database_pool.submit') as submit:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        submit.assert_not_called()
+
+    @patch('core.async_views.database_pool.submit', side_effect=PoolSaturated)
+    def test_saturated_pool(self, submit):
+        """Testa se o token fora do cache com o pool de BD cheio dá 503"""
+        token_cache.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        submit.assert_called_once()
+
+    def test_authentication_required(self):
+        """Testa se o perfil exige um token válido"""
+        res = Client().get(ME_URL)
+        invalid = Client(HTTP_AUTHORIZATION='Token invalido').get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+        self.assertEqual(invalid.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_only_get_allowed(self):
+        """Testa se apenas GET é aceito"""
+        res = self.client.patch(ME_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(res['Allow'], 'GET')
@@ -0,0 +1,157 @@
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import TokenCache, token_cache
+
+
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class TokenCacheTests(TestCase):
+    """Testa o LRU de tokens"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234'
+        )
+
+    def test_lru_evicts_oldest(self):
+        """Testa se o token menos usado é descartado"""
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', self.user)
+        cache.set('b', self.user)
+        cache.get('a')
+        cache.set('c', self.user)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_entry(self):
+        """Testa se entradas vencidas não são retornadas"""
+        cache = TokenCache(max_size=2, ttl=-1)
+        cache.set('a', self.user)
+
+        self.assertIsNone(cache.get('a'))
+
+    def test_invalidate_user(self):
+        """Testa a remoção de todos os tokens de um usuário"""
+        cache = TokenCache(max_size=10, ttl=60)
+        cache.set('a', self.user)
+        cache.set('b', self.user)
+
+        cache.invalidate_user(self.user.pk)
+
+        self.assertEqual(len(cache), 0)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Testa a autenticação por token com cache"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'fulano@email.com',
+            '1234',
+            name='Fulano'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_cached_request_skips_auth_query(self):
+        """Testa se a segunda requisição não consulta o token no banco"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Testa se um token apagado deixa de autenticar"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Testa se um usuário desativado deixa de autenticar"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_not_stale(self):
+        """Testa se a alteração do perfil não retorna dados antigos"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'Fulano de Tal'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Fulano de Tal')
+
+    def test_deleted_user_rejected(self):
+        """Testa se o usuário apagado pelo /me deixa de autenticar"""
+        self.client.get(ME_URL)
+
+        res = self.client.delete(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE_ALIAS='default')
+    def test_shared_cache(self):
+        """Testa se o cache compartilhado é usado quando configurado"""
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.token.delete()
+        token_cache.clear()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        caches['default'].clear()
+
+    @override_settings(TOKEN_AUTH_CACHE_ALIAS='default')
+    def test_revoked_on_other_worker(self):
+        """
+           Testa se o token apagado por outro worker deixa de autenticar
+           quando vence o LRU local
+        """
+        self.client.get(ME_URL)
+        self.addCleanup(caches['default'].clear)
+
+        # Outro worker: limpa o cache compartilhado, mas não este LRU
+        key = self.token.key
+        with patch.object(token_cache, 'invalidate'):
+            self.token.delete()
+        self.assertIsNotNone(token_cache.get(key))
+
+        later = time.monotonic() + settings.TOKEN_AUTH_LOCAL_CACHE_TTL + 1
+        with patch('user.authentication.time.monotonic', lambda: later):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
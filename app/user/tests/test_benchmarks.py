@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import benchmark, summarize, report_latency
+
+
+TOKEN_URL = reverse('user:token')
+ASYNC_TOKEN_URL = reverse('user:token-async')
+
+
+@benchmark
+class LoginStormBenchmark(TransactionTestCase):
+    """
+       Compara vazão e p99 de logins concorrentes sob ASGI na view síncrona
+       do DRF e na view assíncrona com pool de hash
+    """
+    logins = 200
+    concurrency = 50
+    payload = {'email': 'fulano@email.com', 'password': '12345'}
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(**self.payload)
+        Token.objects.create(user=user)
+
+    async def _storm(self, url):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        latencies = []
+        statuses = set()
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                res = await client.post(
+                    url, self.payload, content_type='application/json'
+                )
+                latencies.append(time.perf_counter() - start)
+                statuses.add(res.status_code)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(self.logins)))
+        elapsed = time.perf_counter() - start
+
+        return summarize(latencies, elapsed), statuses
+
+    async def test_login_storm(self):
+        sync_summary, sync_statuses = await self._storm(TOKEN_URL)
+        async_summary, async_statuses = await self._storm(ASYNC_TOKEN_URL)
+
+        self.assertEqual(sync_statuses, {status.HTTP_200_OK})
+        self.assertTrue(async_statuses <= {
+            status.HTTP_200_OK, status.HTTP_503_SERVICE_UNAVAILABLE
+        })
+        report_latency('Token (DRF síncrono)', sync_summary)
+        report_latency('Token (assíncrono + pool)', async_summary)
@@ -5,6 +5,11 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import Tag, Ingredient, Recipe
+from core.testing import query_budget
+
+from user.views import CreateTokenView, CreateUserView, ManageUserView
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -21,6 +26,7 @@ class PublicUserApiTests(TestCase):
     def setUp(self):
         self.client = APIClient()
 
+    @query_budget(CreateUserView, 'create', 2)
     def test_create_valid_user_success(self):
         """Testa criando um usuário com um payload válido"""
         payload = {
@@ -61,6 +67,7 @@ class PublicUserApiTests(TestCase):
         ).exists()
         self.assertFalse(user_exists)
 
+    @query_budget(CreateTokenView, 'post', 5)
     def test_create_token_for_user(self):
         """Testa a geração de token do usuário"""
         payload = {
@@ -134,6 +141,7 @@ class PrivateUserApiTests(TestCase):
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
+    @query_budget(ManageUserView, 'retrieve', 0)
     def test_retrieve_profile_success(self):
         """Testa se a rota do perfil do usuário"""
         res = self.client.get(ME_URL)
@@ -149,6 +157,7 @@ class PrivateUserApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @query_budget(ManageUserView, 'partial_update', 2)
     def test_update_user_profile(self):
         """Testa a alteração do perfil do usuário"""
         payload = {
@@ -161,3 +170,25 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertEqual(self.user.name, payload['name'])
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_user_removes_data(self):
+        """Testa se apagar o usuário apaga as receitas, tags e ingredientes"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Bolo', time_minutes=40, price=12
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Doce'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Farinha')
+        )
+        other = create_user(email='outro@email.com', password='1234')
+        Tag.objects.create(user=other, name='Salgada')
+
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Ingredient.objects.exists())
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        self.assertEqual(
+            list(Tag.objects.values_list('name', flat=True)), ['Salgada']
+        )